@@ -1,7 +1,7 @@
 import argparse
-import tkinter as tk
-from pyvm.core.compiler import PyCompiler
-from pyvm.core.interpreter import PyInterpreter
+import sys
+
+# 编译器、解释器（railgun扩展）和tkinter按需导入，客户端模式下无需加载
 
 def main():
     parser = argparse.ArgumentParser(description='Python虚拟机 - 编译和执行Python代码')
@@ -11,11 +11,116 @@ def main():
     compile_parser = subparsers.add_parser('compile', help='编译Python文件为pyc文件')
     compile_parser.add_argument('source', help='源文件路径')
     compile_parser.add_argument('output', nargs='?', help='输出pyc文件路径')
+    compile_parser.add_argument('--cache-dir', help='编译缓存目录（默认 ~/.cache/pyvm，可用PYVM_CACHE_DIR覆盖）')
+    compile_parser.add_argument('--no-cache', action='store_true', help='禁用编译缓存')
+    compile_parser.add_argument('--server', nargs='?', const='', metavar='SOCKET', help='交给pyvm serve服务处理')
+    compile_parser.add_argument('--timings', action='store_true', help='输出各阶段耗时')
+    compile_parser.add_argument('-O', '--opt-level', type=int, choices=[0, 1, 2], default=0,
+                                help='优化级别：1去除assert并折叠常量、删除死分支，2另外去除文档字符串和声明了__all__的模块中未使用的from导入')
+    compile_parser.add_argument('--opt-stats', action='store_true', help='输出优化前后的大小和指令数变化')
+
+    # 目录编译命令
+    tree_parser = subparsers.add_parser('compile-tree', help='并行编译整个目录')
+    tree_parser.add_argument('root', help='源码根目录')
+    tree_parser.add_argument('--output-dir', help='pyc输出目录（默认与源文件同目录）')
+    tree_parser.add_argument('--exclude', action='append', help='排除的glob规则，可多次指定')
+    tree_parser.add_argument('-j', '--jobs', type=int, help='工作进程数（默认等于CPU核数）')
+    tree_parser.add_argument('--cache-dir', help='编译缓存目录')
+    tree_parser.add_argument('--no-cache', action='store_true', help='禁用编译缓存')
+    tree_parser.add_argument('--incremental', action='store_true', help='根据导入依赖图只重建修改过的文件及其依赖者')
+    tree_parser.add_argument('--graph', help='依赖图文件路径（默认为输出目录下的.pyvm_deps.json）')
+    tree_parser.add_argument('--explain', action='store_true', help='输出每个文件被重建的原因')
+    tree_parser.add_argument('-O', '--opt-level', type=int, choices=[0, 1, 2], default=0, help='优化级别')
+    tree_parser.add_argument('--opt-stats', action='store_true', help='输出每个文件优化前后的大小和指令数变化')
+
+    # 安全扫描命令
+    scan_parser = subparsers.add_parser('scan', help='并行扫描文件或目录的安全问题')
+    scan_parser.add_argument('paths', nargs='+', help='要扫描的文件或目录')
+    scan_parser.add_argument('--exclude', action='append', help='排除的glob规则，可多次指定')
+    scan_parser.add_argument('-j', '--jobs', type=int, help='工作进程数（默认等于CPU核数）')
+    scan_parser.add_argument('--allow', action='append', help='白名单（模块名或函数全名），可多次指定')
+    scan_parser.add_argument('--deny', action='append', help='黑名单（模块名或函数全名），可多次指定')
+    scan_parser.add_argument('--format', choices=['text', 'json', 'jsonl'], default='text', help='输出格式')
+    scan_parser.add_argument('--cache-dir', help='扫描结果缓存目录')
+    scan_parser.add_argument('--no-cache', action='store_true', help='禁用扫描结果缓存')
+    scan_parser.add_argument('--server', nargs='?', const='', metavar='SOCKET', help='交给pyvm serve服务处理')
+
+    # 打包命令
+    bundle_parser = subparsers.add_parser('bundle', help='将目录编译并打包为.pyz归档')
+    bundle_parser.add_argument('root', help='源码根目录')
+    bundle_parser.add_argument('output', help='输出的.pyz文件路径')
+    bundle_parser.add_argument('--main', help='入口模块名（默认为根目录下的__main__）')
+    bundle_parser.add_argument('--exclude', action='append', help='排除的glob规则，可多次指定')
+    bundle_parser.add_argument('-j', '--jobs', type=int, help='工作进程数（默认等于CPU核数）')
+    bundle_parser.add_argument('--compress', action='store_true', help='压缩归档中的pyc文件')
+    bundle_parser.add_argument('-O', '--opt-level', type=int, choices=[0, 1, 2], default=0, help='优化级别')
 
     # 执行命令
     execute_parser = subparsers.add_parser('execute', help='执行pyc文件')
-    execute_parser.add_argument('pyc_file', help='pyc文件路径')
+    execute_parser.add_argument('pyc_files', nargs='*', metavar='pyc_file',
+                                help='pyc文件路径（也可以是bundle生成的.pyz归档），多个文件时批量并行执行')
+    execute_parser.add_argument('--manifest', help='任务清单文件，每行一个pyc路径或{"path": ..., "timeout": ...}')
+    execute_parser.add_argument('-j', '--jobs', type=int, help='批量执行时的并发数（默认等于CPU核数）')
+    execute_parser.add_argument('--results', help='批量执行结果的JSON Lines输出文件（-表示标准输出）')
     execute_parser.add_argument('--path', action='append', help='添加模块搜索路径')
+    execute_parser.add_argument('--no-check', action='store_true', help='跳过执行前的字节码安全检查')
+    execute_parser.add_argument('--isolate', action='store_true', help='在fork出的独立子进程中执行')
+    execute_parser.add_argument('--preload', action='append', help='隔离模式下zygote进程预先导入的模块，可多次指定')
+    execute_parser.add_argument('--timeout', type=float, help='隔离模式和批量执行时的单任务超时（秒）')
+    execute_parser.add_argument('--server', nargs='?', const='', metavar='SOCKET',
+                                help='交给pyvm serve服务在隔离子进程中执行')
+    execute_parser.add_argument('--profile', action='store_true', help='进行性能分析，执行后输出函数耗时统计')
+    execute_parser.add_argument('--profile-sort', choices=['self', 'cumulative', 'calls'], default='self',
+                                help='性能分析结果的排序方式')
+    execute_parser.add_argument('--pstats', metavar='FILE', help='将性能分析结果导出为pstats文件（隐含--profile）')
+    execute_parser.add_argument('--collapsed', metavar='FILE',
+                                help='将性能分析结果导出为折叠栈（火焰图）格式（隐含--profile）')
+    execute_parser.add_argument('--coverage', metavar='FILE', help='收集行覆盖数据并合并到指定文件（需要Python 3.12+）')
+    execute_parser.add_argument('--timings', action='store_true', help='输出加载、安全检查和执行的耗时及内存峰值')
+    execute_parser.add_argument('--memory-limit', metavar='SIZE', help='内存上限（如512M、2G），超过时中断执行')
+    execute_parser.add_argument('--engine', choices=['auto', 'cpython', 'railgun'], default='auto',
+                                help='执行引擎（auto时railgun格式的pyc交给原生虚拟机，其余用cpython）')
+
+    # 直接运行源码命令
+    run_parser = subparsers.add_parser('run', help='在内存中编译并执行Python源文件，不生成中间pyc')
+    run_parser.add_argument('source', help='源文件路径（-表示从标准输入读取）')
+    run_parser.add_argument('--path', action='append', help='添加模块搜索路径')
+    run_parser.add_argument('--no-check', action='store_true', help='跳过执行前的源码安全检查')
+    run_parser.add_argument('-O', '--opt-level', type=int, choices=[0, 1, 2], default=0, help='优化级别')
+    run_parser.add_argument('--save', nargs='?', const='', metavar='PYC',
+                            help='在后台同时保存pyc文件（默认与源文件同目录）')
+    run_parser.add_argument('--cache-dir', help='编译缓存目录')
+    run_parser.add_argument('--no-cache', action='store_true', help='禁用编译缓存')
+    run_parser.add_argument('--timings', action='store_true', help='输出解析、安全检查、编译和执行的耗时')
+    run_parser.add_argument('--engine', choices=['auto', 'cpython', 'railgun', 'compare'], default='auto',
+                            help='执行引擎：railgun优先用原生虚拟机执行，不支持时退回cpython；'
+                                 'compare分别用各引擎执行并对比耗时')
+    run_parser.add_argument('--repeat', type=int, default=3, help='compare模式下每个引擎的执行次数')
+
+    # 覆盖率报告命令
+    coverage_parser = subparsers.add_parser('coverage', help='查看execute --coverage收集的行覆盖数据')
+    coverage_parser.add_argument('data_file', help='覆盖数据文件')
+    coverage_parser.add_argument('--show-missing', action='store_true', help='列出未执行的行和代码对象')
+
+    # 服务命令
+    serve_parser = subparsers.add_parser('serve', help='启动常驻服务，通过Unix套接字处理编译/检查/执行请求')
+    serve_parser.add_argument('--socket', help='Unix套接字路径（默认$XDG_RUNTIME_DIR/pyvm-<uid>.sock，可用PYVM_SOCKET覆盖）')
+    serve_parser.add_argument('-j', '--jobs', type=int, help='编译/检查工作进程数（默认等于CPU核数）')
+    serve_parser.add_argument('--max-pending', type=int, help='同时处理的请求数上限（默认为工作进程数的4倍）')
+    serve_parser.add_argument('--path', action='append', help='执行时的模块搜索路径')
+    serve_parser.add_argument('--preload', action='append', help='zygote进程预先导入的模块，可多次指定')
+    serve_parser.add_argument('--no-check', action='store_true', help='执行前跳过字节码安全检查')
+    serve_parser.add_argument('--cache-dir', help='编译缓存目录')
+    serve_parser.add_argument('--no-cache', action='store_true', help='禁用编译缓存')
+
+    # 基准测试命令
+    bench_parser = subparsers.add_parser('bench', help='运行内置基准测试，可与基线比较')
+    bench_parser.add_argument('--repeat', type=int, default=5, help='每项测试的重复次数（默认5）')
+    bench_parser.add_argument('--output', help='将结果保存为JSON文件（-表示标准输出）')
+    bench_parser.add_argument('--baseline', help='与之比较的基线结果文件')
+    bench_parser.add_argument('--threshold', type=float, default=10.0, help='回归阈值百分比（默认10）')
+    bench_parser.add_argument('--metric-threshold', action='append', metavar='指标前缀=百分比',
+                              help='按指标前缀单独设置阈值，如execute.cold=25，可多次指定')
 
     # 图形界面命令
     gui_parser = subparsers.add_parser('gui', help='启动图形界面')
@@ -24,18 +129,336 @@ def main():
 
     if args.command == 'compile':
         # 编译命令
-        compiler = PyCompiler()
+        if args.server is not None:
+            from pyvm.core.server import PyVMClient
+            with PyVMClient(args.server or None) as client:
+                result = client.compile(args.source, args.output)
+            print(f"已编译为: {result['output']}")
+            print(f"导入的模块: {', '.join(result['imports']) or '无'}")
+            return
+
+        from pyvm.core.cache import CompileCache
+        from pyvm.core.compiler import PyCompiler
+        cache = None if args.no_cache else CompileCache(args.cache_dir)
+        compiler = PyCompiler(cache=cache, opt_level=args.opt_level, optimization_stats=args.opt_stats)
         output_path = compiler.compile_file(args.source, args.output)
         print(f"已编译为: {output_path}")
         print(f"导入的模块: {', '.join(compiler.get_imported_modules()) or '无'}")
+        if cache is not None:
+            print(f"编译缓存: 命中 {cache.hits}, 未命中 {cache.misses}")
+        if args.timings:
+            print(f"耗时: {compiler.last_timings.format()}")
+        if compiler.last_optimization is not None:
+            print(compiler.last_optimization.summary())
+            if compiler.last_optimization.imports_removed:
+                print(f"删除的导入: {', '.join(compiler.last_optimization.imports_removed)}")
+
+    elif args.command == 'compile-tree':
+        # 目录编译命令
+        from pyvm.core.tree import DEFAULT_EXCLUDES, compile_tree, incremental_compile_tree
+
+        def on_result(source_path, error, optimization):
+            if error is not None:
+                print(f"编译失败: {source_path}: {error}", file=sys.stderr)
+            elif args.opt_stats and optimization is not None:
+                print(f"{source_path}: {optimization.summary()}")
+
+        excludes = DEFAULT_EXCLUDES + (args.exclude or [])
+        if args.incremental:
+            report = incremental_compile_tree(args.root, args.output_dir, excludes, args.jobs,
+                                              args.cache_dir, not args.no_cache, args.graph,
+                                              on_result=on_result, opt_level=args.opt_level,
+                                              optimization_stats=args.opt_stats)
+            if args.explain:
+                for rel_path, reason in sorted(report.rebuild_reasons.items()):
+                    print(f"重建 {rel_path}: {reason}")
+        else:
+            report = compile_tree(args.root, args.output_dir, excludes, args.jobs,
+                                  args.cache_dir, not args.no_cache, on_result=on_result,
+                                  opt_level=args.opt_level, optimization_stats=args.opt_stats)
+        print(report.summary())
+        if args.opt_stats and report.optimization_summary() is not None:
+            print(report.optimization_summary())
+        if report.errors:
+            sys.exit(1)
+
+    elif args.command == 'scan':
+        # 安全扫描命令
+        import json
+        from pyvm.core.scan import scan_paths
+        from pyvm.core.tree import DEFAULT_EXCLUDES
+
+        def on_result(result):
+            if args.format == 'jsonl':
+                print(json.dumps(result.to_dict(), ensure_ascii=False), flush=True)
+            elif args.format == 'text' and not result.safe:
+                print(f"{result.path}:")
+                for issue in ([result.error] if result.error else result.issues):
+                    print(f"  - {issue}")
+
+        excludes = DEFAULT_EXCLUDES + (args.exclude or [])
+        if args.server is not None:
+            from pyvm.core.scan import ScanReport, ScanResult, iter_scan_targets
+            from pyvm.core.server import PyVMClient
+            report = ScanReport()
+            with PyVMClient(args.server or None) as client:
+                response = client.check(list(iter_scan_targets(args.paths, excludes)), args.allow, args.deny)
+            for item in response['results']:
+                result = ScanResult(item['path'], None, item['issues'], item['error'])
+                report.results.append(result)
+                on_result(result)
+        else:
+            report = scan_paths(args.paths, excludes, args.jobs, args.allow, args.deny,
+                                not args.no_cache, args.cache_dir, on_result=on_result)
+        if args.format == 'json':
+            print(json.dumps(dict(report.summary_dict(), results=[r.to_dict() for r in report.results]),
+                             ensure_ascii=False, indent=2))
+        elif args.format == 'jsonl':
+            print(json.dumps(dict(report.summary_dict(), summary=True), ensure_ascii=False))
+        else:
+            print(report.summary())
+        if report.unsafe:
+            sys.exit(1)
+
+    elif args.command == 'bundle':
+        # 打包命令
+        from pyvm.core.bundle import build_bundle
+        from pyvm.core.tree import DEFAULT_EXCLUDES
+
+        excludes = DEFAULT_EXCLUDES + (args.exclude or [])
+        report = build_bundle(args.root, args.output, args.main, excludes, args.jobs, compress=args.compress,
+                              opt_level=args.opt_level)
+        for source_path, error in report.errors:
+            print(f"编译失败: {source_path}: {error}", file=sys.stderr)
+        if report.errors:
+            sys.exit(1)
+        print(f"已打包为: {args.output}")
+        print(report.summary())
 
     elif args.command == 'execute':
         # 执行命令
         module_search_paths = args.path or []
-        interpreter = PyInterpreter(module_search_paths)
-        interpreter.execute_pyc(args.pyc_file)
+        if not args.pyc_files and not args.manifest:
+            execute_parser.error("需要指定pyc文件或--manifest")
+        if args.manifest or len(args.pyc_files) > 1 or args.results:
+            # 批量执行：每个任务都在隔离子进程中运行，结果按完成顺序流式输出
+            import json
+            from pyvm.core.batch import read_manifest, run_batch
+
+            jobs = [(path, None) for path in args.pyc_files]
+            if args.manifest:
+                jobs.extend(read_manifest(args.manifest))
+            results_file = None
+            if args.results and args.results != '-':
+                results_file = open(args.results, 'w', encoding='utf-8')
+
+            def on_result(result):
+                if args.results:
+                    line = json.dumps(result.to_dict(), ensure_ascii=False)
+                    print(line, file=results_file or sys.stdout, flush=True)
+                if not result.ok:
+                    print(f"执行失败: {result.path}: {result.error}", file=sys.stderr)
+
+            try:
+                report = run_batch(jobs, args.jobs, args.timeout, args.preload or [],
+                                   module_search_paths, not args.no_check, on_result=on_result)
+            finally:
+                if results_file is not None:
+                    results_file.close()
+            print(report.summary(), file=sys.stderr)
+            if report.failed:
+                sys.exit(1)
+            return
+
+        pyc_file = args.pyc_files[0]
+        profile = args.profile or bool(args.pstats) or bool(args.collapsed)
+        if profile and (args.server is not None or args.isolate):
+            execute_parser.error("性能分析只支持在当前进程中执行")
+        if args.coverage and (args.server is not None or args.isolate):
+            execute_parser.error("覆盖收集只支持在当前进程中执行")
+        if args.memory_limit and (args.server is not None or args.isolate):
+            execute_parser.error("内存上限只支持在当前进程中执行")
+        if args.engine != 'auto' and (args.server is not None or args.isolate):
+            execute_parser.error("指定执行引擎只支持在当前进程中执行")
+        if args.server is not None:
+            from pyvm.core.server import PyVMClient
+            with PyVMClient(args.server or None) as client:
+                result = client.execute(pyc_file, args.timeout)
+            sys.stdout.write(result['stdout'])
+            sys.stderr.write(result['stderr'])
+            if not result['ok']:
+                print(f"执行失败: {result['error']}", file=sys.stderr)
+                sys.exit(result['exit_status'] or 1)
+            return
+
+        if args.isolate:
+            from pyvm.core.forkserver import ForkServer
+            with ForkServer(args.preload or [], module_search_paths, not args.no_check) as server:
+                result = server.execute_pyc(pyc_file, args.timeout)
+            sys.stdout.write(result.stdout)
+            sys.stderr.write(result.stderr)
+            if not result.ok:
+                print(f"执行失败: {result.error}", file=sys.stderr)
+                sys.exit(result.exit_status or 1)
+            return
+
+        from pyvm.core.interpreter import PyInterpreter
+        from pyvm.core.security import SecurityCheckError
+        collector = None
+        if args.coverage:
+            from pyvm.core.coverage import CoverageCollector
+            collector = CoverageCollector()
+        from pyvm.core.timing import parse_size
+        try:
+            memory_limit = parse_size(args.memory_limit) if args.memory_limit else None
+        except ValueError as e:
+            execute_parser.error(str(e))
+        from pyvm.core.engines import EngineUnavailable
+        interpreter = PyInterpreter(module_search_paths, check_security=not args.no_check, coverage=collector,
+                                    memory_limit=memory_limit, trace_memory=args.timings, engine=args.engine)
+        try:
+            if pyc_file.endswith('.pyz'):
+                interpreter.execute_pyz(pyc_file, profile=profile)
+            else:
+                interpreter.execute_pyc(pyc_file, profile=profile)
+            if interpreter.last_fallback is not None:
+                print(f"railgun无法执行，已改用cpython: {interpreter.last_fallback}", file=sys.stderr)
+        except EngineUnavailable as e:
+            print(f"执行失败: {e}", file=sys.stderr)
+            sys.exit(1)
+        except SecurityCheckError as e:
+            print("pyc文件未通过安全检查（可使用--no-check跳过）:", file=sys.stderr)
+            for issue in e.issues:
+                print(f"  - {issue}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            # 执行失败时同样输出已收集的性能分析数据
+            report = interpreter.last_profile
+            if report is not None:
+                print(report.format_table(sort=args.profile_sort), file=sys.stderr)
+                if args.pstats:
+                    report.dump_pstats(args.pstats)
+                    print(f"pstats数据已写入: {args.pstats}", file=sys.stderr)
+                if args.collapsed:
+                    report.dump_collapsed(args.collapsed)
+                    print(f"折叠栈数据已写入: {args.collapsed}", file=sys.stderr)
+            if args.timings and interpreter.last_timings is not None:
+                print(f"耗时: {interpreter.last_timings.format()}", file=sys.stderr)
+            if collector is not None and collector.data.files:
+                collector.data.merge_into(args.coverage)
+                print(f"覆盖数据已合并到: {args.coverage}", file=sys.stderr)
+
+    elif args.command == 'run':
+        # 直接运行源码命令
+        import os
+        from pyvm.core.cache import CompileCache
+        from pyvm.core.compiler import PyCompiler
+        from pyvm.core.interpreter import PyInterpreter
+        from pyvm.core.security import SecurityCheckError
+
+        if args.source == '-':
+            source, filename = sys.stdin.read(), '<stdin>'
+            if args.save == '':
+                run_parser.error("从标准输入读取时--save需要指定pyc路径")
+        else:
+            with open(args.source, 'r', encoding='utf-8') as f:
+                source = f.read()
+            filename = args.source
+        persist_to = args.save
+        if persist_to == '':
+            persist_to = os.path.splitext(args.source)[0] + '.pyc'
+
+        if args.engine == 'compare':
+            # 对比模式：客户代码的输出不显示，只输出各引擎的耗时
+            from pyvm.core.engines import compare_engines
+            if not args.no_check:
+                from pyvm.core.security import CodeSecurityChecker
+                is_safe, issues = CodeSecurityChecker().check_code(source, filename)
+                if not is_safe:
+                    print("源码未通过安全检查（可使用--no-check跳过）:", file=sys.stderr)
+                    for issue in issues:
+                        print(f"  - {issue}", file=sys.stderr)
+                    sys.exit(1)
+            print(compare_engines(source, filename, max(args.repeat, 1)).format())
+            return
+
+        cache = None if args.no_cache else CompileCache(args.cache_dir)
+        compiler = PyCompiler(cache=cache, opt_level=args.opt_level)
+        interpreter = PyInterpreter(args.path or [], check_security=not args.no_check, engine=args.engine)
+        try:
+            interpreter.execute_source(source, filename, compiler, persist_to=persist_to)
+            if interpreter.last_fallback is not None:
+                print(f"railgun无法执行，已改用cpython: {interpreter.last_fallback}", file=sys.stderr)
+        except SyntaxError as e:
+            print(f"语法错误: {e}", file=sys.stderr)
+            sys.exit(1)
+        except SecurityCheckError as e:
+            print("源码未通过安全检查（可使用--no-check跳过）:", file=sys.stderr)
+            for issue in e.issues:
+                print(f"  - {issue}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if args.timings and interpreter.last_timings is not None:
+                print(f"耗时: {interpreter.last_timings.format()}", file=sys.stderr)
+            if persist_to is not None:
+                try:
+                    compiler.flush()
+                except OSError as e:
+                    print(f"保存pyc文件失败: {e}", file=sys.stderr)
+
+    elif args.command == 'coverage':
+        # 覆盖率报告命令
+        from pyvm.core.coverage import CoverageData
+        print(CoverageData.load(args.data_file).format_report(args.show_missing))
+
+    elif args.command == 'bench':
+        # 基准测试命令
+        from pyvm.core.bench import BenchResults, compare, run_benchmarks
+
+        thresholds = {}
+        for item in args.metric_threshold or []:
+            prefix, _, percent = item.partition('=')
+            try:
+                thresholds[prefix] = float(percent) / 100
+            except ValueError:
+                bench_parser.error(f"无效的阈值: {item}")
+        baseline = BenchResults.load(args.baseline) if args.baseline else None
+
+        results = run_benchmarks(args.repeat, on_progress=lambda stage: print(f"正在测试: {stage}", file=sys.stderr))
+        if args.output == '-':
+            import json
+            print(json.dumps(results.to_dict(), ensure_ascii=False, indent=2, sort_keys=True))
+        else:
+            print(results.format_table())
+            if args.output:
+                results.save(args.output)
+                print(f"结果已保存到: {args.output}")
+
+        if baseline is not None:
+            comparisons = compare(results, baseline, args.threshold / 100, thresholds)
+            print("\n与基线比较:", file=sys.stderr)
+            for comparison in comparisons:
+                print(comparison.format(), file=sys.stderr)
+            regressions = [comparison for comparison in comparisons if comparison.regressed]
+            if regressions:
+                print(f"发现{len(regressions)}项性能回归", file=sys.stderr)
+                sys.exit(1)
+
+    elif args.command == 'serve':
+        # 服务命令
+        import asyncio
+        from pyvm.core.server import PyVMServer
+
+        server = PyVMServer(args.socket, args.jobs, args.max_pending, args.preload or [], args.path or [],
+                            not args.no_check, args.cache_dir, not args.no_cache)
+        print(f"pyvm服务已启动: {server.socket_path}", flush=True)
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
 
     if args.command == 'gui':
+        import tkinter as tk
         from pyvm.gui.main_window import PyVMGUI
         root = tk.Tk()
         app = PyVMGUI(root)
@@ -0,0 +1,74 @@
+import ast
+from typing import List
+
+
+def import_names(node) -> List[str]:
+    """提取单个导入节点的导入记录
+
+    返回完整模块名。相对导入保留层级前缀（如"..pkg.mod"）；
+    from导入同时记录"模块.名称"，以便解析到子模块。
+    """
+    if isinstance(node, ast.Import):
+        return [name.name for name in node.names]
+
+    prefix = '.' * node.level
+    base = prefix + (node.module or '')
+    names = [base]
+    for name in node.names:
+        if name.name != '*':
+            names.append(f"{base}.{name.name}" if node.module else base + name.name)
+    return names
+
+
+class SourceAnalysis:
+    """单次解析得到的源码分析结果，可直接从AST编译"""
+
+    def __init__(self, source: str, filename: str, tree: ast.AST, imports: set, issues: List[str]):
+        self.source = source
+        self.filename = filename
+        self.tree = tree
+        self.imports = imports
+        self.issues = issues
+
+    @property
+    def is_safe(self) -> bool:
+        return not self.issues
+
+    def compile(self):
+        """从已解析的AST编译代码对象，无需再次解析源码"""
+        return compile(self.tree, self.filename, 'exec')
+
+
+def analyze_tree(tree: ast.AST, source: str, filename: str = "<string>", checker=None) -> SourceAnalysis:
+    """在一次遍历中完成导入提取和安全规则检查（规则按节点类型分派）"""
+    imports = set()
+    dispatch = checker.rule_set.dispatch if checker is not None else {}
+    context = checker.new_context() if checker is not None else None
+
+    for node in ast.walk(tree):
+        node_type = type(node)
+        if node_type is ast.Import or node_type is ast.ImportFrom:
+            imports.update(import_names(node))
+        handlers = dispatch.get(node_type)
+        if handlers:
+            for handler in handlers:
+                handler(node, context)
+
+    issues = checker.finish(context) if checker is not None else []
+    return SourceAnalysis(source, filename, tree, imports, issues)
+
+
+def analyze_source(source: str, filename: str = "<string>", checker=None, timings=None) -> SourceAnalysis:
+    """解析源码并分析，语法错误时抛出SyntaxError
+
+    timings为Timings对象时记录parse和analyze两个阶段的耗时
+    """
+    if timings is None:
+        tree = ast.parse(source, filename=filename)
+        return analyze_tree(tree, source, filename, checker)
+    with timings.span('parse'):
+        tree = ast.parse(source, filename=filename)
+    # 导入提取和安全规则在同一次遍历中完成，合并为一个阶段
+    with timings.span('analyze'):
+        return analyze_tree(tree, source, filename, checker)
+
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from pyvm.core.forkserver import ExecutionResult, ForkServer
+
+# 一个批量任务：(pyc文件路径, 超时秒数)
+BatchJob = Tuple[str, Optional[float]]
+
+
+def read_manifest(manifest_path: str) -> List[BatchJob]:
+    """读取任务清单
+
+    每行一个任务：直接写pyc路径，或写JSON对象{"path": ..., "timeout": ...}。
+    空行和以#开头的行被忽略，相对路径相对于清单文件所在目录。
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('{'):
+                try:
+                    entry = json.loads(line)
+                    path, timeout = entry['path'], entry.get('timeout')
+                except (ValueError, KeyError) as e:
+                    raise ValueError(f"任务清单第{lineno}行格式错误: {e}")
+            else:
+                path, timeout = line, None
+            jobs.append((os.path.join(base_dir, path), timeout))
+    return jobs
+
+
+class BatchReport:
+    """批量执行的汇总结果"""
+
+    def __init__(self):
+        self.results: List[ExecutionResult] = []
+        self.elapsed = 0.0
+
+    @property
+    def failed(self) -> List[ExecutionResult]:
+        return [result for result in self.results if not result.ok]
+
+    def summary_dict(self) -> dict:
+        return {
+            'jobs': len(self.results),
+            'failed': len(self.failed),
+            'elapsed': round(self.elapsed, 3),
+        }
+
+    def summary(self) -> str:
+        return (f"执行任务: {len(self.results)}，失败: {len(self.failed)}，"
+                f"耗时: {self.elapsed:.2f}s")
+
+
+def run_batch(jobs: Iterable[BatchJob], workers: Optional[int] = None, timeout: Optional[float] = None,
+              preload: Iterable[str] = (), module_paths: Optional[List[str]] = None,
+              check_security: bool = True,
+              on_result: Optional[Callable[[ExecutionResult], None]] = None) -> BatchReport:
+    """在隔离子进程中并行执行一批pyc文件
+
+    所有任务共用一个zygote进程，最多同时运行workers个子进程。on_result在
+    每个任务结束时（按完成顺序）于调用线程中被调用，可用于流式输出结果。
+
+    Args:
+        jobs: (路径, 超时)列表，超时为None时使用timeout参数
+        workers: 并发数，默认等于CPU核数
+        timeout: 默认的单任务超时（秒）
+    """
+    jobs = list(jobs)
+    workers = max(1, workers or os.cpu_count() or 1)
+    report = BatchReport()
+    start = time.perf_counter()
+    with ForkServer(preload, module_paths, check_security) as server, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(server.execute_pyc, path, job_timeout if job_timeout is not None else timeout)
+                   for path, job_timeout in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            report.results.append(result)
+            if on_result is not None:
+                on_result(result)
+    report.elapsed = time.perf_counter() - start
+    return report
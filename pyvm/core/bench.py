@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import statistics
+import subprocess
+import tempfile
+from typing import Callable, Dict, List, Optional
+
+BENCH_FORMAT = 1
+
+# 默认回归阈值：比基线差10%以上视为回归
+DEFAULT_THRESHOLD = 0.10
+
+# 生成语料的规模（函数个数）
+CORPUS_SIZES = {'small': 20, 'medium': 400, 'huge': 4000}
+
+# 导入密集脚本使用的标准库模块（均可通过安全检查）
+IMPORT_HEAVY_MODULES = (
+    'json', 're', 'collections', 'itertools', 'functools', 'math', 'datetime', 'decimal',
+    'fractions', 'statistics', 'string', 'textwrap', 'heapq', 'bisect', 'dataclasses',
+    'enum', 'typing', 'difflib', 'html', 'uuid',
+)
+
+CPU_BOUND_SOURCE = '''\
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+def sieve(limit):
+    flags = [True] * (limit + 1)
+    flags[0] = flags[1] = False
+    for i in range(2, int(limit ** 0.5) + 1):
+        if flags[i]:
+            for j in range(i * i, limit + 1, i):
+                flags[j] = False
+    return sum(flags)
+
+
+total = 0
+for i in range(200000):
+    total += i % 7
+__result__ = (fib(20), sieve(200000), total)
+'''
+
+
+def _generated_module(functions: int) -> str:
+    """生成包含指定数量函数和类的模块源码"""
+    lines = ['"""pyvm基准测试生成的模块"""', 'import math', '', 'SCALE = 3', '']
+    for i in range(functions):
+        lines.extend([
+            f'def func_{i}(x, y=2):',
+            f'    """函数{i}"""',
+            f'    total = 0',
+            f'    for k in range(x):',
+            f'        if k % SCALE == {i % 3}:',
+            f'            total += k * y + {i}',
+            f'        else:',
+            f'            total -= math.floor(k / (y + 1))',
+            f'    return total',
+            '',
+        ])
+        if i % 10 == 0:
+            lines.extend([
+                f'class Item{i}:',
+                f'    def __init__(self, value):',
+                f'        self.value = value',
+                '',
+                f'    def scaled(self):',
+                f'        return [self.value * n for n in range(SCALE)]',
+                '',
+            ])
+    lines.append(f'__result__ = sum(func_{i}(10) for i in range({min(functions, 50)}))')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_corpus(directory: str) -> Dict[str, str]:
+    """在目录中生成基准测试语料，返回{名称: 源文件路径}"""
+    sources = {name: _generated_module(count) for name, count in CORPUS_SIZES.items()}
+    sources['imports'] = ''.join(f'import {name}\n' for name in IMPORT_HEAVY_MODULES) + '__result__ = 1\n'
+    sources['cpu'] = CPU_BOUND_SOURCE
+    paths = {}
+    for name, source in sources.items():
+        path = os.path.join(directory, f'{name}.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        paths[name] = path
+    return paths
+
+
+def _subprocess_env() -> dict:
+    """子进程的环境变量，保证能导入当前的pyvm包"""
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    python_path = os.environ.get('PYTHONPATH')
+    return dict(os.environ, PYTHONPATH=package_root + (os.pathsep + python_path if python_path else ''))
+
+
+def _measure(func: Callable[[], None], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+class BenchResults:
+    """基准测试结果，每项指标记录数值、单位和优劣方向"""
+
+    def __init__(self, metrics: Optional[Dict[str, dict]] = None, environment: Optional[dict] = None):
+        self.metrics: Dict[str, dict] = metrics or {}
+        self.environment = environment or {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        }
+
+    def record(self, name: str, value: float, unit: str, higher_is_better: bool = False) -> None:
+        self.metrics[name] = {'value': value, 'unit': unit, 'better': 'higher' if higher_is_better else 'lower'}
+
+    def record_timings(self, name: str, timings: List[float]) -> None:
+        """以中位数记录耗时，同时保留最小值"""
+        self.record(name, statistics.median(timings), 's')
+        self.metrics[name]['min'] = min(timings)
+
+    def to_dict(self) -> dict:
+        return {'version': BENCH_FORMAT, 'environment': self.environment, 'metrics': self.metrics}
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> 'BenchResults':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != BENCH_FORMAT:
+            raise ValueError(f"不支持的基准测试结果版本: {data.get('version')}")
+        return cls(data['metrics'], data.get('environment'))
+
+    def format_table(self) -> str:
+        lines = [f"{'指标':<32} {'数值':>16}"]
+        for name in sorted(self.metrics):
+            metric = self.metrics[name]
+            lines.append(f"{name:<32} {_format_value(metric['value'], metric['unit']):>16}")
+        return '\n'.join(lines)
+
+
+def _format_value(value: float, unit: str) -> str:
+    if unit == 's':
+        return f"{value * 1000:.3f}ms"
+    if unit == 'B':
+        return f"{value / 1024 / 1024:.2f}MB"
+    if unit == 'B/s':
+        return f"{value / 1024 / 1024:.2f}MB/s"
+    return f"{value:.2f}{unit}"
+
+
+class Comparison:
+    """单项指标与基线的比较结果"""
+
+    def __init__(self, name: str, baseline: float, current: float, unit: str, better: str, threshold: float):
+        self.name = name
+        self.baseline = baseline
+        self.current = current
+        self.unit = unit
+        self.better = better
+        self.threshold = threshold
+
+    @property
+    def change(self) -> float:
+        """相对变化，正数表示变好"""
+        if not self.baseline:
+            return 0.0
+        delta = (self.current - self.baseline) / self.baseline
+        return delta if self.better == 'higher' else -delta
+
+    @property
+    def regressed(self) -> bool:
+        return self.change < -self.threshold
+
+    def format(self) -> str:
+        status = '回归' if self.regressed else ('改进' if self.change > self.threshold else '持平')
+        return (f"{self.name:<32} {_format_value(self.baseline, self.unit):>14} -> "
+                f"{_format_value(self.current, self.unit):>14} {self.change * 100:+7.1f}%  {status}")
+
+
+def compare(current: BenchResults, baseline: BenchResults, threshold: float = DEFAULT_THRESHOLD,
+            thresholds: Optional[Dict[str, float]] = None) -> List[Comparison]:
+    """与基线比较
+
+    thresholds按指标名前缀指定阈值（如{"execute.cold": 0.2}），最长匹配优先。
+    """
+    thresholds = thresholds or {}
+    results = []
+    for name in sorted(current.metrics):
+        if name not in baseline.metrics:
+            continue
+        metric = current.metrics[name]
+        prefixes = [prefix for prefix in thresholds if name == prefix or name.startswith(prefix + '.')]
+        limit = thresholds[max(prefixes, key=len)] if prefixes else threshold
+        results.append(Comparison(name, baseline.metrics[name]['value'], metric['value'],
+                                  metric['unit'], metric['better'], limit))
+    return results
+
+
+def run_benchmarks(repeat: int = 5, work_dir: Optional[str] = None,
+                   on_progress: Optional[Callable[[str], None]] = None) -> BenchResults:
+    """运行内置基准测试
+
+    Args:
+        repeat: 每项测试的重复次数，结果取中位数
+        work_dir: 语料目录，默认使用临时目录并在结束后删除
+        on_progress: 每开始一组测试时调用
+    """
+    from pyvm.core.compiler import PyCompiler
+    from pyvm.core.interpreter import PyInterpreter
+    from pyvm.core.loader import CodeObjectCache, load_pyc
+    from pyvm.core.security import CodeSecurityChecker
+
+    progress = on_progress or (lambda text: None)
+    results = BenchResults()
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='pyvm-bench-')
+    try:
+        sources = generate_corpus(work_dir)
+        sizes = {name: os.path.getsize(path) for name, path in sources.items()}
+
+        # 编译吞吐量（不使用编译缓存）
+        progress("编译")
+        compiler = PyCompiler()
+        pycs = {}
+        total_time = 0.0
+        for name, path in sources.items():
+            pycs[name] = os.path.splitext(path)[0] + '.pyc'
+            timings = _measure(lambda: compiler.compile_file(path, pycs[name]), repeat)
+            results.record_timings(f'compile.{name}', timings)
+            total_time += statistics.median(timings)
+        results.record('compile.throughput', sum(sizes.values()) / total_time, 'B/s', higher_is_better=True)
+
+        # 源码安全扫描吞吐量
+        progress("安全扫描")
+        checker = CodeSecurityChecker()
+        total_time = 0.0
+        for name, path in sources.items():
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            timings = _measure(lambda: checker.check_code(source, path), repeat)
+            results.record_timings(f'scan.{name}', timings)
+            total_time += statistics.median(timings)
+        results.record('scan.throughput', sum(sizes.values()) / total_time, 'B/s', higher_is_better=True)
+
+        # pyc加载延迟：冷加载不使用缓存，热加载命中代码对象缓存
+        progress("pyc加载")
+        cache = CodeObjectCache()
+        for name in CORPUS_SIZES:
+            results.record_timings(f'load.cold.{name}', _measure(lambda: load_pyc(pycs[name]), repeat))
+            load_pyc(pycs[name], cache)
+            results.record_timings(f'load.warm.{name}', _measure(lambda: load_pyc(pycs[name], cache), repeat))
+
+        # 执行延迟：冷执行为新进程中的完整命令行调用，热执行为同一解释器中的重复执行
+        progress("执行")
+        env = _subprocess_env()
+        for name in ('cpu', 'imports', 'medium'):
+            command = [sys.executable, '-m', 'pyvm', 'execute', pycs[name]]
+            results.record_timings(f'execute.cold.{name}', _measure(
+                lambda: subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True), repeat))
+
+            interpreter = PyInterpreter(trace_memory=True)
+            interpreter.execute_pyc(pycs[name])
+            results.record('memory.peak.' + name, interpreter.last_timings.peak_memory, 'B')
+            interpreter.trace_memory = False
+            results.record_timings(f'execute.warm.{name}',
+                                   _measure(lambda: interpreter.execute_pyc(pycs[name]), repeat))
+
+        try:
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux上单位为KB，macOS上为字节
+            results.record('memory.max_rss', max_rss if sys.platform == 'darwin' else max_rss * 1024, 'B')
+        except ImportError:
+            pass
+        return results
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
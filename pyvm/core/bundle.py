@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import zipfile
+import importlib.abc
+import importlib.util
+from typing import Dict, List, Optional
+
+from pyvm.core.depgraph import module_name_for
+from pyvm.core.pyc import load_code
+from pyvm.core.tree import TreeCompileReport, compile_tree, iter_source_files
+
+# 压缩包内的模块索引
+INDEX_NAME = '__pyvm__/index.json'
+BUNDLE_VERSION = 1
+
+
+def build_bundle(source_root: str, output_path: str, main: Optional[str] = None,
+                 excludes: Optional[List[str]] = None, workers: Optional[int] = None,
+                 cache_dir: Optional[str] = None, use_cache: bool = True,
+                 compress: bool = False, opt_level: int = 0) -> TreeCompileReport:
+    """将目录编译为pyc并打包为带模块索引的归档
+
+    Args:
+        source_root: 源码根目录，目录结构即包结构
+        output_path: 输出的.pyz文件
+        main: 入口模块名，默认为根目录下的__main__（若存在）
+        compress: 是否压缩（默认只存储，加载时无需解压）
+        opt_level: 优化级别（0-2）
+
+    Returns:
+        编译汇总结果；存在编译失败的文件时不生成归档
+    """
+    build_dir = tempfile.mkdtemp(prefix='pyvm-bundle-')
+    try:
+        report = compile_tree(source_root, build_dir, excludes, workers, cache_dir, use_cache,
+                              opt_level=opt_level)
+        if report.errors:
+            return report
+
+        modules: Dict[str, dict] = {}
+        for source_path in iter_source_files(source_root, excludes):
+            rel_path = os.path.relpath(source_path, source_root).replace(os.sep, '/')
+            name, is_package = module_name_for(rel_path)
+            modules[name] = {
+                'path': os.path.splitext(rel_path)[0] + '.pyc',
+                'package': is_package,
+            }
+
+        if main is None and '__main__' in modules:
+            main = '__main__'
+        if main is not None and main not in modules:
+            raise ValueError(f"入口模块不存在: {main}")
+
+        index = {'version': BUNDLE_VERSION, 'main': main, 'modules': modules}
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        tmp_output = output_path + '.tmp'
+        with zipfile.ZipFile(tmp_output, 'w', compression) as archive:
+            archive.writestr(INDEX_NAME, json.dumps(index, ensure_ascii=False, sort_keys=True))
+            for name in sorted(modules):
+                arcname = modules[name]['path']
+                archive.write(os.path.join(build_dir, arcname), arcname)
+        os.replace(tmp_output, output_path)
+        return report
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+class Bundle:
+    """打开的pyc归档，按需读取并反序列化模块"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._archive = zipfile.ZipFile(path)
+        self._lock = threading.Lock()
+        try:
+            index = json.loads(self._archive.read(INDEX_NAME))
+        except KeyError:
+            self._archive.close()
+            raise ValueError(f"不是有效的pyvm归档（缺少模块索引）: {path}")
+        if index.get('version') != BUNDLE_VERSION:
+            self._archive.close()
+            raise ValueError(f"不支持的归档版本: {index.get('version')}")
+        self.main: Optional[str] = index.get('main')
+        self.modules: Dict[str, dict] = index['modules']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        self._archive.close()
+
+    def read(self, name: str) -> bytes:
+        """读取模块对应的pyc文件内容"""
+        with self._lock:
+            return self._archive.read(self.modules[name]['path'])
+
+    def origin(self, name: str) -> str:
+        return f"{self.path}/{self.modules[name]['path']}"
+
+
+class BundleFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """直接从归档中提供模块的查找器，模块在首次导入时才反序列化"""
+
+    def __init__(self, bundle: Bundle, security_checker=None):
+        self.bundle = bundle
+        self.security_checker = security_checker
+        self.loaded: List[str] = []
+
+    def find_spec(self, fullname, path=None, target=None):
+        info = self.bundle.modules.get(fullname)
+        if info is None:
+            return None
+        spec = importlib.util.spec_from_loader(fullname, self, origin=self.bundle.origin(fullname),
+                                               is_package=info['package'])
+        spec.has_location = True
+        if info['package']:
+            spec.submodule_search_locations = []
+        return spec
+
+    def create_module(self, spec):
+        return None
+
+    def get_code(self, fullname):
+        data = self.bundle.read(fullname)
+        _, code_object = load_code(data)
+        if self.security_checker is not None:
+            from pyvm.core.security import SecurityCheckError
+            is_safe, issues = self.security_checker.check_pyc_bytes(data, code_object)
+            if not is_safe:
+                raise SecurityCheckError(f"模块{fullname}未通过安全检查: {'; '.join(issues)}", issues)
+        return code_object
+
+    def exec_module(self, module):
+        code_object = self.get_code(module.__spec__.name)
+        module.__file__ = module.__spec__.origin
+        self.loaded.append(module.__spec__.name)
+        exec(code_object, module.__dict__)
+
+    def install(self) -> None:
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        """移除查找器，并卸载从归档导入的模块"""
+        try:
+            sys.meta_path.remove(self)
+        except ValueError:
+            pass
+        for name in self.loaded:
+            sys.modules.pop(name, None)
+        self.loaded.clear()
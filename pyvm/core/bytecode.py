@@ -0,0 +1,150 @@
+import dis
+import sys
+import types
+from typing import Iterator, List, Optional, Tuple
+
+# 操作码（当前版本不存在的指令为None）
+_op = dis.opmap.get
+EXTENDED_ARG = _op('EXTENDED_ARG')
+CACHE = _op('CACHE')
+LOAD_CONST = _op('LOAD_CONST')
+IMPORT_NAME = _op('IMPORT_NAME')
+IMPORT_FROM = _op('IMPORT_FROM')
+LOAD_ATTR = _op('LOAD_ATTR')
+LOAD_METHOD = _op('LOAD_METHOD')
+LOAD_NAME = _op('LOAD_NAME')
+LOAD_GLOBAL = _op('LOAD_GLOBAL')
+LOAD_FAST = _op('LOAD_FAST')
+STORE_FAST = _op('STORE_FAST')
+STORE_OPS = {op for op in (_op('STORE_NAME'), _op('STORE_GLOBAL'), STORE_FAST) if op is not None}
+CALL_OPS = {op for op in (_op('CALL'), _op('CALL_KW'), _op('CALL_FUNCTION'), _op('CALL_FUNCTION_KW'),
+                          _op('CALL_FUNCTION_EX'), _op('CALL_METHOD')) if op is not None}
+# 不影响名称链识别的辅助指令
+SKIP_OPS = {op for op in (CACHE, _op('PUSH_NULL'), _op('PRECALL'), _op('NOP')) if op is not None}
+
+# 3.11起LOAD_GLOBAL、3.12起LOAD_ATTR的参数低位是标志位
+GLOBAL_SHIFT = 1 if sys.version_info >= (3, 11) else 0
+ATTR_SHIFT = 1 if sys.version_info >= (3, 12) else 0
+
+
+def iter_ops(code_bytes: bytes) -> Iterator[Tuple[int, int]]:
+    """遍历字节码，返回(操作码, 参数)，已合并EXTENDED_ARG"""
+    ext = 0
+    for i in range(0, len(code_bytes) - 1, 2):
+        op = code_bytes[i]
+        arg = code_bytes[i + 1] | ext
+        if op == EXTENDED_ARG:
+            ext = arg << 8
+            continue
+        ext = 0
+        yield op, arg
+
+
+def iter_code_objects(code: types.CodeType) -> Iterator[types.CodeType]:
+    """遍历代码对象及co_consts中嵌套的所有代码对象"""
+    stack = [code]
+    while stack:
+        current = stack.pop()
+        yield current
+        for const in current.co_consts:
+            if isinstance(const, types.CodeType):
+                stack.append(const)
+
+
+class BytecodeFacts:
+    """从字节码中提取的导入和名称引用"""
+
+    def __init__(self):
+        # (模块名, fromlist)，import语句的fromlist为None
+        self.imports: List[Tuple[str, Optional[tuple]]] = []
+        # 名称链，如('os', 'system')，别名已还原为模块名
+        self.references: List[Tuple[str, ...]] = []
+        # open调用前加载过的字符串常量，用于判断打开模式
+        self.call_strings: List[Tuple[Tuple[str, ...], List[str]]] = []
+
+
+def extract_facts(code: types.CodeType, interesting: Optional[frozenset] = None) -> BytecodeFacts:
+    """对代码对象做一次操作码遍历，提取导入和属性访问链，不做反编译
+
+    interesting非空时，co_names与之（及已知的导入别名）不相交的代码对象直接跳过。
+    导入别名在所有嵌套代码对象间共享，模块级的别名在函数体内同样可以还原。
+    """
+    facts = BytecodeFacts()
+    aliases = {}
+    for current in iter_code_objects(code):
+        if interesting is not None and interesting.isdisjoint(current.co_names) \
+                and aliases.keys().isdisjoint(current.co_names):
+            continue
+        _scan_code(current, facts, aliases)
+    return facts
+
+
+def _scan_code(code: types.CodeType, facts: BytecodeFacts, aliases: dict) -> None:
+    names = code.co_names
+    varnames = code.co_varnames
+    consts = code.co_consts
+
+    chain: List[str] = []
+    # 最近加载的两个常量，用于识别导入的层级和fromlist
+    prev_const = last_const = None
+    pending_import: Optional[str] = None
+    from_form = False
+    pending_alias: Optional[Tuple[str, ...]] = None
+    open_call: Optional[Tuple[Tuple[str, ...], List[str]]] = None
+
+    def flush():
+        nonlocal chain, open_call
+        if chain:
+            parts = tuple(chain)
+            root = aliases.get(parts[0])
+            if root is not None:
+                parts = root + parts[1:]
+            facts.references.append(parts)
+            if parts == ('open',):
+                open_call = (parts, [])
+            chain = []
+
+    for op, arg in iter_ops(code.co_code):
+        if op in SKIP_OPS:
+            continue
+
+        if op == LOAD_ATTR or (LOAD_METHOD is not None and op == LOAD_METHOD):
+            if chain:
+                shift = ATTR_SHIFT if op == LOAD_ATTR else 0
+                chain.append(names[arg >> shift])
+                continue
+        flush()
+
+        if op == LOAD_CONST:
+            prev_const, last_const = last_const, consts[arg]
+            if open_call is not None and isinstance(last_const, str):
+                open_call[1].append(last_const)
+        elif op == LOAD_NAME:
+            chain = [names[arg]]
+        elif op == LOAD_GLOBAL:
+            chain = [names[arg >> GLOBAL_SHIFT]]
+        elif op == LOAD_FAST:
+            chain = [varnames[arg]]
+        elif op == IMPORT_NAME:
+            level = prev_const if isinstance(prev_const, int) else 0
+            pending_import = '.' * level + names[arg]
+            from_form = last_const is not None
+            facts.imports.append((pending_import, tuple(last_const) if from_form else None))
+            # import a.b 绑定的是顶层包a
+            pending_alias = None if from_form or level else (pending_import.split('.')[0],)
+        elif op == IMPORT_FROM and pending_import is not None:
+            name = names[arg]
+            if from_form:
+                pending_alias = tuple(pending_import.split('.')) + (name,)
+            else:
+                # import a.b as c 通过IMPORT_FROM逐级取属性
+                pending_alias = tuple(pending_import.split('.'))
+        elif op in STORE_OPS:
+            if pending_alias is not None and not pending_alias[0].startswith('.'):
+                target = (varnames if op == STORE_FAST else names)[arg]
+                aliases[target] = pending_alias
+            pending_alias = None
+        elif op in CALL_OPS and open_call is not None:
+            facts.call_strings.append(open_call)
+            open_call = None
+    flush()
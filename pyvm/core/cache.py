@@ -0,0 +1,169 @@
+import os
+import hashlib
+import marshal
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+from pyvm.core.pyc import MAGIC_NUMBER
+
+# 默认缓存上限：256MB
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# 淘汰时清理到上限的比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+
+def default_cache_dir() -> str:
+    """获取默认缓存根目录，可通过环境变量PYVM_CACHE_DIR覆盖"""
+    cache_dir = os.environ.get('PYVM_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pyvm')
+
+
+class CompileCache:
+    """基于源码内容哈希的持久化编译缓存
+
+    缓存键由解释器魔数、编译文件名和源码内容共同决定（文件名会写入代码对象的
+    co_filename），缓存值为导入模块列表和marshal序列化后的代码对象。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = os.path.join(cache_dir or default_cache_dir(), 'compile')
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._current_size = None
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, source_bytes: bytes, filename: str, *extra) -> str:
+        """计算缓存键"""
+        h = hashlib.sha256()
+        h.update(MAGIC_NUMBER)
+        h.update(os.fsencode(filename))
+        for item in extra:
+            h.update(b'\0')
+            h.update(str(item).encode('utf-8'))
+        h.update(b'\0')
+        h.update(source_bytes)
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.bin')
+
+    def get(self, key: str) -> Optional[Tuple[list, bytes, Optional[dict]]]:
+        """读取缓存项，返回(导入模块列表, 代码对象数据, 附加信息)，未命中返回None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                imports, code_data, metadata = marshal.loads(f.read())
+            # 更新修改时间，作为LRU淘汰依据
+            os.utime(path)
+        except (OSError, ValueError, EOFError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return list(imports), code_data, metadata
+
+    def put(self, key: str, imports, code_data: bytes, metadata: Optional[dict] = None) -> None:
+        """写入缓存项（原子替换，可供多进程同时使用）
+
+        metadata为可marshal的附加信息（如优化统计），随缓存项一起返回。
+        """
+        path = self._entry_path(key)
+        payload = marshal.dumps((tuple(imports), code_data, metadata))
+        entry_dir = os.path.dirname(path)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if self._current_size is None:
+                self._current_size = self._scan_size()
+            else:
+                self._current_size += len(payload) - old_size
+            if self._current_size > self.max_size:
+                self._evict()
+
+    def _iter_entries(self):
+        """遍历所有缓存项，返回(路径, stat结果)"""
+        try:
+            buckets = list(os.scandir(self.cache_dir))
+        except OSError:
+            return
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            try:
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith('.bin'):
+                        try:
+                            yield entry.path, entry.stat()
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _scan_size(self) -> int:
+        return sum(st.st_size for _, st in self._iter_entries())
+
+    def _evict(self) -> None:
+        """按最近使用时间淘汰缓存项，直到总大小低于上限"""
+        entries = sorted(self._iter_entries(), key=lambda item: item[1].st_mtime)
+        total = sum(st.st_size for _, st in entries)
+        target = int(self.max_size * EVICT_TARGET_RATIO)
+        for path, st in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= st.st_size
+            self.evictions += 1
+        self._current_size = total
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            for path, _ in list(self._iter_entries()):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._current_size = 0
+
+    def stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            if self._current_size is None:
+                self._current_size = self._scan_size()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': self._current_size,
+                'max_size': self.max_size,
+            }
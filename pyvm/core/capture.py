@@ -0,0 +1,247 @@
+import io
+import sys
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# 默认缓冲上限：4M个字符
+DEFAULT_MAX_CHARS = 4 * 1024 * 1024
+
+# 相邻的同一输出流写入合并为一块，单块最多这么多字符
+CHUNK_SIZE = 8192
+
+# 未被读取就被挤出缓冲区的内容的提示块的流名称
+NOTICE = 'notice'
+
+Chunk = Tuple[str, str]
+
+
+class _ThreadRouter(io.TextIOBase):
+    """替换sys.stdout/sys.stderr的代理，按当前线程把写入转发到对应的目标
+
+    没有注册路由的线程（如界面主线程）仍然写到原来的流。
+    """
+
+    def __init__(self, index: int, fallback):
+        self._index = index
+        self._fallback = fallback
+
+    def _target(self):
+        route = _routes.get(_get_ident())
+        return route[self._index] if route is not None else self._fallback
+
+    def write(self, text):
+        route = _routes.get(_get_ident())
+        return (route[self._index] if route is not None else self._fallback).write(text)
+
+    def flush(self):
+        target = self._target()
+        if hasattr(target, 'flush'):
+            target.flush()
+
+    def writable(self):
+        return True
+
+    def __getattr__(self, name):
+        # encoding、fileno、isatty等属性取自原来的流
+        return getattr(self._fallback, name)
+
+
+_get_ident = threading.get_ident
+
+# 线程id -> (stdout目标, stderr目标)
+_routes: Dict[int, tuple] = {}
+_routes_lock = threading.Lock()
+_routers: Optional[tuple] = None
+_router_users = 0
+
+
+def _install_routers() -> None:
+    global _routers, _router_users
+    with _routes_lock:
+        if _router_users == 0:
+            _routers = (_ThreadRouter(0, sys.stdout), _ThreadRouter(1, sys.stderr))
+            sys.stdout, sys.stderr = _routers
+        _router_users += 1
+
+
+def _uninstall_routers() -> None:
+    global _routers, _router_users
+    with _routes_lock:
+        _router_users -= 1
+        if _router_users == 0:
+            # 期间有人替换了sys.stdout时不再恢复，避免覆盖别人的设置
+            if sys.stdout is _routers[0]:
+                sys.stdout = _routers[0]._fallback
+            if sys.stderr is _routers[1]:
+                sys.stderr = _routers[1]._fallback
+            _routers = None
+
+
+@contextmanager
+def route_thread_output(stdout, stderr=None):
+    """在上下文期间把当前线程写入sys.stdout/sys.stderr的内容转发到指定的流"""
+    thread_id = threading.get_ident()
+    _install_routers()
+    previous = _routes.get(thread_id)
+    _routes[thread_id] = (stdout, stderr if stderr is not None else stdout)
+    try:
+        yield
+    finally:
+        if previous is None:
+            _routes.pop(thread_id, None)
+        else:
+            _routes[thread_id] = previous
+        _uninstall_routers()
+
+
+class _CaptureStream(io.TextIOBase):
+    def __init__(self, capture: 'OutputCapture', name: str):
+        self._capture = capture
+        self.name = name
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            self._capture.append(self.name, text)
+        return len(text)
+
+    def writable(self):
+        return True
+
+
+class OutputCapture:
+    """流式捕获客户代码的标准输出和标准错误
+
+    写入的内容按输出流合并成块后放入有上限的环形缓冲区，消费者通过drain()
+    批量取出，或者用同步/异步迭代器逐块读取。缓冲区满时最旧的块被挤出：
+    设置了spill_path时写入该文件，否则丢弃，两种情况都会在读取时得到一个
+    NOTICE提示块。写入方从不阻塞，因此输出量再大也不会占用无限内存。
+    """
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS, spill_path: Optional[str] = None):
+        self.max_chars = max_chars
+        self.spill_path = spill_path
+        self.stdout = _CaptureStream(self, 'stdout')
+        self.stderr = _CaptureStream(self, 'stderr')
+        # 每块为[流名称, 文本片段列表, 字符数]，读取时才拼接，避免写入时反复复制字符串
+        self._chunks = deque()
+        self._size = 0
+        self._skipped = 0
+        self._spill = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # 阻塞等待输出的读者数，没有读者时写入不做通知
+        self._waiters = 0
+        # 累计写入和被挤出的字符数
+        self.total_chars = 0
+        self.spilled_chars = 0
+
+    def append(self, stream: str, text: str) -> None:
+        size = len(text)
+        with self._lock:
+            self.total_chars += size
+            chunks = self._chunks
+            last = chunks[-1] if chunks else None
+            if last is not None and last[0] == stream and last[2] < CHUNK_SIZE:
+                last[1].append(text)
+                last[2] += size
+            else:
+                chunks.append([stream, [text], size])
+            self._size += size
+            if self._size > self.max_chars:
+                while self._size > self.max_chars and len(chunks) > 1:
+                    self._evict(chunks.popleft())
+            if self._waiters:
+                self._cond.notify_all()
+
+    def _evict(self, chunk: list) -> None:
+        self._size -= chunk[2]
+        self._skipped += chunk[2]
+        self.spilled_chars += chunk[2]
+        if self.spill_path is not None:
+            if self._spill is None:
+                self._spill = open(self.spill_path, 'a', encoding='utf-8')
+            self._spill.writelines(chunk[1])
+
+    def _take(self, max_chars: Optional[int]) -> List[Chunk]:
+        result = []
+        if self._skipped:
+            where = f"，已写入{self.spill_path}" if self.spill_path is not None else ''
+            result.append((NOTICE, f"\n...（输出过多，省略了{self._skipped}个字符{where}）...\n"))
+            self._skipped = 0
+            if self._spill is not None:
+                self._spill.flush()
+        taken = 0
+        while self._chunks and (max_chars is None or taken < max_chars):
+            stream, parts, size = self._chunks.popleft()
+            self._size -= size
+            taken += size
+            result.append((stream, ''.join(parts)))
+        return result
+
+    def drain(self, max_chars: Optional[int] = None) -> List[Chunk]:
+        """取出缓冲区中的内容（不阻塞），max_chars限制本次取出的大致字符数"""
+        with self._lock:
+            return self._take(max_chars)
+
+    def close(self) -> None:
+        """标记输出结束，迭代器读完剩余内容后停止"""
+        with self._cond:
+            self._closed = True
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def redirect(self):
+        """返回上下文管理器，期间当前线程的sys.stdout/sys.stderr写入本对象"""
+        return route_thread_output(self.stdout, self.stderr)
+
+    def __iter__(self):
+        """逐块读取输出，缓冲区为空时阻塞等待，close()后读完剩余内容即结束"""
+        while True:
+            with self._cond:
+                while not self._chunks and not self._skipped and not self._closed:
+                    self._waiters += 1
+                    try:
+                        self._cond.wait()
+                    finally:
+                        self._waiters -= 1
+                chunks = self._take(None)
+                if not chunks and self._closed:
+                    return
+            yield from chunks
+
+    async def __aiter__(self):
+        """异步逐块读取输出，等待期间不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        while True:
+            chunks = self.drain()
+            if chunks:
+                for chunk in chunks:
+                    yield chunk
+                continue
+            if self._closed:
+                # close()之前写入的内容可能刚好在上一次取出之后到达
+                for chunk in self.drain():
+                    yield chunk
+                return
+            await loop.run_in_executor(None, self._wait, 0.1)
+
+    def _wait(self, timeout: float) -> None:
+        with self._cond:
+            if not self._chunks and not self._skipped and not self._closed:
+                self._waiters += 1
+                try:
+                    self._cond.wait(timeout)
+                finally:
+                    self._waiters -= 1
@@ -1,27 +1,57 @@
 import os
 import sys
-import ast
 import marshal
-import importlib.util
-import time
-import struct
-from typing import Optional
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Union
+
+from pyvm.core.analysis import SourceAnalysis, analyze_source
+from pyvm.core.cache import CompileCache
+from pyvm.core.optimizer import OptimizationReport, compile_optimized
+from pyvm.core.pyc import build_header, read_header, is_fresh
+from pyvm.core.timing import Timings
+
+# 缓存项格式版本，缓存内容变化时递增
+CACHE_FORMAT = 3
 
 
 class PyCompiler:
-    def __init__(self):
+    def __init__(self, cache: Optional[CompileCache] = None, hash_based: bool = True,
+                 security_checker=None, opt_level: int = 0, optimization_stats: bool = False):
         self.imported_modules = set()
+        # 每个源文件的导入记录（完整模块名，相对导入以"."前缀表示层级）
+        self.file_imports = {}
+        self.cache = cache
+        self.hash_based = hash_based
+        # 设置后在同一次解析中完成安全检查，结果保存在last_analysis中
+        self.security_checker = security_checker
+        self.last_analysis: Optional[SourceAnalysis] = None
+        # 最近一次编译的各阶段耗时
+        self.last_timings: Optional[Timings] = None
+        # 优化级别（0-2，见optimizer），optimization_stats为True时统计优化前后的大小和指令数
+        self.opt_level = opt_level
+        self.optimization_stats = optimization_stats
+        self.last_optimization: Optional[OptimizationReport] = None
+        # 后台写入pyc的线程（首次异步保存时创建）及尚未完成的写入
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._writer_lock = threading.Lock()
+        self._pending_writes: List[Future] = []
 
-    def compile_file(self, source_path: str, output_path: Optional[str] = None) -> str:
-        """编译Python源文件为pyc文件"""
-        with open(source_path, 'r', encoding='utf-8') as f:
-            source_code = f.read()
-
-        # 分析导入的模块
-        self._analyze_imports(source_code)
+    def compile_file(self, source_path: str, output_path: Optional[str] = None,
+                     analysis: Optional[SourceAnalysis] = None, timings: Optional[Timings] = None) -> str:
+        """编译Python源文件为pyc文件
 
-        # 编译源代码为代码对象
-        code_object = compile(source_code, source_path, 'exec')
+        analysis为调用方已完成的分析结果（如GUI编译前的安全检查），
+        与文件内容一致时直接从其AST编译，不再重复解析。
+        各阶段耗时记录在timings（未传入时新建）中，并保存到last_timings。
+        """
+        self.last_analysis = None
+        self.last_optimization = None
+        timings = Timings() if timings is None else timings
+        self.last_timings = timings
+        with timings.span('read'), open(source_path, 'rb') as f:
+            source_bytes = f.read()
 
         # 如果未指定输出路径，生成默认输出路径
         if output_path is None:
@@ -30,53 +60,202 @@ class PyCompiler:
             module_name = os.path.splitext(source_name)[0]
             output_path = os.path.join(source_dir, f"{module_name}.pyc")
 
+        # 优先从编译缓存中读取
+        cache_key = None
+        if self.cache is not None:
+            with timings.span('cache'):
+                cache_key = self.cache.make_key(source_bytes, source_path, CACHE_FORMAT, self.opt_level)
+                cached = self._cache_lookup(cache_key)
+            if cached is not None:
+                imports, code_data = cached
+                self._record_imports(source_path, imports)
+                # 输出文件已是最新时无需重写
+                with timings.span('write'):
+                    if not self._is_output_fresh(output_path, source_path, source_bytes):
+                        self._write_pyc_data(output_path, code_data, source_path, source_bytes)
+                return output_path
+
+        code_object = self._compile_to_code(source_bytes.decode('utf-8'), source_path, analysis, timings)
+        with timings.span('marshal'):
+            code_data = marshal.dumps(code_object)
+
+        if cache_key is not None:
+            with timings.span('cache'):
+                self._cache_store(cache_key, source_path, code_data)
+
         # 写入pyc文件
-        self._write_pyc_file(output_path, code_object)
+        with timings.span('write'):
+            self._write_pyc_data(output_path, code_data, source_path, source_bytes)
 
         return output_path
 
-    def _analyze_imports(self, source_code: str) -> None:
-        """分析源代码中导入的模块"""
+    def compile_source(self, source: Union[str, bytes], filename: str = "<string>",
+                       analysis: Optional[SourceAnalysis] = None, timings: Optional[Timings] = None,
+                       persist_to: Optional[str] = None):
+        """将源码直接编译为代码对象，不经过磁盘
+
+        filename用于错误信息和代码对象的co_filename，同时参与编译缓存的键。
+        persist_to不为None时在后台线程中把pyc写入该路径，调用方无需等待写入；
+        需要确认写入完成时调用flush()。
+        """
+        self.last_analysis = None
+        self.last_optimization = None
+        timings = Timings() if timings is None else timings
+        self.last_timings = timings
+        source_bytes = source.encode('utf-8') if isinstance(source, str) else source
+
+        cache_key = None
+        if self.cache is not None:
+            with timings.span('cache'):
+                cache_key = self.cache.make_key(source_bytes, filename, CACHE_FORMAT, self.opt_level)
+                cached = self._cache_lookup(cache_key)
+            if cached is not None:
+                imports, code_data = cached
+                self._record_imports(filename, imports)
+                with timings.span('marshal'):
+                    code_object = marshal.loads(code_data)
+                if persist_to is not None:
+                    self._persist_async(persist_to, code_data, filename, source_bytes)
+                return code_object
+
+        source_code = source if isinstance(source, str) else source_bytes.decode('utf-8')
+        code_object = self._compile_to_code(source_code, filename, analysis, timings)
+
+        # 只有需要缓存或保存时才序列化
+        if cache_key is not None or persist_to is not None:
+            with timings.span('marshal'):
+                code_data = marshal.dumps(code_object)
+            if cache_key is not None:
+                with timings.span('cache'):
+                    self._cache_store(cache_key, filename, code_data)
+            if persist_to is not None:
+                self._persist_async(persist_to, code_data, filename, source_bytes)
+        return code_object
+
+    def _cache_lookup(self, cache_key: str):
+        """读取缓存项并恢复其优化统计，返回(导入记录, 代码对象数据)
+
+        需要大小和指令数统计而缓存项中没有时视为未命中，重新编译。
+        """
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        imports, code_data, metadata = cached
+        if self.opt_level > 0:
+            report = (metadata or {}).get('optimization')
+            if report is None or (self.optimization_stats and report['size_before'] is None):
+                return None
+            self.last_optimization = OptimizationReport.from_dict(report)
+        return imports, code_data
+
+    def _cache_store(self, cache_key: str, source_path: str, code_data: bytes) -> None:
+        metadata = None
+        if self.last_optimization is not None:
+            metadata = {'optimization': self.last_optimization.to_dict()}
+        self.cache.put(cache_key, self.file_imports[source_path], code_data, metadata)
+
+    def _compile_to_code(self, source_code: str, source_path: str, analysis: Optional[SourceAnalysis],
+                         timings: Timings):
+        """解析（或复用已有的分析结果）并编译为代码对象，同时记录导入"""
+        # 解析一次，同时完成导入分析和安全检查
+        if analysis is None or analysis.source != source_code or analysis.filename != source_path:
+            analysis = analyze_source(source_code, source_path, self.security_checker, timings)
+        self.last_analysis = analysis
+        self._record_imports(source_path, analysis.imports)
+
+        # 直接从AST编译为代码对象
+        with timings.span('compile'):
+            if self.opt_level > 0:
+                # 优化会原地修改AST
+                code_object, self.last_optimization = compile_optimized(
+                    analysis.tree, source_path, self.opt_level, self.optimization_stats)
+            else:
+                code_object = analysis.compile()
+        return code_object
+
+    def _persist_async(self, output_path: str, code_data: bytes, source_path: str, source_bytes: bytes) -> None:
+        """提交后台写入任务，同一编译器的写入按提交顺序进行"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pyvm-pyc-writer')
+            self._pending_writes = [future for future in self._pending_writes if not future.done()]
+            self._pending_writes.append(self._writer.submit(
+                self._write_pyc_atomic, output_path, code_data, source_path, source_bytes))
+
+    def _write_pyc_atomic(self, output_path: str, code_data: bytes, source_path: str, source_bytes: bytes) -> None:
+        """先写临时文件再替换，后台写入期间其他读者不会看到不完整的pyc"""
+        directory = os.path.dirname(os.path.abspath(output_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
         try:
-            tree = ast.parse(source_code)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        self.imported_modules.add(name.name.split('.')[0])
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        self.imported_modules.add(node.module.split('.')[0])
-        except SyntaxError:
-            # 如果语法错误，无法分析导入
-            pass
-
-    def _write_pyc_file(self, output_path: str, code_object) -> None:
-        """写入pyc文件，包含正确的文件头"""
-        # 获取Python版本魔数
-        magic = importlib.util.MAGIC_NUMBER
-
-        # 创建时间戳（当前时间）
-        timestamp = int(time.time())
-
-        # 创建源文件大小（0表示未知）
-        source_size = 0
+            self._write_pyc_data(tmp_path, code_data, source_path, source_bytes)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
 
-        with open(output_path, 'wb') as f:
-            # 写入魔数
-            f.write(magic)
+    def flush(self) -> None:
+        """等待所有后台pyc写入完成，有写入失败时抛出第一个异常"""
+        with self._writer_lock:
+            pending, self._pending_writes = self._pending_writes, []
+        errors = [future.exception() for future in pending]
+        errors = [error for error in errors if error is not None]
+        if errors:
+            raise errors[0]
 
-            # 写入空字节（在Python 3.7+中用于字节顺序标记）
-            f.write(b'\r\n\0\0')
+    def _record_imports(self, source_path: str, imports) -> None:
+        """记录单个文件的导入，并汇总顶层模块名"""
+        imports = sorted(imports)
+        self.file_imports[source_path] = imports
+        for name in imports:
+            if not name.startswith('.'):
+                self.imported_modules.add(name.split('.')[0])
 
-            # 写入时间戳（4字节整数）
-            f.write(struct.pack('<I', timestamp))
+    def _is_output_fresh(self, output_path: str, source_path: str, source_bytes: bytes) -> bool:
+        """判断已有的pyc文件是否与源码一致"""
+        header = read_header(output_path)
+        if header is None or header.hash_based != self.hash_based:
+            return False
+        try:
+            source_stat = os.stat(source_path)
+        except OSError:
+            source_stat = None
+        return is_fresh(header, source_bytes, source_stat)
+
+    def write_pyc_file(self, output_path: str, code_object, source_path: Optional[str] = None,
+                       source_bytes: Optional[bytes] = None) -> None:
+        """把代码对象写入pyc文件，包含正确的文件头（文件头的规则同compile_file）"""
+        self._write_pyc_data(output_path, marshal.dumps(code_object), source_path, source_bytes)
 
-            # 写入源文件大小（4字节整数，Python 3.2+）
-            f.write(struct.pack('<I', source_size))
+    def _write_pyc_data(self, output_path: str, code_data: bytes, source_path: Optional[str] = None,
+                        source_bytes: Optional[bytes] = None) -> None:
+        """写入已序列化的代码对象
 
-            # 写入编译后的代码对象
-            marshal.dump(code_object, f)
+        默认写入PEP 552基于哈希的文件头；关闭hash_based时写入源文件的修改时间和大小。
+        """
+        if self.hash_based and source_bytes is not None:
+            header = build_header(source_bytes)
+        else:
+            mtime, source_size = 0, 0
+            if source_path is not None:
+                try:
+                    source_stat = os.stat(source_path)
+                    mtime, source_size = source_stat.st_mtime, source_stat.st_size
+                except OSError:
+                    pass
+            header = build_header(mtime=mtime, source_size=source_size, hash_based=False)
+
+        with open(output_path, 'wb') as f:
+            f.write(header)
+            f.write(code_data)
 
     def get_imported_modules(self) -> set:
         """获取分析到的导入模块"""
-        return self.imported_modules
\ No newline at end of file
+        return self.imported_modules
+
+    def get_file_imports(self, source_path: str) -> list:
+        """获取指定源文件的导入记录"""
+        return self.file_imports.get(source_path, [])
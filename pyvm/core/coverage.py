@@ -0,0 +1,248 @@
+import os
+import sys
+import marshal
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from pyvm.core.bytecode import iter_code_objects
+
+COVERAGE_FORMAT = 1
+
+# 单个代码对象的覆盖数据：(可执行行, 已执行行)
+CodeLines = Tuple[frozenset, frozenset]
+
+
+def code_key(code) -> str:
+    """代码对象在覆盖数据中的标识"""
+    return f"{getattr(code, 'co_qualname', code.co_name)}:{code.co_firstlineno}"
+
+
+def executable_lines(code) -> frozenset:
+    """代码对象自身（不含嵌套代码对象）的可执行行"""
+    lines = {line for _, _, line in code.co_lines() if line}
+    # 函数首个RESUME指令位于def行，不会产生LINE事件
+    if code.co_name != '<module>':
+        lines.discard(code.co_firstlineno)
+    return frozenset(lines)
+
+
+class FileCoverage:
+    """单个pyc文件（按内容哈希区分）的覆盖数据"""
+
+    def __init__(self, digest: str, filename: str, code: Optional[Dict[str, CodeLines]] = None):
+        self.digest = digest
+        self.filename = filename
+        self.code: Dict[str, CodeLines] = code or {}
+
+    def merge(self, code: Dict[str, CodeLines]) -> None:
+        for key, (executable, hit) in code.items():
+            old = self.code.get(key)
+            if old is not None:
+                executable = old[0] | executable
+                hit = old[1] | hit
+            self.code[key] = (frozenset(executable), frozenset(hit))
+
+    @property
+    def executable(self) -> frozenset:
+        return frozenset().union(*(lines for lines, _ in self.code.values()))
+
+    @property
+    def hit(self) -> frozenset:
+        return frozenset().union(*(lines for _, lines in self.code.values()))
+
+    @property
+    def missing(self) -> List[int]:
+        return sorted(self.executable - self.hit)
+
+    @property
+    def percent(self) -> float:
+        executable = self.executable
+        if not executable:
+            return 100.0
+        return 100.0 * len(self.hit & executable) / len(executable)
+
+    def unexecuted_code(self) -> List[str]:
+        """从未执行过的代码对象（函数、类体等）"""
+        return sorted(key for key, (_, hit) in self.code.items() if not hit)
+
+
+class CoverageData:
+    """覆盖数据集合，可合并多次执行的结果
+
+    磁盘格式为marshal序列化的字典，按pyc文件内容的sha256索引，每个代码对象
+    只保存可执行行和已执行行两个frozenset。
+    """
+
+    def __init__(self):
+        self.files: Dict[str, FileCoverage] = {}
+
+    def add(self, digest: str, filename: str, code: Dict[str, CodeLines]) -> None:
+        entry = self.files.get(digest)
+        if entry is None:
+            entry = self.files[digest] = FileCoverage(digest, filename)
+        entry.merge(code)
+
+    def update(self, other: 'CoverageData') -> None:
+        for digest, entry in other.files.items():
+            self.add(digest, entry.filename, entry.code)
+
+    def to_marshal(self) -> bytes:
+        return marshal.dumps({
+            'version': COVERAGE_FORMAT,
+            'files': {digest: {'filename': entry.filename, 'code': entry.code}
+                      for digest, entry in self.files.items()},
+        })
+
+    @classmethod
+    def from_marshal(cls, data: bytes) -> 'CoverageData':
+        raw = marshal.loads(data)
+        if not isinstance(raw, dict) or raw.get('version') != COVERAGE_FORMAT:
+            raise ValueError("不支持的覆盖数据格式")
+        result = cls()
+        for digest, entry in raw['files'].items():
+            result.files[digest] = FileCoverage(digest, entry['filename'], dict(entry['code']))
+        return result
+
+    @classmethod
+    def load(cls, path: str) -> 'CoverageData':
+        """读取覆盖数据文件，文件不存在时返回空数据"""
+        try:
+            with open(path, 'rb') as f:
+                return cls.from_marshal(f.read())
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path: str) -> None:
+        """原子地写入覆盖数据文件"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.to_marshal())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def merge_into(self, path: str) -> 'CoverageData':
+        """与磁盘上已有的数据合并后写回，多个进程同时合并时通过文件锁串行化"""
+        import fcntl
+        with open(path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = CoverageData.load(path)
+            merged.update(self)
+            merged.save(path)
+        return merged
+
+    def format_report(self, show_missing: bool = False) -> str:
+        """格式化为文本报告"""
+        entries = sorted(self.files.values(), key=lambda entry: (entry.filename, entry.digest))
+        lines = [f"{'文件':<50} {'行数':>6} {'已执行':>6} {'覆盖率':>7}"]
+        total_executable = total_hit = 0
+        for entry in entries:
+            executable, hit = entry.executable, entry.hit & entry.executable
+            total_executable += len(executable)
+            total_hit += len(hit)
+            lines.append(f"{entry.filename:<50} {len(executable):>6} {len(hit):>6} {entry.percent:>6.1f}%")
+            if show_missing:
+                missing = entry.missing
+                if missing:
+                    lines.append(f"    未执行的行: {_format_ranges(missing)}")
+                unexecuted = entry.unexecuted_code()
+                if unexecuted:
+                    lines.append(f"    未执行的代码对象: {', '.join(unexecuted)}")
+        percent = 100.0 * total_hit / total_executable if total_executable else 100.0
+        lines.append(f"{'合计':<50} {total_executable:>6} {total_hit:>6} {percent:>6.1f}%")
+        return '\n'.join(lines)
+
+
+def _format_ranges(numbers: List[int]) -> str:
+    """将[1, 2, 3, 7]格式化为"1-3, 7" """
+    ranges = []
+    start = prev = numbers[0]
+    for number in numbers[1:]:
+        if number != prev + 1:
+            ranges.append(f"{start}-{prev}" if start != prev else str(start))
+            start = number
+        prev = number
+    ranges.append(f"{start}-{prev}" if start != prev else str(start))
+    return ', '.join(ranges)
+
+
+class CoverageCollector:
+    """基于sys.monitoring LINE事件的行覆盖收集器
+
+    只在被执行pyc的代码对象上开启局部LINE事件，每个位置第一次命中后回调返回
+    DISABLE将其关闭，之后的执行不再产生任何开销。每次收集前调用restart_events
+    重新开启上次被关闭的位置。使用COVERAGE_ID，与性能分析器互不干扰。
+    """
+
+    def __init__(self):
+        if not hasattr(sys, 'monitoring'):
+            raise RuntimeError("行覆盖收集需要Python 3.12及以上版本（sys.monitoring）")
+        self.data = CoverageData()
+        self._tool = sys.monitoring.COVERAGE_ID
+        self._hits: Dict[int, set] = {}
+        self._lock = threading.Lock()
+        self._active = False
+
+    def _on_line(self, code, line):
+        hits = self._hits.get(id(code))
+        if hits is not None:
+            hits.add(line)
+        return sys.monitoring.DISABLE
+
+    def collect(self, code_object, digest: str, filename: Optional[str] = None):
+        """返回在执行code_object期间收集覆盖数据的上下文管理器"""
+        return _Collection(self, code_object, digest, filename or code_object.co_filename)
+
+    def _start(self, code_objects) -> None:
+        monitoring = sys.monitoring
+        with self._lock:
+            if self._active:
+                raise RuntimeError("覆盖收集不支持嵌套执行")
+            monitoring.use_tool_id(self._tool, 'pyvm-coverage')
+            self._active = True
+        monitoring.register_callback(self._tool, monitoring.events.LINE, self._on_line)
+        monitoring.restart_events()
+        self._hits = {id(code): set() for code in code_objects}
+        for code in code_objects:
+            monitoring.set_local_events(self._tool, code, monitoring.events.LINE)
+
+    def _stop(self, code_objects, digest: str, filename: str) -> None:
+        monitoring = sys.monitoring
+        for code in code_objects:
+            monitoring.set_local_events(self._tool, code, 0)
+        monitoring.register_callback(self._tool, monitoring.events.LINE, None)
+        monitoring.free_tool_id(self._tool)
+        with self._lock:
+            self._active = False
+        result = {}
+        for code in code_objects:
+            executable = executable_lines(code)
+            key = code_key(code)
+            old = result.get(key)
+            hit = frozenset(self._hits[id(code)])
+            result[key] = (executable | old[0], hit | old[1]) if old else (executable, hit)
+        self._hits = {}
+        self.data.add(digest, filename, result)
+
+
+class _Collection:
+    def __init__(self, collector: CoverageCollector, code_object, digest: str, filename: str):
+        self.collector = collector
+        # 持有代码对象的引用，保证id在收集期间有效
+        self.code_objects = list(iter_code_objects(code_object))
+        self.digest = digest
+        self.filename = filename
+
+    def __enter__(self):
+        self.collector._start(self.code_objects)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.collector._stop(self.code_objects, self.digest, self.filename)
@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import tempfile
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 依赖图文件默认名称
+GRAPH_FILENAME = '.pyvm_deps.json'
+
+GRAPH_VERSION = 1
+
+
+def file_hash(path: str) -> str:
+    """计算文件内容的sha256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def module_name_for(rel_path: str) -> Tuple[str, bool]:
+    """根据相对路径计算模块名，返回(模块名, 是否为包)"""
+    parts = os.path.splitext(rel_path.replace(os.sep, '/'))[0].split('/')
+    if parts[-1] == '__init__':
+        return '.'.join(parts[:-1]), True
+    return '.'.join(parts), False
+
+
+def resolve_import(raw_name: str, module_name: str, is_package: bool) -> Optional[str]:
+    """将导入记录解析为绝对模块名，相对导入超出顶层包时返回None"""
+    stripped = raw_name.lstrip('.')
+    level = len(raw_name) - len(stripped)
+    if level == 0:
+        return raw_name
+
+    package = module_name if is_package else module_name.rpartition('.')[0]
+    parts = package.split('.') if package else []
+    if level - 1 > len(parts):
+        return None
+    base = parts[:len(parts) - (level - 1)]
+    if stripped:
+        base.append(stripped)
+    return '.'.join(base) or None
+
+
+class DependencyGraph:
+    """按文件记录的本地模块依赖图
+
+    每个文件保存源码哈希、原始导入记录和解析到的本地依赖文件（相对路径），
+    以JSON格式持久化，用于增量编译时计算需要重建的文件。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, dict] = {}
+        # 影响编译结果的选项（如优化级别），变化时需要全部重建
+        self.options: Dict[str, object] = {}
+
+    @classmethod
+    def load(cls, root: str, path: str) -> 'DependencyGraph':
+        """加载依赖图，文件不存在或格式不符时返回空图"""
+        graph = cls(root)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == GRAPH_VERSION:
+                graph.files = data.get('files', {})
+                graph.options = data.get('options', {})
+        except (OSError, ValueError):
+            pass
+        return graph
+
+    def save(self, path: str) -> None:
+        """原子写入依赖图"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': GRAPH_VERSION, 'files': self.files, 'options': self.options}, f, ensure_ascii=False,
+                      indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def rel_path(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def update(self, rel_path: str, digest: Optional[str], imports: Iterable[str]) -> None:
+        """记录文件编译后的哈希和导入，digest为None表示需要重新编译"""
+        self.files[rel_path] = {'hash': digest, 'imports': sorted(imports), 'deps': []}
+
+    def remove(self, rel_path: str) -> None:
+        self.files.pop(rel_path, None)
+
+    def resolve_all(self) -> None:
+        """根据当前文件集合重新解析每个文件的本地依赖"""
+        index = {module_name_for(rel)[0]: rel for rel in self.files}
+        for rel, entry in self.files.items():
+            entry['deps'] = self._resolve_deps(rel, entry.get('imports', []), index)
+
+    def _resolve_deps(self, rel_path: str, imports: Iterable[str], index: Dict[str, str]) -> List[str]:
+        module_name, is_package = module_name_for(rel_path)
+        deps = set()
+        for raw_name in imports:
+            name = resolve_import(raw_name, module_name, is_package)
+            # 导入子模块时，其上级包也会被导入
+            while name:
+                dep = index.get(name)
+                if dep is not None and dep != rel_path:
+                    deps.add(dep)
+                name = name.rpartition('.')[0]
+        return sorted(deps)
+
+    def dependents(self) -> Dict[str, List[str]]:
+        """构建反向依赖表：文件 -> 依赖它的文件列表"""
+        reverse: Dict[str, List[str]] = {}
+        for rel, entry in self.files.items():
+            for dep in entry.get('deps', []):
+                reverse.setdefault(dep, []).append(rel)
+        return reverse
+
+    def plan_rebuild(self, current: Dict[str, str], missing_outputs: Iterable[str] = ()) -> Dict[str, str]:
+        """计算需要重建的文件及原因
+
+        Args:
+            current: 当前源文件 相对路径 -> 源码哈希
+            missing_outputs: 输出pyc缺失的相对路径
+
+        Returns:
+            相对路径 -> 重建原因
+        """
+        reasons: Dict[str, str] = {}
+        for rel in sorted(current):
+            entry = self.files.get(rel)
+            if entry is None:
+                reasons[rel] = "新文件"
+            elif entry.get('hash') is None:
+                reasons[rel] = "上次编译失败"
+            elif entry['hash'] != current[rel]:
+                reasons[rel] = "源文件已修改"
+        for rel in missing_outputs:
+            reasons.setdefault(rel, "输出文件缺失")
+
+        removed = [rel for rel in self.files if rel not in current]
+
+        # 依赖集合变化（新增或删除的模块改变了导入解析结果）
+        index = {module_name_for(rel)[0]: rel for rel in current}
+        for rel in sorted(current):
+            entry = self.files.get(rel)
+            if entry is None or rel in reasons:
+                continue
+            new_deps = self._resolve_deps(rel, entry.get('imports', []), index)
+            if new_deps != entry.get('deps', []):
+                reasons[rel] = "依赖的本地模块发生变化"
+
+        # 沿反向依赖传播
+        reverse = self.dependents()
+        queue = deque(list(reasons) + removed)
+        while queue:
+            rel = queue.popleft()
+            cause = "已删除" if rel in removed else "已重建"
+            for dependent in reverse.get(rel, []):
+                if dependent in current and dependent not in reasons:
+                    reasons[dependent] = f"依赖 {rel} {cause}"
+                    queue.append(dependent)
+        return reasons
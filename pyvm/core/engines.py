@@ -0,0 +1,286 @@
+import os
+import re
+import time
+import atexit
+import shutil
+import signal
+import tempfile
+import threading
+import importlib
+from typing import List, Optional
+
+from pyvm.core.forkserver import MAX_CAPTURED_OUTPUT, ExecutionResult, _exit_code
+from pyvm.core.railgun_codegen import (HEADER_SIZE, OVERFLOW_MARKER, UnsupportedCode, compile_source, empty_module,
+                                       is_railgun_pyc)
+
+# 可选的执行引擎，auto按代码格式自动选择
+ENGINES = ('auto', 'cpython', 'railgun')
+
+# railgun虚拟机启动时从工作目录加载lib/builtin.pyc；该环境变量指定包含lib目录的目录，
+# 未设置时使用自动生成的空内置模块
+RAILGUN_HOME_ENV = 'PYVM_RAILGUN_HOME'
+
+# 等待原生子进程结束的轮询间隔（秒），只在设置了超时时使用
+_POLL_INTERVAL = 0.005
+
+# railgun虚拟机在标准输出中打印的调试信息，返回输出前去掉
+_DIAGNOSTIC_LINE = re.compile(
+    r"(expand an array to \d+, size is \d+|\S.*'s mro is .*|magic number is 0x[0-9a-f]+|moddate is 0x[0-9a-f]+"
+    r"|flags is 0x[0-9a-f]+|parse OK!|got a code object|parser, unrecognized type : .|gc starting\.\.\."
+    r"|  befroe gc : |  after gc : |  eden's capacity is \d+|gc end)\n?")
+
+
+class EngineUnavailable(RuntimeError):
+    """所选引擎无法执行给定的代码"""
+
+
+def strip_diagnostics(text: str) -> str:
+    """去掉railgun虚拟机打印的调试信息行"""
+    return ''.join(line for line in text.splitlines(keepends=True) if not _DIAGNOSTIC_LINE.fullmatch(line))
+
+
+class RailgunEngine:
+    """railgun原生虚拟机后端
+
+    虚拟机以pybind11扩展提供，执行CPython 2.7格式的pyc；源码需要先经
+    railgun_codegen编译，只支持其中的语法子集。虚拟机出错时会直接终止进程，
+    因此每次执行都在fork出的子进程中进行，输出通过临时文件取回。
+    """
+
+    def __init__(self, home: Optional[str] = None):
+        self._home = home or os.environ.get(RAILGUN_HOME_ENV)
+        self._module = None
+        self._lock = threading.Lock()
+
+    def unavailable_reason(self) -> Optional[str]:
+        """引擎在当前环境中不可用的原因，可用时返回None"""
+        if not hasattr(os, 'fork'):
+            return "当前平台不支持fork，无法隔离执行railgun虚拟机"
+        try:
+            self._load()
+        except ImportError as e:
+            return f"无法加载railgun扩展: {e}"
+        return None
+
+    def _load(self):
+        # 扩展按需在父进程中导入，子进程直接使用
+        if self._module is None:
+            self._module = importlib.import_module('pyvm.core.railgun')
+        return self._module
+
+    @property
+    def home(self) -> str:
+        """虚拟机运行时的工作目录，其中的lib/builtin.pyc在启动时加载"""
+        with self._lock:
+            if self._home is None:
+                home = tempfile.mkdtemp(prefix='pyvm-railgun-')
+                os.mkdir(os.path.join(home, 'lib'))
+                with open(os.path.join(home, 'lib', 'builtin.pyc'), 'wb') as f:
+                    f.write(empty_module())
+                atexit.register(shutil.rmtree, home, True)
+                self._home = home
+            return self._home
+
+    def compile(self, source: str, filename: str = "<string>") -> bytes:
+        """把源码编译为railgun格式的pyc内容，不支持的语法抛出EngineUnavailable"""
+        try:
+            return compile_source(source, filename)
+        except UnsupportedCode as e:
+            raise EngineUnavailable(str(e)) from e
+
+    def execute_source(self, source: str, filename: str = "<string>",
+                       timeout: Optional[float] = None) -> ExecutionResult:
+        """编译并在子进程中执行源码"""
+        data = self.compile(source, filename)
+        fd, path = tempfile.mkstemp(suffix='.pyc', prefix='pyvm-railgun-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            result = self.execute_pyc(path, timeout)
+        finally:
+            os.unlink(path)
+        result.path = filename
+        return result
+
+    def execute_pyc(self, pyc_path: str, timeout: Optional[float] = None) -> ExecutionResult:
+        """在fork出的子进程中执行railgun格式的pyc"""
+        reason = self.unavailable_reason()
+        if reason is not None:
+            raise EngineUnavailable(reason)
+        path = os.path.abspath(pyc_path)
+        with open(path, 'rb') as f:
+            if not is_railgun_pyc(f.read(HEADER_SIZE)):
+                raise EngineUnavailable(f"不是railgun格式的pyc: {pyc_path}")
+
+        home = self.home
+        result = ExecutionResult(path)
+        with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+            start = time.perf_counter()
+            pid = os.fork()
+            if pid == 0:
+                self._run_child(path, home, stdout_file, stderr_file)
+            result.pid = pid
+            status = self._wait(pid, timeout)
+            result.duration = time.perf_counter() - start
+            if status is None:
+                result.error = f"执行超时（{timeout}s）"
+                status = os.waitpid(pid, 0)[1]
+            result.exit_status = _exit_code(status)
+            result.stdout = strip_diagnostics(self._read_output(stdout_file))
+            result.stderr = self._read_output(stderr_file)
+
+        if OVERFLOW_MARKER in result.stdout and result.exit_status != 0 and result.error is None:
+            result.error = "整数运算结果超出32位，railgun虚拟机无法正确表示"
+
+        if result.exit_status < 0 and result.error is None:
+            result.error = f"railgun虚拟机异常终止（信号{-result.exit_status}）"
+        elif result.exit_status != 0 and result.error is None:
+            result.error = f"railgun虚拟机异常退出，状态码: {result.exit_status}"
+        return result
+
+    def _run_child(self, path: str, home: str, stdout_file, stderr_file) -> None:
+        """子进程：切换到虚拟机的工作目录，重定向输出后执行"""
+        code = 0
+        try:
+            os.chdir(home)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(stdout_file.fileno(), 1)
+            os.dup2(stderr_file.fileno(), 2)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            self._module.interpreter(path)
+        except BaseException as e:
+            os.write(2, f"{type(e).__name__}: {e}\n".encode('utf-8', errors='replace'))
+            code = 1
+        finally:
+            # 虚拟机用C标准库输出，os._exit不会刷新其缓冲区
+            try:
+                import ctypes
+                ctypes.CDLL(None).fflush(None)
+            except Exception:
+                pass
+            os._exit(code)
+
+    @staticmethod
+    def _wait(pid: int, timeout: Optional[float]) -> Optional[int]:
+        """等待子进程结束并返回状态，超时时结束子进程并返回None"""
+        if timeout is None:
+            return os.waitpid(pid, 0)[1]
+        deadline = time.perf_counter() + timeout
+        while True:
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                return status
+            if time.perf_counter() >= deadline:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                return None
+            time.sleep(_POLL_INTERVAL)
+
+    @staticmethod
+    def _read_output(file) -> str:
+        file.seek(0)
+        data = file.read(MAX_CAPTURED_OUTPUT + 1)
+        text = data[:MAX_CAPTURED_OUTPUT].decode('utf-8', errors='replace')
+        if len(data) > MAX_CAPTURED_OUTPUT:
+            text += "\n...（输出过长，已截断）"
+        return text
+
+
+_railgun = None
+_railgun_lock = threading.Lock()
+
+
+def get_railgun_engine() -> RailgunEngine:
+    """进程内共享的railgun引擎"""
+    global _railgun
+    with _railgun_lock:
+        if _railgun is None:
+            _railgun = RailgunEngine()
+    return _railgun
+
+
+class EngineTiming:
+    """对比模式下一个引擎的执行结果"""
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self.times: List[float] = []
+        self.stdout = ''
+        self.error: Optional[str] = None
+
+    @property
+    def best(self) -> Optional[float]:
+        return min(self.times) if self.times else None
+
+
+class EngineComparison:
+    """同一段源码在各引擎上的执行结果"""
+
+    def __init__(self, filename: str, timings: List[EngineTiming]):
+        self.filename = filename
+        self.timings = timings
+
+    @property
+    def outputs_match(self) -> bool:
+        outputs = {timing.stdout for timing in self.timings if timing.error is None}
+        return len(outputs) <= 1
+
+    def format(self) -> str:
+        lines = [f"引擎对比: {self.filename}"]
+        for timing in self.timings:
+            if timing.error is not None:
+                lines.append(f"  {timing.engine:<8} 无法执行: {timing.error}")
+            else:
+                runs = len(timing.times)
+                lines.append(f"  {timing.engine:<8} 最快 {timing.best * 1000:.3f}ms（共{runs}次）")
+        finished = [timing for timing in self.timings if timing.error is None]
+        if len(finished) > 1:
+            fastest = min(finished, key=lambda timing: timing.best)
+            lines.append(f"  最快的引擎: {fastest.engine}")
+            if not self.outputs_match:
+                lines.append("  警告: 各引擎的输出不一致")
+        return '\n'.join(lines)
+
+
+def compare_engines(source: str, filename: str = "<string>", repeat: int = 3,
+                    timeout: Optional[float] = None) -> EngineComparison:
+    """分别用CPython和railgun执行源码repeat次，记录每次的耗时和输出
+
+    调用方负责事先完成安全检查。CPython的耗时只包括执行，railgun的耗时包括
+    fork子进程和虚拟机启动，两者的编译都不计入。
+    """
+    from pyvm.core.capture import OutputCapture
+    from pyvm.core.compiler import PyCompiler
+    from pyvm.core.interpreter import PyInterpreter
+
+    cpython = EngineTiming('cpython')
+    try:
+        code_object = PyCompiler().compile_source(source, filename)
+        for _ in range(repeat):
+            capture = OutputCapture()
+            interpreter = PyInterpreter(check_security=False, capture=capture, engine='cpython')
+            try:
+                interpreter.execute_code_object(code_object)
+            finally:
+                capture.close()
+            cpython.times.append(interpreter.last_timings.stages.get('exec', 0.0))
+            cpython.stdout = ''.join(text for stream, text in capture.drain() if stream == 'stdout')
+    except (SyntaxError, RuntimeError) as e:
+        cpython.error = str(e)
+
+    railgun = EngineTiming('railgun')
+    engine = get_railgun_engine()
+    try:
+        for _ in range(repeat):
+            result = engine.execute_source(source, filename, timeout)
+            if not result.ok:
+                raise EngineUnavailable(result.error)
+            railgun.times.append(result.duration)
+            railgun.stdout = result.stdout
+    except (EngineUnavailable, SyntaxError) as e:
+        railgun.error = str(e)
+        railgun.times.clear()
+    return EngineComparison(filename, [cpython, railgun])
@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+import threading
+import importlib.abc
+import importlib.util
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from pyvm.core.loader import load_pyc
+from pyvm.core.pyc import read_header, is_fresh
+
+# 目录列表缓存的有效期（秒），期间不再stat目录
+DEFAULT_LISTING_TTL = 1.0
+
+PYCACHE_TAG = sys.implementation.cache_tag
+
+
+class _DirListing:
+    __slots__ = ('mtime_ns', 'names', 'checked')
+
+    def __init__(self, mtime_ns: int, names: FrozenSet[str], checked: float):
+        self.mtime_ns = mtime_ns
+        self.names = names
+        self.checked = checked
+
+
+class ModulePathFinder(importlib.abc.MetaPathFinder):
+    """只在配置的模块路径中查找模块的查找器
+
+    目录内容缓存在内存中，按目录mtime失效，并且在有效期内不重复stat，
+    适合位于网络挂载路径上的库。同一模块同时存在源码和pyc时，优先使用
+    与源码一致的pyc文件（同目录下的.pyc或__pycache__中的缓存）。
+    """
+
+    def __init__(self, paths: List[str], security_checker=None, code_cache=None,
+                 listing_ttl: float = DEFAULT_LISTING_TTL):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.security_checker = security_checker
+        self.code_cache = code_cache
+        self.listing_ttl = listing_ttl
+        self._listings: Dict[str, _DirListing] = {}
+        # 由本查找器找到的包目录，其子模块也由本查找器负责
+        self._package_dirs = set()
+        # 由本查找器执行的模块名，卸载时从sys.modules中移除
+        self.loaded: List[str] = []
+        self._lock = threading.Lock()
+
+    def invalidate_caches(self):
+        with self._lock:
+            self._listings.clear()
+
+    def _list_dir(self, directory: str) -> FrozenSet[str]:
+        """获取目录内容，按mtime和有效期缓存"""
+        now = time.monotonic()
+        listing = self._listings.get(directory)
+        if listing is not None and now - listing.checked < self.listing_ttl:
+            return listing.names
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            names = frozenset()
+            mtime_ns = -1
+        else:
+            if listing is not None and listing.mtime_ns == mtime_ns:
+                listing.checked = now
+                return listing.names
+            try:
+                names = frozenset(os.listdir(directory))
+            except OSError:
+                names = frozenset()
+        with self._lock:
+            self._listings[directory] = _DirListing(mtime_ns, names, now)
+        return names
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is None:
+            search_dirs = self.paths
+        else:
+            search_dirs = [entry for entry in path if entry in self._package_dirs]
+            if not search_dirs:
+                return None
+
+        tail = fullname.rpartition('.')[2]
+        for directory in search_dirs:
+            names = self._list_dir(directory)
+
+            # 包
+            if tail in names:
+                package_dir = os.path.join(directory, tail)
+                found = self._find_in(package_dir, '__init__', self._list_dir(package_dir))
+                if found is not None:
+                    self._package_dirs.add(package_dir)
+                    return self._make_spec(fullname, found, package_dir)
+
+            # 模块
+            found = self._find_in(directory, tail, names)
+            if found is not None:
+                return self._make_spec(fullname, found, None)
+        return None
+
+    def _find_in(self, directory: str, name: str, names: FrozenSet[str]) -> Optional[Tuple[str, Optional[str]]]:
+        """在目录中查找模块文件，返回(要加载的文件, 源文件)"""
+        source = os.path.join(directory, name + '.py') if name + '.py' in names else None
+        candidates = []
+        if name + '.pyc' in names:
+            candidates.append(os.path.join(directory, name + '.pyc'))
+        if '__pycache__' in names:
+            cached_name = f"{name}.{PYCACHE_TAG}.pyc"
+            cache_dir = os.path.join(directory, '__pycache__')
+            if cached_name in self._list_dir(cache_dir):
+                candidates.append(os.path.join(cache_dir, cached_name))
+
+        if source is None:
+            # 没有源码时直接使用pyc
+            return (candidates[0], None) if candidates else None
+
+        source_bytes = None
+        try:
+            source_stat = os.stat(source)
+        except OSError:
+            return None
+        for pyc_path in candidates:
+            header = read_header(pyc_path)
+            if header is None:
+                continue
+            if header.hash_based and source_bytes is None:
+                try:
+                    with open(source, 'rb') as f:
+                        source_bytes = f.read()
+                except OSError:
+                    return None
+            if is_fresh(header, source_bytes, source_stat):
+                return pyc_path, source
+        return source, source
+
+    def _make_spec(self, fullname: str, found: Tuple[str, Optional[str]], package_dir: Optional[str]):
+        filename, source = found
+        loader = _PathLoader(self, fullname, filename, source)
+        spec = importlib.util.spec_from_file_location(
+            fullname, filename, loader=loader,
+            submodule_search_locations=[package_dir] if package_dir else None)
+        if source is not None:
+            spec.origin = source
+        spec.cached = filename if filename.endswith('.pyc') else None
+        return spec
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        """移除查找器，并卸载从模块路径导入的模块，下次执行时按文件的最新内容重新导入"""
+        try:
+            sys.meta_path.remove(self)
+        except ValueError:
+            pass
+        with self._lock:
+            loaded, self.loaded = self.loaded, []
+        for name in loaded:
+            sys.modules.pop(name, None)
+
+
+class _PathLoader(importlib.abc.Loader):
+    """加载ModulePathFinder找到的模块，pyc经过代码对象缓存和安全检查"""
+
+    def __init__(self, finder: ModulePathFinder, fullname: str, filename: str, source: Optional[str]):
+        self.finder = finder
+        self.fullname = fullname
+        self.filename = filename
+        self.source = source
+
+    def create_module(self, spec):
+        return None
+
+    def get_code(self, fullname):
+        checker = self.finder.security_checker
+        if self.filename.endswith('.pyc'):
+            loaded = load_pyc(self.filename, self.finder.code_cache)
+            code_object = loaded.code_object
+            if checker is not None:
+                is_safe, issues = checker.check_pyc_digest(loaded.digest, code_object)
+                self._raise_if_unsafe(is_safe, issues)
+            return code_object
+
+        with open(self.filename, 'rb') as f:
+            source_bytes = f.read()
+        code_object = compile(source_bytes, self.filename, 'exec', dont_inherit=True)
+        if checker is not None:
+            is_safe, issues = checker.check_code_object(code_object)
+            self._raise_if_unsafe(is_safe, issues)
+        return code_object
+
+    def _raise_if_unsafe(self, is_safe, issues):
+        if not is_safe:
+            from pyvm.core.security import SecurityCheckError
+            raise SecurityCheckError(f"模块{self.fullname}未通过安全检查: {'; '.join(issues)}", issues)
+
+    def exec_module(self, module):
+        code_object = self.get_code(module.__name__)
+        with self.finder._lock:
+            self.finder.loaded.append(module.__name__)
+        exec(code_object, module.__dict__)
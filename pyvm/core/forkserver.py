@@ -0,0 +1,393 @@
+import os
+import io
+import sys
+import time
+import pickle
+import shutil
+import signal
+import socket
+import struct
+import tempfile
+import importlib
+import selectors
+from typing import Iterable, List, Optional
+
+# 每个子进程捕获的输出上限
+MAX_CAPTURED_OUTPUT = 8 * 1024 * 1024
+
+_FRAME_HEADER = struct.Struct('!I')
+
+
+def send_frame(sock: socket.socket, obj) -> None:
+    """发送一个带长度前缀的pickle帧"""
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_FRAME_HEADER.pack(len(data)) + data)
+
+
+def recv_frame(sock: socket.socket):
+    """接收一个帧，连接关闭时返回None"""
+    header = _recv_exact(sock, _FRAME_HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exact(sock, _FRAME_HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return pickle.loads(data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _exit_code(status: int) -> int:
+    """将waitpid状态转换为退出码，被信号终止时为负的信号编号"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return status
+
+
+class ExecutionResult:
+    """隔离执行一个pyc文件的结果"""
+
+    def __init__(self, path: str, result=None, stdout: str = '', stderr: str = '',
+                 exit_status: Optional[int] = None, error: Optional[str] = None,
+                 duration: float = 0.0, pid: Optional[int] = None):
+        self.path = path
+        self.result = result
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_status = exit_status
+        self.error = error
+        self.duration = duration
+        self.pid = pid
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_status == 0 and self.error is None
+
+    def to_dict(self) -> dict:
+        result = self.result
+        if result is not None and not isinstance(result, (str, int, float, bool, list, dict)):
+            result = repr(result)
+        return {
+            'path': self.path,
+            'ok': self.ok,
+            'result': result,
+            'stdout': self.stdout,
+            'stderr': self.stderr,
+            'exit_status': self.exit_status,
+            'error': self.error,
+            'duration': round(self.duration, 6),
+        }
+
+
+class ForkServer:
+    """基于fork的隔离执行服务
+
+    启动时fork出一个zygote进程，预先导入指定模块并构建安全内置模块和解释器；
+    之后每个执行请求由zygote再fork一个子进程完成，子进程以写时复制方式共享这些
+    预热状态。子进程的崩溃或导入不会影响宿主进程，每次隔离只需一次fork。
+    """
+
+    def __init__(self, preload: Iterable[str] = (), module_paths: Optional[List[str]] = None,
+                 check_security: bool = True):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("当前平台不支持fork，无法使用隔离执行模式")
+        self.preload = list(preload)
+        self.module_paths = module_paths or []
+        self.check_security = check_security
+        self.pid = None
+        self._socket_dir = None
+        self.socket_path = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self.pid is not None
+
+    def start(self) -> None:
+        """启动zygote进程"""
+        if self.running:
+            return
+        self._socket_dir = tempfile.mkdtemp(prefix='pyvm-fork-')
+        self.socket_path = os.path.join(self._socket_dir, 'zygote.sock')
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(128)
+
+        parent_pid = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _Zygote(listener, parent_pid, self.preload, self.module_paths, self.check_security).serve()
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+
+        listener.close()
+        self.pid = pid
+
+    def stop(self) -> None:
+        """停止zygote进程，正在执行的子进程会随之收到SIGKILL"""
+        if not self.running:
+            return
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        try:
+            os.waitpid(self.pid, 0)
+        except ChildProcessError:
+            pass
+        self.pid = None
+        shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+    def execute_pyc(self, pyc_path: str, timeout: Optional[float] = None) -> ExecutionResult:
+        """在独立子进程中执行pyc文件
+
+        可以从多个线程同时调用，每个请求使用独立的连接。超时后子进程被强制结束。
+        """
+        if not self.running:
+            self.start()
+        path = os.path.abspath(pyc_path)
+        result = ExecutionResult(path)
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(self.socket_path)
+            send_frame(conn, {'op': 'execute', 'path': path})
+            while True:
+                if deadline is not None:
+                    conn.settimeout(max(0.0, deadline - time.perf_counter()))
+                try:
+                    frame = recv_frame(conn)
+                except socket.timeout:
+                    # 超时：结束子进程，继续等待zygote回收后发送的退出状态
+                    if result.pid is not None:
+                        try:
+                            os.kill(result.pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                    result.error = f"执行超时（{timeout}s）"
+                    deadline = None
+                    conn.settimeout(None)
+                    continue
+                if frame is None:
+                    if result.exit_status is None and result.error is None:
+                        result.error = "与zygote进程的连接中断"
+                    break
+
+                kind = frame.get('type')
+                if kind == 'started':
+                    result.pid = frame['pid']
+                elif kind == 'result':
+                    result.result = frame.get('result')
+                    if frame.get('error') and result.error is None:
+                        result.error = frame['error']
+                elif kind == 'exit':
+                    result.exit_status = frame['status']
+                    result.stdout = frame.get('stdout', '')
+                    result.stderr = frame.get('stderr', '')
+                    break
+                elif kind == 'error':
+                    result.error = frame.get('error')
+                    break
+
+        if result.exit_status not in (0, None) and result.error is None:
+            result.error = f"子进程异常退出，状态码: {result.exit_status}"
+        result.duration = time.perf_counter() - start
+        return result
+
+
+class _Zygote:
+    """zygote进程：预热后循环接受请求，为每个请求fork子进程"""
+
+    def __init__(self, listener: socket.socket, parent_pid: int, preload: List[str],
+                 module_paths: List[str], check_security: bool):
+        self.listener = listener
+        self.parent_pid = parent_pid
+        self.preload = preload
+        self.module_paths = module_paths
+        self.check_security = check_security
+        self.children = {}
+        self.selector = selectors.DefaultSelector()
+        self.stopping = False
+
+    def _warm_up(self) -> None:
+        from pyvm.core.interpreter import PyInterpreter, get_safe_builtins
+        for name in self.preload:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+        get_safe_builtins()
+        self.interpreter = PyInterpreter(self.module_paths, check_security=self.check_security)
+
+    def serve(self) -> None:
+        # 脱离宿主的进程组，避免终端的Ctrl+C直接结束zygote
+        os.setsid()
+        signal.signal(signal.SIGTERM, self._on_term)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self._warm_up()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+        # 子进程退出时通过SIGCHLD唤醒select，立即回收并返回结果
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.wakeup_r.setblocking(False)
+        self.wakeup_w.setblocking(False)
+        signal.set_wakeup_fd(self.wakeup_w.fileno())
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ)
+
+        while not self.stopping:
+            for key, _ in self.selector.select(timeout=0.5):
+                if key.fileobj is self.wakeup_r:
+                    try:
+                        while self.wakeup_r.recv(4096):
+                            pass
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                    continue
+                try:
+                    conn, _ = self.listener.accept()
+                except OSError:
+                    continue
+                self._handle(conn)
+            self._reap()
+            # 宿主进程退出后zygote随之退出
+            if os.getppid() != self.parent_pid:
+                break
+
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._reap(block=True)
+
+    def _on_term(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _handle(self, conn: socket.socket) -> None:
+        try:
+            conn.settimeout(5)
+            request = recv_frame(conn)
+            conn.settimeout(None)
+        except (OSError, pickle.UnpicklingError):
+            conn.close()
+            return
+        if not request or request.get('op') != 'execute':
+            try:
+                send_frame(conn, {'type': 'error', 'error': "不支持的请求"})
+            except OSError:
+                pass
+            conn.close()
+            return
+
+        stdout_file = tempfile.TemporaryFile()
+        stderr_file = tempfile.TemporaryFile()
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(conn, request['path'], stdout_file, stderr_file)
+        self.children[pid] = (conn, stdout_file, stderr_file)
+
+    def _run_child(self, conn, path, stdout_file, stderr_file) -> None:
+        """子进程：重定向输出，执行pyc并回传结果"""
+        code = 0
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            self.selector.close()
+            self.listener.close()
+            self.wakeup_r.close()
+            self.wakeup_w.close()
+            for other_conn, other_stdout, other_stderr in self.children.values():
+                other_conn.close()
+                other_stdout.close()
+                other_stderr.close()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(stdout_file.fileno(), 1)
+            os.dup2(stderr_file.fileno(), 2)
+            sys.stdout = io.TextIOWrapper(io.FileIO(1, 'w', closefd=False), write_through=True)
+            sys.stderr = io.TextIOWrapper(io.FileIO(2, 'w', closefd=False), write_through=True)
+            send_frame(conn, {'type': 'started', 'pid': os.getpid()})
+
+            frame = {'type': 'result', 'result': None, 'error': None}
+            try:
+                if path.endswith('.pyz'):
+                    value = self.interpreter.execute_pyz(path)
+                else:
+                    value = self.interpreter.execute_pyc(path)
+                try:
+                    pickle.dumps(value)
+                    frame['result'] = value
+                except Exception:
+                    frame['result'] = repr(value)
+            except Exception as e:
+                frame['error'] = f"{type(e).__name__}: {e}"
+                code = 1
+            sys.stdout.flush()
+            sys.stderr.flush()
+            send_frame(conn, frame)
+        except BaseException:
+            code = 2
+        finally:
+            os._exit(code)
+
+    def _reap(self, block: bool = False) -> None:
+        """回收已结束的子进程，并发送退出状态和捕获的输出"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            entry = self.children.pop(pid, None)
+            if entry is None:
+                continue
+            conn, stdout_file, stderr_file = entry
+            try:
+                send_frame(conn, {
+                    'type': 'exit',
+                    'status': _exit_code(status),
+                    'stdout': self._read_output(stdout_file),
+                    'stderr': self._read_output(stderr_file),
+                })
+            except OSError:
+                pass
+            finally:
+                conn.close()
+                stdout_file.close()
+                stderr_file.close()
+
+    @staticmethod
+    def _read_output(file) -> str:
+        file.seek(0)
+        data = file.read(MAX_CAPTURED_OUTPUT + 1)
+        text = data[:MAX_CAPTURED_OUTPUT].decode('utf-8', errors='replace')
+        if len(data) > MAX_CAPTURED_OUTPUT:
+            text += "\n...（输出过长，已截断）"
+        return text
@@ -1,12 +1,70 @@
 import os
 import sys
 import marshal
+import hashlib
 import types
-import zipapp
-import pyvm.core.railgun
+import threading
+from contextlib import contextmanager
+from pyvm.core.bundle import Bundle, BundleFinder
+from pyvm.core.compiler import PyCompiler
+from pyvm.core.engines import ENGINES, EngineUnavailable, get_railgun_engine
+from pyvm.core.finder import ModulePathFinder
+from pyvm.core.loader import default_code_cache, load_pyc
+from pyvm.core.natives import native_modules_installed
+from pyvm.core.profiler import Profiler
+from pyvm.core.railgun_codegen import HEADER_SIZE as RAILGUN_HEADER_SIZE, is_railgun_pyc
+from pyvm.core.timing import MemoryMonitor, Timings
+from pyvm.core.security import CodeSecurityChecker, SecurityCheckError
+
+# 从内置函数中过滤掉的危险函数
+UNSAFE_BUILTINS = ('eval', 'exec', 'open')
+
+
+class _ReadOnlyModule(types.ModuleType):
+    """构建完成后禁止修改属性的模块，用于在多个解释器间共享内置函数"""
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"安全内置模块是只读的，不能设置属性: {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"安全内置模块是只读的，不能删除属性: {name}")
+
+
+_safe_builtins = None
+_safe_builtins_lock = threading.Lock()
+
+
+def _safe_open(file, mode='r', buffering=-1, encoding=None, errors=None, newline=None):
+    if 'w' in mode or 'a' in mode:
+        raise PermissionError("写文件操作被安全限制")
+    return open(file, mode, buffering, encoding, errors, newline)
+
+
+def get_safe_builtins() -> types.ModuleType:
+    """获取过滤后的安全内置模块，进程内只构建一次并以只读方式共享"""
+    global _safe_builtins
+    if _safe_builtins is None:
+        with _safe_builtins_lock:
+            if _safe_builtins is None:
+                # 兼容__builtins__为字典或模块的情况
+                if isinstance(__builtins__, dict):
+                    builtins_dict = __builtins__
+                else:
+                    builtins_dict = vars(__builtins__)  # 获取模块的__dict__
+
+                module = _ReadOnlyModule('__builtins__')
+                # 复制原始内置函数，过滤危险函数
+                module.__dict__.update((name, obj) for name, obj in builtins_dict.items()
+                                       if name not in UNSAFE_BUILTINS)
+                module.__dict__['open'] = _safe_open
+                _safe_builtins = module
+    return _safe_builtins
+
 
 class PyInterpreter:
-    def __init__(self, module_paths=None):
+    def __init__(self, module_paths=None, security_checker=None, check_security=True, code_cache=None,
+                 reset_between_runs=True, coverage=None, memory_limit=None, trace_memory=False, capture=None,
+                 engine='auto', native_modules=True):
         self.globals = {
             '__name__': '__main__',
             '__doc__': None,
@@ -19,91 +77,306 @@ class PyInterpreter:
         self.stdout = sys.stdout
         self.stderr = sys.stderr
         self.module_paths = module_paths or []
+        # 执行pyc前默认进行字节码安全检查
+        self.check_security = check_security
+        self.security_checker = security_checker or CodeSecurityChecker()
+        # 已加载代码对象的缓存，默认使用进程内共享缓存
+        self.code_cache = default_code_cache if code_cache is None else code_cache
+        # 每次执行前恢复初始全局命名空间，避免上一次执行的变量泄漏
+        self.reset_between_runs = reset_between_runs
+        # 只在module_paths中查找的导入器，执行期间安装到sys.meta_path
+        self.path_finder = None
+        if self.module_paths:
+            self.path_finder = ModulePathFinder(
+                self.module_paths, self.security_checker if check_security else None, self.code_cache)
+
+        # 最近一次开启性能分析的执行结果（ProfileReport）
+        self.last_profile = None
+        # 行覆盖收集器（CoverageCollector），设置后每次执行都收集覆盖数据
+        self.coverage = coverage
+        # 最近一次执行的各阶段耗时（Timings），开启内存统计时包含内存峰值
+        self.last_timings = None
+        # 单次执行的内存上限（字节）；设置上限或trace_memory为True时用tracemalloc统计内存峰值
+        self.memory_limit = memory_limit
+        self.trace_memory = trace_memory
+        # 输出捕获（OutputCapture），设置后执行线程的标准输出和标准错误写入其中
+        self.capture = capture
+        # execute_source未指定编译器时使用的默认编译器
+        self._source_compiler = None
+        # 执行期间允许客户代码导入已注册的原生模块（如vecmath）
+        self.native_modules = native_modules
+        # 执行引擎：cpython在当前进程中exec；railgun优先使用原生虚拟机，无法执行时退回cpython；
+        # auto只把railgun格式的pyc交给原生虚拟机
+        if engine not in ENGINES:
+            raise ValueError(f"未知的执行引擎: {engine}")
+        self.engine = engine
+        # 最近一次执行实际使用的引擎，以及退回cpython的原因
+        self.last_engine = None
+        self.last_fallback = None
 
         # 添加安全限制的内置函数
         self._setup_safe_builtins()
+        self._baseline = None
+        self.snapshot()
 
     def _setup_safe_builtins(self):
-        """设置安全的内置函数，兼容__builtins__为字典或模块的情况"""
-        safe_builtins = {}
-
-        # 兼容__builtins__为字典或模块的情况
-        if isinstance(__builtins__, dict):
-            builtins_dict = __builtins__
-        else:
-            builtins_dict = vars(__builtins__)  # 获取模块的__dict__
-
-        # 复制原始内置函数
-        for name, obj in builtins_dict.items():
-            # 过滤危险函数
-            if name in ['eval', 'exec', 'open']:
-                continue
-            safe_builtins[name] = obj
-
-        def safe_open(file, mode='r', buffering=-1, encoding=None, errors=None, newline=None):
-            if 'w' in mode or 'a' in mode:
-                raise PermissionError("写文件操作被安全限制")
-            return open(file, mode, buffering, encoding, errors, newline)
-
-        safe_builtins['open'] = safe_open
-
-        # 替换全局内置函数
-        self.globals['__builtins__'] = types.ModuleType('__builtins__')
-        for name, obj in safe_builtins.items():
-            setattr(self.globals['__builtins__'], name, obj)
-
-    def execute_code_object(self, code_object):
+        """设置安全的内置函数（共享的只读模块，不再为每个解释器重新构建）"""
+        self.globals['__builtins__'] = get_safe_builtins()
+
+    def snapshot(self):
+        """将当前全局命名空间记录为基线，reset时恢复到此状态（浅拷贝）"""
+        self._baseline = dict(self.globals)
+
+    def reset(self):
+        """恢复到基线全局命名空间"""
+        self.globals = dict(self._baseline)
+        self.globals['__annotations__'] = {}
+
+    def _prepare_run(self):
+        if self.reset_between_runs:
+            self.reset()
+
+    @contextmanager
+    def _module_paths_installed(self):
+        """执行期间安装模块路径查找器"""
+        if self.path_finder is None:
+            yield
+            return
+        self.path_finder.install()
+        try:
+            yield
+        finally:
+            self.path_finder.uninstall()
+
+    @contextmanager
+    def _native_modules_installed(self):
+        if not self.native_modules:
+            yield
+            return
+        with native_modules_installed():
+            yield
+
+    @contextmanager
+    def _coverage_collected(self, code_object, digest, filename):
+        """开启覆盖收集时，在执行期间记录code_object中执行过的行"""
+        if self.coverage is None:
+            yield
+            return
+        if digest is None:
+            digest = hashlib.sha256(marshal.dumps(code_object)).hexdigest()
+        with self.coverage.collect(code_object, digest, filename):
+            yield
+
+    @contextmanager
+    def _output_captured(self):
+        """设置了输出捕获时，把执行线程的输出转发到捕获对象"""
+        if self.capture is None:
+            yield
+            return
+        with self.capture.redirect():
+            yield
+
+    @contextmanager
+    def _memory_monitored(self, timings):
+        """按配置统计执行期间的内存峰值并强制内存上限"""
+        if self.memory_limit is None and not self.trace_memory:
+            yield
+            return
+        monitor = MemoryMonitor(self.memory_limit)
+        try:
+            with monitor:
+                yield
+        finally:
+            timings.peak_memory = monitor.peak
+
+    def _exec(self, code_object, profile=False, digest=None, filename=None):
+        """在安全全局命名空间中执行代码对象，profile为True时记录性能分析结果"""
+        timings = self.last_timings
+        self.last_engine = 'cpython'
+        with self._output_captured(), self._module_paths_installed(), self._native_modules_installed(), \
+                self._coverage_collected(code_object, digest, filename), \
+                self._memory_monitored(timings), timings.span('exec'):
+            if not profile:
+                exec(code_object, self.globals)
+                return
+            profiler = Profiler()
+            profiler.start()
+            try:
+                exec(code_object, self.globals)
+            finally:
+                self.last_profile = profiler.stop()
+
+    def execute_code_object(self, code_object, profile=False):
         """执行Python代码对象并返回结果"""
+        self.last_timings = Timings()
+        self.last_fallback = None
+        self._prepare_run()
         try:
             # 使用初始化时设置的安全全局命名空间
-            exec(code_object, self.globals)
+            self._exec(code_object, profile)
 
             # 返回全局命名空间中的结果（如果有）
             return self.globals.get('__result__', None)
         except Exception as e:
             raise RuntimeError(f"执行代码对象失败: {str(e)}") from e
 
-    def execute_pyc(self, pyc_path):
-        """执行pyc文件并返回结果"""
+    def execute_pyc(self, pyc_path, check_security=None, profile=False):
+        """执行pyc文件并返回结果
+
+        check_security为None时使用实例的默认设置；检查不通过时抛出SecurityCheckError。
+        profile为True时进行性能分析，结果保存在last_profile中（执行失败时同样保存）；
+        加载、安全检查和执行的耗时保存在last_timings中
+        """
         if not os.path.exists(pyc_path):
             raise FileNotFoundError(f"pyc文件不存在: {pyc_path}")
 
-        with open(pyc_path, 'rb') as f:
-            # 手动解析pyc文件头部
-            magic = f.read(4)
-            if len(magic) < 4:
-                raise ValueError("无效的pyc文件")
-
-            # 跳过时间戳和其他元数据
-            if sys.version_info >= (3, 7):
-                # Python 3.7+ 有更复杂的头部
-                f.read(4)  # 时间戳
-                if sys.version_info >= (3, 8):
-                    f.read(4)  # size字段
-            else:
-                f.read(4)  # 旧版本只有时间戳
-
-            # 读取代码对象
+        timings = self.last_timings = Timings()
+        self.last_fallback = None
+        # 解析pyc文件头部（PEP 552，固定16字节）并读取代码对象，重复执行时命中缓存
+        with timings.span('load'):
             try:
-                code_object = marshal.load(f)
-            except Exception as e:
-                raise ValueError(f"解析pyc文件失败: {str(e)}") from e
+                loaded = load_pyc(pyc_path, self.code_cache)
+            except ValueError:
+                if not self._is_railgun_pyc(pyc_path):
+                    raise
+                loaded = None
+        if loaded is None:
+            return self._execute_railgun_pyc(pyc_path, check_security)
+        if self.engine == 'railgun':
+            self.last_fallback = "railgun引擎只能执行railgun格式的pyc"
+        code_object = loaded.code_object
+
+        if self.check_security if check_security is None else check_security:
+            with timings.span('security'):
+                is_safe, issues = self.security_checker.check_pyc_digest(loaded.digest, code_object)
+            if not is_safe:
+                raise SecurityCheckError(f"pyc文件未通过安全检查: {'; '.join(issues)}", issues)
 
         # 使用安全的全局命名空间执行代码
+        self._prepare_run()
         try:
-            exec(code_object, self.globals)
+            self._exec(code_object, profile, loaded.digest.hex(), os.path.abspath(pyc_path))
             return self.globals.get('__result__', None)
         except Exception as e:
             raise RuntimeError(f"执行pyc文件失败: {str(e)}") from e
 
-    def execute_pyz(self, pyz_path):
-        """执行.pyz文件并返回结果"""
+    def execute_source(self, source, filename="<string>", compiler=None, check_security=None, profile=False,
+                       persist_to=None, analysis=None, timings=None):
+        """在内存中编译并执行源码，返回结果
+
+        源码直接编译为代码对象，不写入也不读取pyc文件；安全检查与编译共用同一次解析，
+        analysis为调用方已完成的分析结果时两者都直接复用。
+        persist_to不为None时由编译器在后台线程中保存pyc，不阻塞执行。
+        解析、检查、编译和执行的耗时都记录在timings（未传入时新建）中，并保存到last_timings。
+        """
+        if isinstance(source, bytes):
+            source = source.decode('utf-8')
+        if compiler is None:
+            if self._source_compiler is None:
+                self._source_compiler = PyCompiler()
+            compiler = self._source_compiler
+
+        timings = self.last_timings = Timings() if timings is None else timings
+        self.last_fallback = None
+        if self.check_security if check_security is None else check_security:
+            if analysis is None or analysis.source != source or analysis.filename != filename:
+                analysis = self.security_checker.analyze(source, filename, timings)
+            if not analysis.is_safe:
+                raise SecurityCheckError(f"源码未通过安全检查: {'; '.join(analysis.issues)}", analysis.issues)
+        code_object = compiler.compile_source(source, filename, analysis, timings, persist_to)
+        if self.engine == 'railgun' and not profile and self.coverage is None and self._run_railgun_source(
+                source, filename):
+            return None
+
+        self._prepare_run()
+        try:
+            self._exec(code_object, profile, None, filename)
+            return self.globals.get('__result__', None)
+        except Exception as e:
+            raise RuntimeError(f"执行源码失败: {str(e)}") from e
+
+    @staticmethod
+    def _is_railgun_pyc(pyc_path) -> bool:
+        with open(pyc_path, 'rb') as f:
+            return is_railgun_pyc(f.read(RAILGUN_HEADER_SIZE))
+
+    def _emit_native_output(self, result) -> None:
+        """把原生子进程的输出写到执行线程的标准输出和标准错误"""
+        with self._output_captured():
+            sys.stdout.write(result.stdout)
+            sys.stderr.write(result.stderr)
+
+    def _run_railgun_source(self, source, filename) -> bool:
+        """尝试用railgun执行源码，不支持的语法或虚拟机崩溃时记录原因并返回False
+
+        虚拟机的输出在子进程结束后才写出，崩溃时直接丢弃，因此退回cpython重新执行不会重复输出。
+        """
+        try:
+            with self.last_timings.span('exec'):
+                result = get_railgun_engine().execute_source(source, filename)
+        except (EngineUnavailable, SyntaxError) as e:
+            self.last_fallback = str(e)
+            return False
+        if not result.ok:
+            self.last_fallback = result.error
+            return False
+        self.last_engine = 'railgun'
+        self._emit_native_output(result)
+        return True
+
+    def _execute_railgun_pyc(self, pyc_path, check_security=None):
+        """railgun格式的pyc只能交给原生虚拟机执行"""
+        if self.engine == 'cpython':
+            raise EngineUnavailable(f"railgun格式的pyc不能用cpython引擎执行: {pyc_path}")
+        if self.check_security if check_security is None else check_security:
+            issue = "railgun格式的字节码无法进行安全检查"
+            raise SecurityCheckError(f"pyc文件未通过安全检查: {issue}", [issue])
+        with self.last_timings.span('exec'):
+            result = get_railgun_engine().execute_pyc(pyc_path)
+        self.last_engine = 'railgun'
+        self._emit_native_output(result)
+        if not result.ok:
+            raise RuntimeError(f"执行pyc文件失败: {result.error}")
+        return None
+
+    def get_cache_stats(self) -> dict:
+        """获取代码对象缓存的统计信息"""
+        return self.code_cache.stats()
+
+    def execute_pyz(self, pyz_path, check_security=None, profile=False):
+        """执行.pyz归档并返回结果
+
+        归档中的模块通过BundleFinder直接从压缩包导入，首次导入时才反序列化；
+        入口模块作为__main__在解释器的全局命名空间中执行。
+        """
         if not os.path.exists(pyz_path):
             raise FileNotFoundError(f".pyz文件不存在: {pyz_path}")
 
-        try:
-            # 执行.pyz文件
-            sys.argv = [pyz_path]
+        check = self.check_security if check_security is None else check_security
+        timings = self.last_timings = Timings()
+        with Bundle(pyz_path) as bundle:
+            if bundle.main is None:
+                raise ValueError(f".pyz文件未指定入口模块: {pyz_path}")
+            finder = BundleFinder(bundle, self.security_checker if check else None)
+            # 入口模块的读取、反序列化和安全检查
+            with timings.span('load'):
+                code_object = finder.get_code(bundle.main)
 
-        except Exception as e:
-            raise RuntimeError(f"执行.pyz文件失败: {str(e)}") from e
\ No newline at end of file
+            self._prepare_run()
+            self.globals['__file__'] = bundle.origin(bundle.main)
+            old_argv = sys.argv
+            sys.argv = [pyz_path]
+            finder.install()
+            try:
+                digest = None
+                if self.coverage is not None:
+                    digest = hashlib.sha256(bundle.read(bundle.main)).hexdigest()
+                self._exec(code_object, profile, digest, self.globals['__file__'])
+                return self.globals.get('__result__', None)
+            except SecurityCheckError:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"执行.pyz文件失败: {str(e)}") from e
+            finally:
+                finder.uninstall()
+                sys.argv = old_argv
@@ -0,0 +1,123 @@
+import os
+import mmap
+import marshal
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from pyvm.core.pyc import HEADER_SIZE, MAGIC_NUMBER, PycHeader, parse_header
+
+# 默认缓存上限：512个代码对象或64MB（按pyc文件大小计）
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class LoadedCode:
+    """已加载的pyc文件"""
+
+    def __init__(self, path: str, header: PycHeader, code_object, digest: bytes, size: int):
+        self.path = path
+        self.header = header
+        self.code_object = code_object
+        # pyc文件内容的sha256，供安全检查结果缓存使用
+        self.digest = digest
+        self.size = size
+
+
+class CodeObjectCache:
+    """进程内代码对象LRU缓存
+
+    缓存键为(真实路径, mtime_ns, 文件大小, 文件头)，文件被替换或修改后自动失效。
+    同时受条目数和字节数（pyc文件大小之和）限制。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[LoadedCode]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry: LoadedCode) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# 进程内共享的默认缓存
+default_code_cache = CodeObjectCache()
+
+
+def load_pyc(pyc_path: str, cache: Optional[CodeObjectCache] = None) -> LoadedCode:
+    """加载pyc文件
+
+    先按(路径, mtime, 大小, 文件头)查缓存；未命中时将文件映射到内存，
+    直接对映射缓冲区调用marshal.loads，避免额外拷贝。
+    """
+    real_path = os.path.realpath(pyc_path)
+    with open(real_path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        header_bytes = f.read(HEADER_SIZE)
+        header = parse_header(header_bytes)
+        if header.magic != MAGIC_NUMBER:
+            raise ValueError("pyc文件与当前Python版本不匹配")
+
+        key = (real_path, st.st_mtime_ns, st.st_size, header_bytes)
+        if cache is not None:
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            try:
+                with memoryview(mapped) as view, view[HEADER_SIZE:] as body:
+                    code_object = marshal.loads(body)
+            except Exception as e:
+                raise ValueError(f"解析pyc文件失败: {str(e)}") from e
+            digest = hashlib.sha256(mapped).digest()
+
+    entry = LoadedCode(real_path, header, code_object, digest, st.st_size)
+    if cache is not None:
+        cache.put(key, entry)
+    return entry
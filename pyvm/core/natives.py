@@ -0,0 +1,124 @@
+import sys
+import types
+import threading
+import importlib
+import importlib.abc
+import importlib.util
+from contextlib import contextmanager
+from typing import Dict, Union
+
+# 客户代码可以直接导入的原生模块：模块名 -> 实现模块（模块对象或其导入路径）
+_registry: Dict[str, Union[str, types.ModuleType]] = {
+    'vecmath': 'pyvm.core.vecmath',
+}
+_registry_lock = threading.Lock()
+
+
+def register_native_module(name: str, target: Union[str, types.ModuleType]) -> None:
+    """注册客户代码可导入的原生模块，target为模块对象或其导入路径"""
+    if '.' in name:
+        raise ValueError(f"原生模块只能是顶层模块: {name}")
+    with _registry_lock:
+        _registry[name] = target
+
+
+def unregister_native_module(name: str) -> None:
+    with _registry_lock:
+        _registry.pop(name, None)
+
+
+def registered_native_modules() -> Dict[str, Union[str, types.ModuleType]]:
+    with _registry_lock:
+        return dict(_registry)
+
+
+class NativeModuleFinder(importlib.abc.MetaPathFinder):
+    """为客户代码提供已注册的原生模块
+
+    导入得到的是新的模块对象，只复制实现模块的公开属性（__all__），客户代码
+    修改模块属性不会影响宿主；所有执行结束后这些模块从sys.modules中移除，
+    下一次执行重新导入。
+    """
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None:
+            return None
+        with _registry_lock:
+            implementation = _registry.get(fullname)
+        if implementation is None:
+            return None
+        return importlib.util.spec_from_loader(fullname, _NativeLoader(implementation), origin='native')
+
+
+def _implementation_namespace(implementation: Union[str, types.ModuleType], name: str) -> dict:
+    """取得实现模块的命名空间
+
+    Python实现的模块每次都以安全内置模块为__builtins__重新执行，导出函数的
+    __globals__不是宿主的模块字典，客户代码无法经由它取得宿主的内置函数；
+    扩展模块等没有Python代码的实现直接使用已导入的模块。
+    """
+    if isinstance(implementation, str):
+        spec = importlib.util.find_spec(implementation)
+        if spec is None:
+            raise ImportError(f"找不到原生模块的实现: {implementation}")
+    else:
+        spec = implementation.__spec__
+    get_code = getattr(spec.loader, 'get_code', None) if spec is not None else None
+    code = get_code(spec.name) if get_code is not None else None
+    if code is None:
+        if isinstance(implementation, str):
+            implementation = importlib.import_module(implementation)
+        return vars(implementation)
+
+    from pyvm.core.interpreter import get_safe_builtins
+    namespace = {'__name__': name, '__builtins__': get_safe_builtins()}
+    exec(code, namespace)
+    return namespace
+
+
+class _NativeLoader(importlib.abc.Loader):
+    def __init__(self, implementation: Union[str, types.ModuleType]):
+        self.implementation = implementation
+
+    def create_module(self, spec):
+        namespace = _implementation_namespace(self.implementation, spec.name)
+        module = types.ModuleType(spec.name, namespace.get('__doc__'))
+        names = namespace.get('__all__')
+        if names is None:
+            names = [name for name in namespace if not name.startswith('_')]
+        for name in names:
+            setattr(module, name, namespace[name])
+        module.__all__ = list(names)
+        return module
+
+    def exec_module(self, module):
+        pass
+
+
+_finder = NativeModuleFinder()
+_finder_users = 0
+_finder_lock = threading.Lock()
+
+
+@contextmanager
+def native_modules_installed():
+    """在上下文期间允许导入已注册的原生模块（可嵌套、可在多个线程中同时使用）"""
+    global _finder_users
+    with _finder_lock:
+        if _finder_users == 0:
+            sys.meta_path.append(_finder)
+        _finder_users += 1
+    try:
+        yield
+    finally:
+        with _finder_lock:
+            _finder_users -= 1
+            if _finder_users == 0:
+                try:
+                    sys.meta_path.remove(_finder)
+                except ValueError:
+                    pass
+                for name, module in list(sys.modules.items()):
+                    spec = getattr(module, '__spec__', None)
+                    if spec is not None and isinstance(spec.loader, _NativeLoader):
+                        del sys.modules[name]
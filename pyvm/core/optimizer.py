@@ -0,0 +1,413 @@
+import ast
+import marshal
+import operator
+from typing import Dict, List, Optional, Set
+
+from pyvm.core.bytecode import CACHE, iter_code_objects, iter_ops
+
+# 优化级别：
+#   0 不优化
+#   1 去除assert，折叠绑定到字面量的名称，删除条件恒定的分支
+#   2 在1的基础上去除文档字符串；声明了__all__的模块中删除顶层未使用的from导入
+MAX_OPT_LEVEL = 2
+
+# 折叠结果的大小上限，避免在编译期生成巨大的常量
+_MAX_FOLDED_INT_BITS = 4096
+_MAX_FOLDED_SEQ_LEN = 4096
+
+_BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.Pow: operator.pow, ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_, ast.BitXor: operator.xor, ast.BitAnd: operator.and_,
+}
+_UNARY_OPS = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert}
+_COMPARE_OPS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Is: operator.is_, ast.IsNot: operator.is_not,
+    ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b,
+}
+_LITERAL_TYPES = (int, float, complex, str, bytes, bool, type(None))
+_TRY_NODES = (ast.Try, ast.TryStar) if hasattr(ast, 'TryStar') else (ast.Try,)
+
+# 出现这些调用时模块命名空间可能被动态访问，不做名称折叠和导入删除
+_DYNAMIC_NAMESPACE_CALLS = {'globals', 'locals', 'vars', 'dir', 'eval', 'exec', '__import__'}
+
+
+def _is_literal(node) -> bool:
+    return isinstance(node, ast.Constant) and type(node.value) in _LITERAL_TYPES
+
+
+def _small_enough(value) -> bool:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value.bit_length() <= _MAX_FOLDED_INT_BITS
+    if isinstance(value, (str, bytes)):
+        return len(value) <= _MAX_FOLDED_SEQ_LEN
+    return True
+
+
+def _position(node):
+    return (getattr(node, 'lineno', 0), getattr(node, 'col_offset', 0))
+
+
+def _end_position(node):
+    return (getattr(node, 'end_lineno', 0) or 0, getattr(node, 'end_col_offset', 0) or 0)
+
+
+class _BindingCollector(ast.NodeVisitor):
+    """统计整个模块（所有作用域）中每个名称被绑定的次数和被读取的情况"""
+
+    def __init__(self):
+        self.bindings: Dict[str, int] = {}
+        self.loads: Set[str] = set()
+        self.dynamic = False
+        self.star_import = False
+
+    def _bind(self, name: Optional[str]) -> None:
+        if name:
+            self.bindings[name] = self.bindings.get(name, 0) + 1
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.loads.add(node.id)
+        else:
+            self._bind(node.id)
+
+    def visit_arg(self, node):
+        self._bind(node.arg)
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        self._bind(node.name)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._bind(node.name)
+        self.generic_visit(node)
+
+    def visit_alias(self, node):
+        if node.name == '*':
+            self.star_import = True
+        else:
+            self._bind(node.asname or node.name.split('.')[0])
+
+    def visit_ExceptHandler(self, node):
+        self._bind(node.name)
+        self.generic_visit(node)
+
+    def visit_Global(self, node):
+        for name in node.names:
+            self._bind(name)
+
+    visit_Nonlocal = visit_Global
+
+    def visit_MatchAs(self, node):
+        self._bind(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchStar(self, node):
+        self._bind(node.name)
+
+    def visit_MatchMapping(self, node):
+        self._bind(node.rest)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id in _DYNAMIC_NAMESPACE_CALLS:
+            self.dynamic = True
+        self.generic_visit(node)
+
+
+def _binds_names(nodes: List[ast.AST]) -> bool:
+    """语句块中是否包含名称绑定、yield/await或作用域声明（删除后会改变作用域语义）"""
+    for stmt in nodes:
+        for node in ast.walk(stmt):
+            if isinstance(node, (ast.Yield, ast.YieldFrom, ast.Await, ast.Global, ast.Nonlocal,
+                                 ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Import,
+                                 ast.ImportFrom, ast.ExceptHandler, ast.arg)):
+                return True
+            if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+                return True
+            if isinstance(node, ast.NamedExpr):
+                return True
+    return False
+
+
+class _Optimizer(ast.NodeTransformer):
+    """常量折叠和死分支删除"""
+
+    def __init__(self, constants: Dict[str, tuple], report: 'OptimizationReport'):
+        # 名称 -> (字面量, 绑定语句的结束位置)
+        self.constants = constants
+        self.report = report
+        self.function_depth = 0
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load) and node.id in self.constants:
+            value, bound_at = self.constants[node.id]
+            if _position(node) > bound_at:
+                self.report.names_folded += 1
+                return ast.copy_location(ast.Constant(value), node)
+        return node
+
+    def _fold(self, node, compute):
+        try:
+            value = compute()
+        except Exception:
+            return node
+        if type(value) not in _LITERAL_TYPES or not _small_enough(value):
+            return node
+        self.report.expressions_folded += 1
+        return ast.copy_location(ast.Constant(value), node)
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        func = _BINARY_OPS.get(type(node.op))
+        if func is None or not (_is_literal(node.left) and _is_literal(node.right)):
+            return node
+        left, right = node.left.value, node.right.value
+        # 幂运算和移位可能产生巨大的整数，先估计结果大小
+        if isinstance(node.op, (ast.Pow, ast.LShift)) and isinstance(right, int) and abs(right) > 1024:
+            return node
+        if isinstance(node.op, ast.Mult):
+            sequence, count = (left, right) if isinstance(left, (str, bytes)) else (right, left)
+            if isinstance(sequence, (str, bytes)) and isinstance(count, int) \
+                    and len(sequence) * count > _MAX_FOLDED_SEQ_LEN:
+                return node
+        # %格式化的结果大小无法事先估计（如'%0100000000d' % 1），不折叠
+        if isinstance(node.op, ast.Mod) and isinstance(left, (str, bytes)):
+            return node
+        return self._fold(node, lambda: func(left, right))
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        func = _UNARY_OPS.get(type(node.op))
+        if func is None or not _is_literal(node.operand):
+            return node
+        return self._fold(node, lambda: func(node.operand.value))
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        # 按短路语义处理开头的字面量：a and x中a为真时结果为x，为假时结果为a；or相反
+        values = node.values
+        while len(values) > 1 and _is_literal(values[0]):
+            if bool(values[0].value) != isinstance(node.op, ast.And):
+                self.report.expressions_folded += 1
+                return values[0]
+            values = values[1:]
+            self.report.expressions_folded += 1
+        if len(values) == 1:
+            return values[0]
+        node.values = values
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = [node.left] + node.comparators
+        if not all(_is_literal(operand) for operand in operands):
+            return node
+        funcs = [_COMPARE_OPS[type(op)] for op in node.ops]
+
+        def compute():
+            return all(func(operands[i].value, operands[i + 1].value) for i, func in enumerate(funcs))
+        return self._fold(node, compute)
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        if _is_literal(node.test):
+            self.report.branches_removed += 1
+            return node.body if node.test.value else node.orelse
+        return node
+
+    def visit_FunctionDef(self, node):
+        self.function_depth += 1
+        self.generic_visit(node)
+        self.function_depth -= 1
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_Lambda = visit_FunctionDef
+
+    def _can_drop(self, nodes: List[ast.AST]) -> bool:
+        # 函数内删除绑定会改变局部变量的判定，模块和类中可以安全删除
+        return not nodes or not (self.function_depth and _binds_names(nodes))
+
+    def visit_If(self, node):
+        self.generic_visit(node)
+        if not _is_literal(node.test):
+            return node
+        keep, drop = (node.body, node.orelse) if node.test.value else (node.orelse, node.body)
+        if not self._can_drop(drop):
+            return node
+        self.report.branches_removed += 1
+        return keep or None
+
+    def visit_While(self, node):
+        self.generic_visit(node)
+        if _is_literal(node.test) and not node.test.value and self._can_drop(node.body):
+            self.report.branches_removed += 1
+            return node.orelse or None
+        return node
+
+    def generic_visit(self, node):
+        super().generic_visit(node)
+        # 删除语句后保证语句块不为空
+        body = getattr(node, 'body', None)
+        if isinstance(body, list) and not body and not isinstance(node, ast.Module):
+            body.append(ast.copy_location(ast.Pass(), node))
+        # 没有except子句的try必须保留非空的finally块
+        if isinstance(node, _TRY_NODES) and not node.handlers and not node.finalbody:
+            node.finalbody.append(ast.copy_location(ast.Pass(), node))
+        return node
+
+
+class OptimizationReport:
+    """单个文件的优化统计"""
+
+    def __init__(self, filename: str, level: int):
+        self.filename = filename
+        self.level = level
+        self.names_folded = 0
+        self.expressions_folded = 0
+        self.branches_removed = 0
+        self.imports_removed: List[str] = []
+        # 优化前后的代码对象大小（marshal字节数）和指令数，需要开启统计时才计算
+        self.size_before: Optional[int] = None
+        self.size_after: Optional[int] = None
+        self.instructions_before: Optional[int] = None
+        self.instructions_after: Optional[int] = None
+
+    def measure(self, before, after) -> None:
+        self.size_before = len(marshal.dumps(before))
+        self.size_after = len(marshal.dumps(after))
+        self.instructions_before = count_instructions(before)
+        self.instructions_after = count_instructions(after)
+
+    def to_dict(self) -> dict:
+        return {
+            'filename': self.filename,
+            'level': self.level,
+            'names_folded': self.names_folded,
+            'expressions_folded': self.expressions_folded,
+            'branches_removed': self.branches_removed,
+            'imports_removed': self.imports_removed,
+            'size_before': self.size_before,
+            'size_after': self.size_after,
+            'instructions_before': self.instructions_before,
+            'instructions_after': self.instructions_after,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'OptimizationReport':
+        """从to_dict()的结果恢复（用于编译缓存）"""
+        report = cls(data['filename'], data['level'])
+        for name, value in data.items():
+            setattr(report, name, list(value) if name == 'imports_removed' else value)
+        return report
+
+    def summary(self) -> str:
+        text = (f"优化级别 {self.level}: 折叠名称 {self.names_folded}，折叠表达式 {self.expressions_folded}，"
+                f"删除分支 {self.branches_removed}，删除导入 {len(self.imports_removed)}")
+        if self.size_before is not None:
+            text += (f"；大小 {self.size_before} -> {self.size_after} 字节"
+                     f"（{self.size_after - self.size_before:+d}），"
+                     f"指令数 {self.instructions_before} -> {self.instructions_after}"
+                     f"（{self.instructions_after - self.instructions_before:+d}）")
+        return text
+
+
+def count_instructions(code) -> int:
+    """统计代码对象（含嵌套代码对象）的指令数，不计CACHE"""
+    return sum(1 for current in iter_code_objects(code)
+               for op, _ in iter_ops(current.co_code) if op != CACHE)
+
+
+def _module_constants(tree: ast.Module, collector: _BindingCollector) -> Dict[str, tuple]:
+    """找出模块顶层只绑定一次且值为字面量的名称"""
+    constants = {}
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+            target, value = stmt.targets[0], stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None and stmt.simple:
+            target, value = stmt.target, stmt.value
+        else:
+            continue
+        if (isinstance(target, ast.Name) and _is_literal(value) and _small_enough(value.value)
+                and collector.bindings.get(target.id) == 1 and not target.id.startswith('__')):
+            constants[target.id] = (value.value, _end_position(stmt))
+    return constants
+
+
+def _remove_unused_imports(tree: ast.Module, collector: _BindingCollector, report: OptimizationReport) -> None:
+    """删除模块顶层未被引用的from导入
+
+    只处理以字面量声明了__all__的模块：没有__all__时模块的导出无法确定，导入的
+    名称可能被其他模块再导出（如包的__init__）。import x形式的导入常用于执行
+    模块的副作用（如注册），始终保留；__future__导入和__all__中列出的名称也保留。
+    """
+    exported = None
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Assign) and any(isinstance(t, ast.Name) and t.id == '__all__'
+                                                for t in stmt.targets):
+            if exported is not None or not isinstance(stmt.value, (ast.List, ast.Tuple)):
+                return
+            exported = {elt.value for elt in stmt.value.elts if isinstance(elt, ast.Constant)}
+        elif isinstance(stmt, (ast.AugAssign, ast.AnnAssign)) and isinstance(stmt.target, ast.Name) \
+                and stmt.target.id == '__all__':
+            return
+    # __all__被重新绑定或读取（可能在运行时被修改）时同样无法确定导出
+    if exported is None or collector.bindings.get('__all__', 0) > 1 or '__all__' in collector.loads:
+        return
+
+    body = []
+    for stmt in tree.body:
+        if isinstance(stmt, ast.ImportFrom) and stmt.module != '__future__':
+            kept = []
+            for alias in stmt.names:
+                bound = alias.asname or alias.name.split('.')[0]
+                if alias.name == '*' or bound in collector.loads or bound in exported \
+                        or collector.bindings.get(bound, 0) > 1:
+                    kept.append(alias)
+                else:
+                    report.imports_removed.append(f"{'.' * stmt.level}{stmt.module or ''}.{alias.name}")
+            if not kept:
+                continue
+            stmt.names = kept
+        body.append(stmt)
+    tree.body = body
+
+
+def optimize_tree(tree: ast.Module, level: int, filename: str = '<string>') -> OptimizationReport:
+    """对模块AST执行优化（原地修改），返回优化统计
+
+    assert和文档字符串的去除由compile()的optimize参数完成，见compile_optimized。
+    """
+    report = OptimizationReport(filename, level)
+    if level <= 0:
+        return report
+    collector = _BindingCollector()
+    collector.visit(tree)
+    constants = {} if collector.dynamic or collector.star_import else _module_constants(tree, collector)
+    _Optimizer(constants, report).visit(tree)
+    if level >= 2 and not collector.dynamic:
+        # 折叠后重新统计引用，只在折叠中被替换掉的名称不再算作引用
+        collector = _BindingCollector()
+        collector.visit(tree)
+        _remove_unused_imports(tree, collector, report)
+    ast.fix_missing_locations(tree)
+    return report
+
+
+def compile_optimized(tree: ast.Module, filename: str, level: int, collect_stats: bool = False):
+    """按优化级别编译AST，返回(代码对象, 优化统计)
+
+    collect_stats为True时额外编译一次未优化的版本，用于计算大小和指令数的变化。
+    """
+    before = compile(tree, filename, 'exec', optimize=0) if collect_stats and level > 0 else None
+    report = optimize_tree(tree, level, filename)
+    code_object = compile(tree, filename, 'exec', optimize=min(level, MAX_OPT_LEVEL) if level > 0 else -1)
+    if before is not None:
+        report.measure(before, code_object)
+    return code_object, report
@@ -0,0 +1,295 @@
+import sys
+import time
+import marshal
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# 函数标识，与pstats一致：(文件名, 首行号, 函数名)
+FuncKey = Tuple[str, int, str]
+
+# sys.monitoring在Python 3.12及以上可用
+HAS_MONITORING = hasattr(sys, 'monitoring')
+
+
+def _func_key(code) -> FuncKey:
+    return (code.co_filename, code.co_firstlineno, getattr(code, 'co_qualname', code.co_name))
+
+
+def _func_label(key: FuncKey) -> str:
+    return f"{key[2]} ({key[0]}:{key[1]})"
+
+
+class FunctionStats:
+    """单个函数的统计数据"""
+
+    __slots__ = ('key', 'calls', 'self_time', 'cum_time', 'callers')
+
+    def __init__(self, key: FuncKey):
+        self.key = key
+        self.calls = 0
+        self.self_time = 0.0
+        self.cum_time = 0.0
+        # 调用者 -> [调用次数, 自身耗时, 累计耗时]
+        self.callers: Dict[FuncKey, list] = {}
+
+    @property
+    def name(self) -> str:
+        return self.key[2]
+
+    def to_dict(self) -> dict:
+        return {
+            'function': self.key[2],
+            'filename': self.key[0],
+            'line': self.key[1],
+            'calls': self.calls,
+            'self_time': round(self.self_time, 6),
+            'cum_time': round(self.cum_time, 6),
+        }
+
+
+class ProfileReport:
+    """一次执行的性能分析结果"""
+
+    SORT_KEYS = {
+        'self': lambda stats: stats.self_time,
+        'cumulative': lambda stats: stats.cum_time,
+        'calls': lambda stats: stats.calls,
+    }
+
+    def __init__(self, backend: str, functions: Dict[FuncKey, FunctionStats],
+                 stacks: Dict[Tuple[FuncKey, ...], float], total_time: float):
+        self.backend = backend
+        self.functions = functions
+        # 调用栈（从外到内） -> 自身耗时，用于生成火焰图
+        self.stacks = stacks
+        self.total_time = total_time
+
+    def sorted(self, sort: str = 'self') -> List[FunctionStats]:
+        return sorted(self.functions.values(), key=self.SORT_KEYS[sort], reverse=True)
+
+    def format_table(self, limit: Optional[int] = 30, sort: str = 'self') -> str:
+        """格式化为文本表格"""
+        rows = self.sorted(sort)
+        lines = [
+            f"性能分析（{self.backend}），总耗时 {self.total_time:.6f}s，函数 {len(rows)} 个",
+            f"{'调用次数':>10} {'自身耗时(s)':>12} {'累计耗时(s)':>12}  函数",
+        ]
+        for stats in rows[:limit]:
+            lines.append(f"{stats.calls:>10} {stats.self_time:>12.6f} {stats.cum_time:>12.6f}  "
+                         f"{_func_label(stats.key)}")
+        if limit is not None and len(rows) > limit:
+            lines.append(f"...（其余{len(rows) - limit}个函数未显示）")
+        return '\n'.join(lines)
+
+    def to_dict(self, sort: str = 'self') -> dict:
+        return {
+            'backend': self.backend,
+            'total_time': round(self.total_time, 6),
+            'functions': [stats.to_dict() for stats in self.sorted(sort)],
+        }
+
+    def pstats_data(self) -> dict:
+        """转换为pstats使用的统计字典"""
+        data = {}
+        for key, stats in self.functions.items():
+            callers = {caller: (calls, calls, self_time, cum_time)
+                       for caller, (calls, self_time, cum_time) in stats.callers.items()}
+            data[key] = (stats.calls, stats.calls, stats.self_time, stats.cum_time, callers)
+        return data
+
+    def dump_pstats(self, path: str) -> None:
+        """导出为pstats文件，可用pstats.Stats或snakeviz等工具查看"""
+        with open(path, 'wb') as f:
+            marshal.dump(self.pstats_data(), f)
+
+    def collapsed_stacks(self) -> List[str]:
+        """折叠栈格式（每行"外层;...;内层 微秒数"），可直接输入flamegraph.pl或speedscope"""
+        lines = []
+        for stack, self_time in sorted(self.stacks.items()):
+            micros = int(self_time * 1_000_000)
+            if micros > 0:
+                lines.append(';'.join(_func_label(key) for key in stack) + f" {micros}")
+        return lines
+
+    def dump_collapsed(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.collapsed_stacks():
+                f.write(line + '\n')
+
+
+class _Frame:
+    __slots__ = ('code', 'key', 'start', 'child_time', 'stack', 'is_call')
+
+    def __init__(self, code, key, start, stack, is_call):
+        self.code = code
+        self.key = key
+        self.start = start
+        self.child_time = 0.0
+        self.stack = stack
+        self.is_call = is_call
+
+
+class Profiler:
+    """客户代码性能分析器
+
+    优先使用sys.monitoring（Python 3.12+）的PY_START/PY_RETURN等事件，只统计
+    Python函数，开销远低于基于sys.setprofile的分析；不可用或工具ID已被占用时
+    回退到cProfile。只记录调用start()的线程中的函数调用。
+    """
+
+    def __init__(self, use_monitoring: Optional[bool] = None):
+        if use_monitoring is None:
+            use_monitoring = HAS_MONITORING and sys.monitoring.get_tool(sys.monitoring.PROFILER_ID) is None
+        self.backend = 'sys.monitoring' if use_monitoring else 'cProfile'
+        self._profile = None
+        self._thread = None
+        self._stack: List[_Frame] = []
+        self._functions: Dict[FuncKey, FunctionStats] = {}
+        self._stacks: Dict[Tuple[FuncKey, ...], float] = {}
+        # 正在执行的函数及其嵌套层数，递归调用只计一次累计耗时
+        self._active: Dict[FuncKey, int] = {}
+        self._start_time = 0.0
+        self._total_time = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.get_ident()
+        self._start_time = time.perf_counter()
+        if self.backend == 'cProfile':
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+
+        monitoring = sys.monitoring
+        tool = monitoring.PROFILER_ID
+        monitoring.use_tool_id(tool, 'pyvm-profiler')
+        events = monitoring.events
+        monitoring.register_callback(tool, events.PY_START, self._on_start)
+        monitoring.register_callback(tool, events.PY_RESUME, self._on_resume)
+        monitoring.register_callback(tool, events.PY_RETURN, self._on_exit)
+        monitoring.register_callback(tool, events.PY_YIELD, self._on_exit)
+        monitoring.register_callback(tool, events.PY_UNWIND, self._on_unwind)
+        monitoring.set_events(tool, events.PY_START | events.PY_RESUME | events.PY_RETURN
+                              | events.PY_YIELD | events.PY_UNWIND)
+
+    def stop(self) -> ProfileReport:
+        """停止分析并生成报告"""
+        if self.backend == 'cProfile':
+            self._profile.disable()
+            self._total_time = time.perf_counter() - self._start_time
+            return self._report_from_cprofile()
+        self._total_time = time.perf_counter() - self._start_time
+
+        monitoring = sys.monitoring
+        tool = monitoring.PROFILER_ID
+        monitoring.set_events(tool, 0)
+        for event in (monitoring.events.PY_START, monitoring.events.PY_RESUME, monitoring.events.PY_RETURN,
+                      monitoring.events.PY_YIELD, monitoring.events.PY_UNWIND):
+            monitoring.register_callback(tool, event, None)
+        monitoring.free_tool_id(tool)
+        # 丢弃分析器自身的帧，其余仍在栈上的函数按当前时间结算
+        while self._stack and self._stack[-1].code in _OWN_CODE:
+            frame = self._stack.pop()
+            self._active[frame.key] -= 1
+        now = time.perf_counter()
+        while self._stack:
+            self._pop(now)
+        return self.report()
+
+    def report(self) -> ProfileReport:
+        return ProfileReport(self.backend, self._functions, self._stacks, self._total_time)
+
+    def _on_start(self, code, offset):
+        if threading.get_ident() == self._thread:
+            self._push(code, True)
+
+    def _on_resume(self, code, offset):
+        if threading.get_ident() == self._thread:
+            self._push(code, False)
+
+    def _on_exit(self, code, offset, value):
+        if threading.get_ident() == self._thread:
+            self._exit(code)
+
+    def _on_unwind(self, code, offset, exception):
+        if threading.get_ident() == self._thread:
+            self._exit(code)
+
+    def _push(self, code, is_call: bool) -> None:
+        key = _func_key(code)
+        parent_stack = self._stack[-1].stack if self._stack else ()
+        self._stack.append(_Frame(code, key, time.perf_counter(), parent_stack + (key,), is_call))
+        self._active[key] = self._active.get(key, 0) + 1
+
+    def _exit(self, code) -> None:
+        # 开始分析前已在执行的帧（如exec的调用者）没有对应的入栈记录
+        if self._stack and self._stack[-1].code is code:
+            self._pop(time.perf_counter())
+
+    def _pop(self, now: float) -> None:
+        frame = self._stack.pop()
+        key = frame.key
+        elapsed = now - frame.start
+        self_time = elapsed - frame.child_time
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            parent.child_time += elapsed
+
+        stats = self._functions.get(key)
+        if stats is None:
+            stats = self._functions[key] = FunctionStats(key)
+        self._active[key] -= 1
+        outermost = self._active[key] == 0
+        if frame.is_call:
+            stats.calls += 1
+        stats.self_time += self_time
+        if outermost:
+            stats.cum_time += elapsed
+        if parent is not None:
+            edge = stats.callers.get(parent.key)
+            if edge is None:
+                edge = stats.callers[parent.key] = [0, 0.0, 0.0]
+            if frame.is_call:
+                edge[0] += 1
+            edge[1] += self_time
+            if outermost:
+                edge[2] += elapsed
+        self._stacks[frame.stack] = self._stacks.get(frame.stack, 0.0) + self_time
+
+    def _report_from_cprofile(self) -> ProfileReport:
+        """从cProfile的统计数据生成报告
+
+        cProfile只记录直接调用者，因此折叠栈只有"调用者;函数"两层。
+        """
+        import pstats
+        raw = pstats.Stats(self._profile).stats
+        functions = {}
+        stacks = {}
+        for key, (cc, nc, tt, ct, callers) in raw.items():
+            # 跳过分析器自身的调用
+            if key[0] == __file__ or '_lsprof.Profiler' in key[2]:
+                continue
+            stats = functions[key] = FunctionStats(key)
+            stats.calls = nc
+            stats.self_time = tt
+            stats.cum_time = ct
+            for caller, caller_stats in callers.items():
+                # 不同Python版本中调用者数据可能是(cc, nc, tt, ct)或仅调用次数
+                if isinstance(caller_stats, tuple):
+                    stats.callers[caller] = [caller_stats[1], caller_stats[2], caller_stats[3]]
+                    stacks[(caller, key)] = caller_stats[2]
+                else:
+                    stats.callers[caller] = [caller_stats, 0.0, 0.0]
+            if not callers:
+                stacks[(key,)] = tt
+        return ProfileReport(self.backend, functions, stacks, self._total_time)
+
+
+_OWN_CODE = (Profiler.stop.__code__, Profiler.__exit__.__code__)
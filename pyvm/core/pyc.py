@@ -0,0 +1,106 @@
+import importlib.util
+import marshal
+import os
+import struct
+from typing import NamedTuple, Optional
+
+# Python版本魔数（包含结尾的\r\n，共4字节）
+MAGIC_NUMBER = importlib.util.MAGIC_NUMBER
+
+# pyc文件头长度：魔数(4) + 标志位(4) + 时间戳/哈希(4/8) + 源文件大小(4/-)
+HEADER_SIZE = 16
+
+# PEP 552 标志位
+FLAG_HASH_BASED = 0b01
+FLAG_CHECK_SOURCE = 0b10
+
+
+class PycHeader(NamedTuple):
+    """解析后的pyc文件头"""
+    magic: bytes
+    flags: int
+    mtime: int
+    source_size: int
+    source_hash: Optional[bytes]
+
+    @property
+    def hash_based(self) -> bool:
+        return bool(self.flags & FLAG_HASH_BASED)
+
+    @property
+    def valid_flags(self) -> bool:
+        return not (self.flags & ~(FLAG_HASH_BASED | FLAG_CHECK_SOURCE))
+
+
+def source_hash(source_bytes: bytes) -> bytes:
+    """计算源码的PEP 552哈希（8字节）"""
+    return importlib.util.source_hash(source_bytes)
+
+
+def build_header(source_bytes: Optional[bytes] = None, mtime: int = 0, source_size: int = 0,
+                 hash_based: bool = True, check_source: bool = True) -> bytes:
+    """构造pyc文件头
+
+    基于哈希时写入源码哈希，否则写入源文件的修改时间和大小。
+    """
+    if hash_based:
+        if source_bytes is None:
+            raise ValueError("基于哈希的pyc文件头需要源码内容")
+        flags = FLAG_HASH_BASED | (FLAG_CHECK_SOURCE if check_source else 0)
+        return MAGIC_NUMBER + struct.pack('<I', flags) + source_hash(source_bytes)
+
+    return (MAGIC_NUMBER + struct.pack('<I', 0) +
+            struct.pack('<I', int(mtime) & 0xFFFFFFFF) +
+            struct.pack('<I', int(source_size) & 0xFFFFFFFF))
+
+
+def parse_header(data: bytes) -> PycHeader:
+    """解析pyc文件头，data至少包含HEADER_SIZE字节"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("无效的pyc文件")
+
+    magic = bytes(data[:4])
+    flags = struct.unpack('<I', data[4:8])[0]
+    if flags & FLAG_HASH_BASED:
+        return PycHeader(magic, flags, 0, 0, bytes(data[8:16]))
+
+    mtime, source_size = struct.unpack('<II', data[8:16])
+    return PycHeader(magic, flags, mtime, source_size, None)
+
+
+def read_header(pyc_path: str) -> Optional[PycHeader]:
+    """读取pyc文件头，文件不存在或无效时返回None"""
+    try:
+        with open(pyc_path, 'rb') as f:
+            return parse_header(f.read(HEADER_SIZE))
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(header: Optional[PycHeader], source_bytes: Optional[bytes] = None,
+             source_stat: Optional[os.stat_result] = None) -> bool:
+    """判断pyc文件头是否与当前源码匹配"""
+    if header is None or header.magic != MAGIC_NUMBER or not header.valid_flags:
+        return False
+
+    if header.hash_based:
+        if source_bytes is None:
+            return False
+        return header.source_hash == source_hash(source_bytes)
+
+    if source_stat is None:
+        return False
+    return (header.mtime == int(source_stat.st_mtime) & 0xFFFFFFFF and
+            header.source_size == source_stat.st_size & 0xFFFFFFFF)
+
+
+def load_code(data) -> tuple:
+    """从完整的pyc文件内容中解析文件头并反序列化代码对象，返回(文件头, 代码对象)"""
+    header = parse_header(data[:HEADER_SIZE])
+    if header.magic != MAGIC_NUMBER:
+        raise ValueError("pyc文件与当前Python版本不匹配")
+    try:
+        code_object = marshal.loads(memoryview(data)[HEADER_SIZE:])
+    except Exception as e:
+        raise ValueError(f"解析pyc文件失败: {str(e)}") from e
+    return header, code_object
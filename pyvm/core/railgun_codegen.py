@@ -0,0 +1,797 @@
+import ast
+import struct
+from typing import List, Optional
+
+# railgun原生虚拟机读取的是CPython 2.7格式的pyc：4字节魔数 + 4字节修改时间
+MAGIC_NUMBER = b'\x03\xf3\r\n'
+HEADER_SIZE = 8
+
+# 2.7的代码对象标志
+CO_OPTIMIZED = 0x1
+CO_NEWLOCALS = 0x2
+CO_NOFREE = 0x40
+
+# 2.7操作码（只列出用到的）
+POP_TOP = 1
+DUP_TOP = 4
+BINARY_MULTIPLY = 20
+BINARY_DIVIDE = 21
+BINARY_MODULO = 22
+BINARY_ADD = 23
+BINARY_SUBTRACT = 24
+BINARY_SUBSCR = 25
+STORE_SUBSCR = 60
+GET_ITER = 68
+PRINT_ITEM = 71
+PRINT_NEWLINE = 72
+RETURN_VALUE = 83
+STORE_NAME = 90
+FOR_ITER = 93
+LOAD_CONST = 100
+LOAD_NAME = 101
+BUILD_LIST = 103
+COMPARE_OP = 107
+JUMP_ABSOLUTE = 113
+POP_JUMP_IF_FALSE = 114
+LOAD_GLOBAL = 116
+LOAD_FAST = 124
+STORE_FAST = 125
+CALL_FUNCTION = 131
+MAKE_FUNCTION = 132
+
+_BINARY_OPS = {
+    ast.Add: BINARY_ADD, ast.Sub: BINARY_SUBTRACT, ast.Mult: BINARY_MULTIPLY,
+    ast.FloorDiv: BINARY_DIVIDE, ast.Mod: BINARY_MODULO,
+}
+# 虚拟机的整数除法和取模按C语言向零取整，需要修正为Python的向下取整
+_FLOORED_OPS = (ast.FloorDiv, ast.Mod)
+# 虚拟机的整数是32位且溢出时静默回绕，这些运算在运行时检查溢出
+_CHECKED_OPS = (ast.Add, ast.Sub, ast.Mult)
+_CONSTANT_FOLDERS = {
+    ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+    ast.FloorDiv: lambda a, b: a // b, ast.Mod: lambda a, b: a % b,
+}
+_COMPARE_OPS = {
+    ast.Lt: 0, ast.LtE: 1, ast.Eq: 2, ast.NotEq: 3, ast.Gt: 4, ast.GtE: 5,
+    ast.Is: 8,
+}
+# 虚拟机未实现的比较，改为对应比较的结果取反（虚拟机的in结果不正确，不支持）
+_NEGATED_COMPARE_OPS = {ast.IsNot: ast.Is}
+
+# marshal的'i'类型只能表示32位整数
+_INT_MIN = -2 ** 31
+_INT_MAX = 2 ** 31 - 1
+
+# 整数运算溢出时虚拟机先输出该标记再主动出错，执行方据此给出失败原因
+OVERFLOW_MARKER = '!!pyvm-railgun: integer overflow!!'
+
+# 以这些前缀开头的名称在源码中无法书写，用作for range循环的隐藏变量
+_HIDDEN_PREFIX = '.'
+
+
+class UnsupportedCode(ValueError):
+    """源码使用了railgun后端不支持的语法"""
+
+    def __init__(self, node, what: str):
+        self.lineno = getattr(node, 'lineno', 0)
+        super().__init__(f"第{self.lineno}行: railgun后端不支持{what}")
+
+
+class _Label:
+    __slots__ = ('offset',)
+
+    def __init__(self):
+        self.offset = None
+
+
+class _Assembler:
+    """生成一个代码对象的字节码，跳转目标在结束时回填"""
+
+    def __init__(self, name: str, argnames: List[str], local_names: Optional[List[str]]):
+        self.name = name
+        self.argcount = len(argnames)
+        # 函数作用域中的局部变量，模块作用域为None
+        self.varnames = list(argnames) + [n for n in (local_names or []) if n not in argnames]
+        self.is_function = local_names is not None
+        self.code = bytearray()
+        self.consts = []
+        self.names = []
+        self.fixups = []
+        self.depth = 0
+        self.max_depth = 0
+        self.hidden = 0
+
+    def emit(self, op: int, arg=None, effect: int = 0) -> None:
+        if arg is None:
+            self.code.append(op)
+        elif isinstance(arg, _Label):
+            self.fixups.append((len(self.code) + 1, arg))
+            self.code += bytes((op, 0, 0))
+        else:
+            if arg > 0xFFFF:
+                raise UnsupportedCode(None, "超过65535个常量或名称的代码")
+            self.code += bytes((op, arg & 0xFF, arg >> 8))
+        self.depth += effect
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def mark(self, label: _Label) -> None:
+        label.offset = len(self.code)
+
+    def const(self, value) -> int:
+        for index, existing in enumerate(self.consts):
+            if type(existing) is type(value) and existing == value:
+                return index
+        self.consts.append(value)
+        return len(self.consts) - 1
+
+    def name_index(self, name: str) -> int:
+        if name not in self.names:
+            self.names.append(name)
+        return self.names.index(name)
+
+    def hidden_name(self, node) -> str:
+        self.hidden += 1
+        name = f"{_HIDDEN_PREFIX}{self.hidden}"
+        if self.is_function:
+            self.varnames.append(name)
+        return name
+
+    def assemble(self, firstlineno: int, filename: str) -> bytes:
+        for position, label in self.fixups:
+            struct.pack_into('<H', self.code, position, label.offset)
+        flags = CO_OPTIMIZED | CO_NEWLOCALS | CO_NOFREE if self.is_function else CO_NOFREE
+        return b''.join([
+            b'c', struct.pack('<iiii', self.argcount, len(self.varnames), self.max_depth + 1, flags),
+            _marshal(bytes(self.code)),
+            _marshal_tuple(self.consts),
+            _marshal_tuple(self.names),
+            _marshal_tuple(self.varnames),
+            _marshal_tuple([]),
+            _marshal_tuple([]),
+            _marshal(filename),
+            _marshal(self.name),
+            struct.pack('<i', firstlineno),
+            _marshal(b''),
+        ])
+
+
+class _CodeObject:
+    """已汇编的嵌套代码对象，作为常量写入外层代码对象"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _marshal(value) -> bytes:
+    """按2.7的marshal格式序列化常量"""
+    if value is None:
+        return b'N'
+    if isinstance(value, int):
+        return b'i' + struct.pack('<i', value)
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    if isinstance(value, bytes):
+        return b's' + struct.pack('<i', len(value)) + value
+    if isinstance(value, _CodeObject):
+        return value.data
+    raise TypeError(f"无法序列化的常量: {value!r}")
+
+
+def _marshal_tuple(values) -> bytes:
+    return b'(' + struct.pack('<i', len(values)) + b''.join(_marshal(value) for value in values)
+
+
+def _assigned_names(body: List[ast.stmt]) -> List[str]:
+    """函数体中被绑定的名称（不进入嵌套作用域）"""
+    names = []
+
+    def add(name):
+        if name not in names:
+            names.append(name)
+
+    def visit(node):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            add(node.id)
+        elif isinstance(node, ast.FunctionDef):
+            add(node.name)
+            return
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    for stmt in body:
+        visit(stmt)
+    return names
+
+
+class _Loop:
+    def __init__(self, start: _Label, end: _Label, pops: int):
+        # continue跳转到start，break先弹出pops个栈元素（for循环的迭代器）再跳到end
+        self.start = start
+        self.end = end
+        self.pops = pops
+
+
+class _CodeGenerator:
+    """把源码的一个子集编译为railgun虚拟机能执行的字节码
+
+    支持整数、字符串、列表和函数，以及if/while/for循环和print输出；遇到其他
+    语法时抛出UnsupportedCode，由调用方改用CPython执行。
+    """
+
+    def __init__(self, filename: str, rebound: set):
+        self.filename = filename
+        self.rebound = rebound
+        self.asm: Optional[_Assembler] = None
+        self.loops: List[_Loop] = []
+
+    def module(self, tree: ast.Module) -> bytes:
+        self.asm = _Assembler('<module>', [], None)
+        for stmt in tree.body:
+            self.stmt(stmt)
+        self.asm.emit(LOAD_CONST, self.asm.const(None), 1)
+        self.asm.emit(RETURN_VALUE, None, -1)
+        return self.asm.assemble(1, self.filename)
+
+    # 名称
+
+    def load_name(self, node, name: str) -> None:
+        asm = self.asm
+        if asm.is_function and name in asm.varnames:
+            asm.emit(LOAD_FAST, asm.varnames.index(name), 1)
+        elif asm.is_function:
+            asm.emit(LOAD_GLOBAL, asm.name_index(name), 1)
+        else:
+            asm.emit(LOAD_NAME, asm.name_index(name), 1)
+
+    def store_name(self, name: str) -> None:
+        asm = self.asm
+        if asm.is_function:
+            asm.emit(STORE_FAST, asm.varnames.index(name), -1)
+        else:
+            asm.emit(STORE_NAME, asm.name_index(name), -1)
+
+    def store(self, target) -> None:
+        if isinstance(target, ast.Name):
+            self.store_name(target.id)
+        elif isinstance(target, ast.Subscript) and not isinstance(target.slice, ast.Slice):
+            self.expr(target.value)
+            self.expr(target.slice)
+            self.asm.emit(STORE_SUBSCR, None, -3)
+        else:
+            raise UnsupportedCode(target, "这种赋值目标")
+
+    # 语句
+
+    def stmt(self, node) -> None:
+        method = getattr(self, 'stmt_' + type(node).__name__, None)
+        if method is None:
+            raise UnsupportedCode(node, f"{type(node).__name__}语句")
+        method(node)
+
+    def stmt_Pass(self, node) -> None:
+        pass
+
+    def stmt_Expr(self, node) -> None:
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            # 文档字符串
+            return
+        if self._is_print(node.value):
+            self.print_call(node.value)
+            return
+        self.expr(node.value)
+        self.asm.emit(POP_TOP, None, -1)
+
+    def stmt_Assign(self, node) -> None:
+        self.expr(node.value)
+        for index, target in enumerate(node.targets):
+            if index < len(node.targets) - 1:
+                self.asm.emit(DUP_TOP, None, 1)
+            self.store(target)
+
+    def stmt_AugAssign(self, node) -> None:
+        if not isinstance(node.target, ast.Name):
+            raise UnsupportedCode(node, "对非名称目标的增量赋值")
+        self.binary(node, node.op, ast.Name(node.target.id, ast.Load(), lineno=node.lineno), node.value)
+        self.store_name(node.target.id)
+
+    def stmt_If(self, node) -> None:
+        asm = self.asm
+        orelse, end = _Label(), _Label()
+        self.condition(node.test)
+        asm.emit(POP_JUMP_IF_FALSE, orelse, -1)
+        for stmt in node.body:
+            self.stmt(stmt)
+        if node.orelse:
+            asm.emit(JUMP_ABSOLUTE, end)
+        asm.mark(orelse)
+        for stmt in node.orelse:
+            self.stmt(stmt)
+        asm.mark(end)
+
+    def stmt_While(self, node) -> None:
+        if node.orelse:
+            raise UnsupportedCode(node, "while...else")
+        asm = self.asm
+        start, end = _Label(), _Label()
+        asm.mark(start)
+        self.condition(node.test)
+        asm.emit(POP_JUMP_IF_FALSE, end, -1)
+        self.loop_body(node.body, _Loop(start, end, 0))
+        asm.emit(JUMP_ABSOLUTE, start)
+        asm.mark(end)
+
+    def stmt_For(self, node) -> None:
+        if node.orelse:
+            raise UnsupportedCode(node, "for...else")
+        if not isinstance(node.target, ast.Name):
+            raise UnsupportedCode(node, "对非名称目标的for循环")
+        if self._is_range(node.iter):
+            self.for_range(node)
+            return
+        asm = self.asm
+        start, end = _Label(), _Label()
+        self.expr(node.iter)
+        asm.emit(GET_ITER)
+        asm.mark(start)
+        asm.emit(FOR_ITER, end, 1)
+        # FOR_ITER的跳转目标是相对地址，在回填时换算
+        asm.fixups[-1] = (asm.fixups[-1][0], _RelativeLabel(end, len(asm.code)))
+        self.store_name(node.target.id)
+        self.loop_body(node.body, _Loop(start, end, 1))
+        asm.emit(JUMP_ABSOLUTE, start)
+        asm.mark(end)
+        asm.depth -= 1
+
+    def for_range(self, node) -> None:
+        """for x in range(...)直接展开为计数循环，不在虚拟机中创建列表"""
+        args = node.iter.args
+        step = 1
+        if len(args) == 3:
+            step = self._constant_int(args[2])
+            if not step:
+                raise UnsupportedCode(node, "步长不是非零整数常量的range")
+        asm = self.asm
+        counter, stop = asm.hidden_name(node), asm.hidden_name(node)
+        if len(args) == 1:
+            asm.emit(LOAD_CONST, asm.const(0), 1)
+        else:
+            self.expr(args[0])
+        self.store_name(counter)
+        self.expr(args[-2] if len(args) == 3 else args[-1])
+        self.store_name(stop)
+
+        start, advance, end = _Label(), _Label(), _Label()
+        asm.mark(start)
+        self.load_name(node, counter)
+        self.load_name(node, stop)
+        asm.emit(COMPARE_OP, _COMPARE_OPS[ast.Lt if step > 0 else ast.Gt], -1)
+        asm.emit(POP_JUMP_IF_FALSE, end, -1)
+        self.load_name(node, counter)
+        self.store_name(node.target.id)
+        self.loop_body(node.body, _Loop(advance, end, 0))
+        asm.mark(advance)
+        self.binary(node, ast.Add(), ast.Name(counter, ast.Load(), lineno=node.lineno),
+                    ast.Constant(step, lineno=node.lineno))
+        self.store_name(counter)
+        asm.emit(JUMP_ABSOLUTE, start)
+        asm.mark(end)
+
+    def loop_body(self, body: List[ast.stmt], loop: _Loop) -> None:
+        self.loops.append(loop)
+        try:
+            for stmt in body:
+                self.stmt(stmt)
+        finally:
+            self.loops.pop()
+
+    def stmt_Break(self, node) -> None:
+        loop = self.loops[-1]
+        for _ in range(loop.pops):
+            self.asm.emit(POP_TOP)
+        self.asm.emit(JUMP_ABSOLUTE, loop.end)
+
+    def stmt_Continue(self, node) -> None:
+        self.asm.emit(JUMP_ABSOLUTE, self.loops[-1].start)
+
+    def stmt_FunctionDef(self, node) -> None:
+        if self.asm.is_function:
+            raise UnsupportedCode(node, "嵌套函数")
+        args = node.args
+        if (node.decorator_list or args.posonlyargs or args.kwonlyargs or args.vararg or args.kwarg
+                or args.defaults or getattr(node, 'type_params', None)):
+            raise UnsupportedCode(node, "装饰器、默认参数或可变参数")
+        for child in ast.walk(node):
+            if isinstance(child, (ast.Global, ast.Nonlocal, ast.Lambda, ast.comprehension)):
+                raise UnsupportedCode(child, f"函数中的{type(child).__name__}")
+
+        outer, outer_loops = self.asm, self.loops
+        argnames = [arg.arg for arg in args.args]
+        self.asm = _Assembler(node.name, argnames, _assigned_names(node.body))
+        self.loops = []
+        try:
+            for stmt in node.body:
+                self.stmt(stmt)
+            self.asm.emit(LOAD_CONST, self.asm.const(None), 1)
+            self.asm.emit(RETURN_VALUE, None, -1)
+            code = _CodeObject(self.asm.assemble(node.lineno, self.filename))
+        finally:
+            self.asm, self.loops = outer, outer_loops
+        self.asm.emit(LOAD_CONST, self.asm.const(code), 1)
+        self.asm.emit(MAKE_FUNCTION, 0)
+        self.store_name(node.name)
+
+    def stmt_Return(self, node) -> None:
+        if not self.asm.is_function:
+            raise UnsupportedCode(node, "函数外的return")
+        if node.value is None:
+            self.asm.emit(LOAD_CONST, self.asm.const(None), 1)
+        else:
+            self.expr(node.value)
+        # for循环中返回时迭代器留在栈上，由帧的销毁回收
+        self.asm.emit(RETURN_VALUE, None, -1)
+
+    # 表达式
+
+    def expr(self, node) -> None:
+        method = getattr(self, 'expr_' + type(node).__name__, None)
+        if method is None:
+            raise UnsupportedCode(node, f"{type(node).__name__}表达式")
+        method(node)
+
+    def expr_Constant(self, node) -> None:
+        value = node.value
+        if isinstance(value, bool):
+            self.load_bool(node, value)
+            return
+        if value is None:
+            pass
+        elif isinstance(value, int):
+            if not _INT_MIN <= value <= _INT_MAX:
+                raise UnsupportedCode(node, "超出32位的整数常量")
+        elif not isinstance(value, str):
+            raise UnsupportedCode(node, f"{type(value).__name__}常量")
+        self.asm.emit(LOAD_CONST, self.asm.const(value), 1)
+
+    def load_bool(self, node, value: bool) -> None:
+        # 虚拟机的marshal不支持布尔常量，从内置名称读取
+        self.load_builtin(node, 'True' if value else 'False')
+
+    def load_builtin(self, node, name: str) -> None:
+        if name in self.rebound:
+            raise UnsupportedCode(node, f"重新绑定的{name}")
+        self.load_name(node, name)
+
+    def expr_Name(self, node) -> None:
+        self.load_name(node, node.id)
+
+    def condition(self, node) -> None:
+        """编译条件表达式
+
+        虚拟机的条件跳转只把False对象当作假，因此条件必须是结果为布尔值的表达式。
+        """
+        if not self._is_boolean(node):
+            raise UnsupportedCode(node, "结果不是布尔值的条件")
+        self.expr(node)
+
+    def expr_BinOp(self, node) -> None:
+        self.binary(node, node.op, node.left, node.right)
+
+    def binary(self, node, op, left, right) -> None:
+        opcode = _BINARY_OPS.get(type(op))
+        if opcode is None:
+            raise UnsupportedCode(node, f"{type(op).__name__}运算")
+        asm = self.asm
+        left_value, right_value = self._int_value(left), self._int_value(right)
+        if left_value is not None and right_value is not None and (right_value or isinstance(op, _CHECKED_OPS)):
+            # 常量运算在编译时求值，超出32位时由expr_Constant拒绝
+            value = _CONSTANT_FOLDERS[type(op)](left_value, right_value)
+            self.expr_Constant(ast.Constant(value, lineno=node.lineno))
+            return
+        if isinstance(op, _CHECKED_OPS) and not (self._is_sequence(left) or self._is_sequence(right)):
+            self.checked_binary(node, op, left, right)
+            return
+        if not isinstance(op, _FLOORED_OPS):
+            self.expr(left)
+            self.expr(right)
+            asm.emit(opcode, None, -1)
+            return
+
+        # 余数不为0且被除数与除数异号时，商减1、余数加上除数
+        a, b, result = asm.hidden_name(node), asm.hidden_name(node), asm.hidden_name(node)
+        self.expr(left)
+        self.store_name(a)
+        self.expr(right)
+        self.store_name(b)
+        self.load_name(node, a)
+        self.load_name(node, b)
+        asm.emit(opcode, None, -1)
+        self.store_name(result)
+        done = _Label()
+        self.load_name(node, a)
+        self.load_name(node, b)
+        asm.emit(BINARY_MODULO, None, -1)
+        asm.emit(LOAD_CONST, asm.const(0), 1)
+        asm.emit(COMPARE_OP, _COMPARE_OPS[ast.NotEq], -1)
+        asm.emit(POP_JUMP_IF_FALSE, done, -1)
+        # 虚拟机比较两个布尔值是否不等的结果不正确，异号判断用分支实现
+        a_non_negative, check = _Label(), _Label()
+        self.load_name(node, a)
+        asm.emit(LOAD_CONST, asm.const(0), 1)
+        asm.emit(COMPARE_OP, _COMPARE_OPS[ast.Lt], -1)
+        asm.emit(POP_JUMP_IF_FALSE, a_non_negative, -1)
+        self.load_name(node, b)
+        asm.emit(LOAD_CONST, asm.const(0), 1)
+        asm.emit(COMPARE_OP, _COMPARE_OPS[ast.GtE], -1)
+        asm.emit(JUMP_ABSOLUTE, check)
+        asm.depth -= 1
+        asm.mark(a_non_negative)
+        self.load_name(node, b)
+        asm.emit(LOAD_CONST, asm.const(0), 1)
+        asm.emit(COMPARE_OP, _COMPARE_OPS[ast.Lt], -1)
+        asm.mark(check)
+        asm.emit(POP_JUMP_IF_FALSE, done, -1)
+        self.load_name(node, result)
+        if isinstance(op, ast.FloorDiv):
+            asm.emit(LOAD_CONST, asm.const(1), 1)
+            asm.emit(BINARY_SUBTRACT, None, -1)
+        else:
+            self.load_name(node, b)
+            asm.emit(BINARY_ADD, None, -1)
+        self.store_name(result)
+        asm.mark(done)
+        self.load_name(node, result)
+
+    def checked_binary(self, node, op, left, right) -> None:
+        """加减乘运算，两个操作数都是整数且结果超出32位时让虚拟机出错
+
+        溢出与否按回绕后结果的符号（加减）或能否除回原操作数（乘）判断。
+        """
+        asm = self.asm
+        a, b, result = asm.hidden_name(node), asm.hidden_name(node), asm.hidden_name(node)
+        self.expr(left)
+        self.store_name(a)
+        self.expr(right)
+        self.store_name(b)
+        self.load_name(node, a)
+        self.load_name(node, b)
+        asm.emit(_BINARY_OPS[type(op)], None, -1)
+        self.store_name(result)
+
+        done, overflow = _Label(), _Label()
+        # 字符串拼接、列表重复等不是整数运算，不检查
+        for name, operand in ((a, left), (b, right)):
+            if self._int_value(operand) is None:
+                self.load_builtin(node, 'type')
+                self.load_name(node, name)
+                asm.emit(CALL_FUNCTION, 1, -1)
+                self.load_builtin(node, 'int')
+                asm.emit(COMPARE_OP, _COMPARE_OPS[ast.Is], -1)
+                asm.emit(POP_JUMP_IF_FALSE, done, -1)
+
+        if isinstance(op, ast.Mult):
+            # a为-1时只有b为最小值会溢出；否则结果不能整除回a即溢出（虚拟机的除法向零取整）
+            not_minus_one = _Label()
+            self.compare_const(node, a, ast.Eq, -1, not_minus_one)
+            self.compare_const(node, b, ast.Eq, _INT_MIN, done)
+            asm.emit(JUMP_ABSOLUTE, overflow)
+            asm.mark(not_minus_one)
+            self.compare_const(node, a, ast.NotEq, 0, done)
+            self.load_name(node, result)
+            self.load_name(node, a)
+            asm.emit(BINARY_DIVIDE, None, -1)
+            self.load_name(node, b)
+            asm.emit(COMPARE_OP, _COMPARE_OPS[ast.NotEq], -1)
+            asm.emit(POP_JUMP_IF_FALSE, done, -1)
+            asm.emit(JUMP_ABSOLUTE, overflow)
+        else:
+            # 加法在两数同号、减法在两数异号时，结果的符号与a不同即溢出
+            same_sign = isinstance(op, ast.Add)
+            a_non_negative = _Label()
+            self.compare_const(node, a, ast.Lt, 0, a_non_negative)
+            self.compare_const(node, b, ast.Lt if same_sign else ast.GtE, 0, done)
+            self.compare_const(node, result, ast.GtE, 0, done)
+            asm.emit(JUMP_ABSOLUTE, overflow)
+            asm.mark(a_non_negative)
+            self.compare_const(node, b, ast.GtE if same_sign else ast.Lt, 0, done)
+            self.compare_const(node, result, ast.Lt, 0, done)
+
+        asm.mark(overflow)
+        # 调用None使虚拟机出错退出，输出随之丢弃，由调用方退回CPython执行
+        asm.emit(LOAD_CONST, asm.const(OVERFLOW_MARKER), 1)
+        asm.emit(PRINT_ITEM, None, -1)
+        asm.emit(PRINT_NEWLINE)
+        asm.emit(LOAD_CONST, asm.const(None), 1)
+        asm.emit(CALL_FUNCTION, 0)
+        asm.emit(POP_TOP, None, -1)
+        asm.mark(done)
+        self.load_name(node, result)
+
+    def compare_const(self, node, name: str, op, value: int, otherwise: _Label) -> None:
+        """name与整数常量比较，不成立时跳到otherwise"""
+        self.load_name(node, name)
+        self.asm.emit(LOAD_CONST, self.asm.const(value), 1)
+        self.asm.emit(COMPARE_OP, _COMPARE_OPS[op], -1)
+        self.asm.emit(POP_JUMP_IF_FALSE, otherwise, -1)
+
+    def expr_UnaryOp(self, node) -> None:
+        # 虚拟机没有实现一元运算指令，改用等价的减法和条件跳转
+        if isinstance(node.op, ast.USub):
+            self.binary(node, ast.Sub(), ast.Constant(0, lineno=node.lineno), node.operand)
+        elif isinstance(node.op, ast.Not):
+            self.condition(node.operand)
+            self.negate(node)
+        else:
+            raise UnsupportedCode(node, f"{type(node.op).__name__}运算")
+
+    def negate(self, node) -> None:
+        """把栈顶的值替换为其逻辑非"""
+        asm = self.asm
+        true, end = _Label(), _Label()
+        asm.emit(POP_JUMP_IF_FALSE, true, -1)
+        self.load_bool(node, False)
+        asm.emit(JUMP_ABSOLUTE, end)
+        asm.depth -= 1
+        asm.mark(true)
+        self.load_bool(node, True)
+        asm.mark(end)
+
+    def expr_Compare(self, node) -> None:
+        if len(node.ops) != 1:
+            raise UnsupportedCode(node, "链式比较")
+        op = type(node.ops[0])
+        if op not in _COMPARE_OPS and op not in _NEGATED_COMPARE_OPS:
+            raise UnsupportedCode(node, f"{op.__name__}比较")
+        if op is not ast.Is and (self._is_boolean(node.left) or self._is_boolean(node.comparators[0])):
+            # 虚拟机比较布尔值时会崩溃
+            raise UnsupportedCode(node, "布尔值之间的比较")
+        self.expr(node.left)
+        self.expr(node.comparators[0])
+        self.asm.emit(COMPARE_OP, _COMPARE_OPS[_NEGATED_COMPARE_OPS.get(op, op)], -1)
+        if op in _NEGATED_COMPARE_OPS:
+            self.negate(node)
+
+    def expr_BoolOp(self, node) -> None:
+        # 虚拟机没有JUMP_IF_FALSE_OR_POP等指令，用DUP_TOP加条件跳转实现短路
+        asm = self.asm
+        end = _Label()
+        for value in node.values[:-1]:
+            self.condition(value)
+            asm.emit(DUP_TOP, None, 1)
+            next_value = _Label()
+            if isinstance(node.op, ast.And):
+                asm.emit(POP_JUMP_IF_FALSE, end, -1)
+            else:
+                asm.emit(POP_JUMP_IF_FALSE, next_value, -1)
+                asm.emit(JUMP_ABSOLUTE, end)
+            asm.mark(next_value)
+            asm.emit(POP_TOP, None, -1)
+        self.condition(node.values[-1])
+        asm.mark(end)
+
+    def expr_IfExp(self, node) -> None:
+        asm = self.asm
+        orelse, end = _Label(), _Label()
+        self.condition(node.test)
+        asm.emit(POP_JUMP_IF_FALSE, orelse, -1)
+        self.expr(node.body)
+        asm.emit(JUMP_ABSOLUTE, end)
+        asm.depth -= 1
+        asm.mark(orelse)
+        self.expr(node.orelse)
+        asm.mark(end)
+
+    def expr_List(self, node) -> None:
+        for element in node.elts:
+            if isinstance(element, ast.Starred):
+                raise UnsupportedCode(element, "列表解包")
+            self.expr(element)
+        self.asm.emit(BUILD_LIST, len(node.elts), 1 - len(node.elts))
+
+    def expr_Subscript(self, node) -> None:
+        if isinstance(node.slice, ast.Slice):
+            raise UnsupportedCode(node, "切片")
+        self.expr(node.value)
+        self.expr(node.slice)
+        self.asm.emit(BINARY_SUBSCR, None, -1)
+
+    def expr_Call(self, node) -> None:
+        if self._is_print(node):
+            raise UnsupportedCode(node, "作为表达式使用的print")
+        if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise UnsupportedCode(node, "关键字参数或参数解包")
+        if not isinstance(node.func, ast.Name):
+            raise UnsupportedCode(node, "方法调用")
+        self.expr(node.func)
+        for arg in node.args:
+            self.expr(arg)
+        self.asm.emit(CALL_FUNCTION, len(node.args), -len(node.args))
+
+    def print_call(self, node) -> None:
+        if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise UnsupportedCode(node, "带关键字参数的print")
+        for index, arg in enumerate(node.args):
+            if index:
+                # 虚拟机的PRINT_ITEM不在各项之间自动插入空格
+                self.asm.emit(LOAD_CONST, self.asm.const(' '), 1)
+                self.asm.emit(PRINT_ITEM, None, -1)
+            self.expr(arg)
+            self.asm.emit(PRINT_ITEM, None, -1)
+        self.asm.emit(PRINT_NEWLINE)
+
+    # 辅助判断
+
+    def _is_print(self, node) -> bool:
+        return (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'print'
+                and 'print' not in self.rebound)
+
+    def _is_range(self, node) -> bool:
+        return (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'range'
+                and 'range' not in self.rebound and 1 <= len(node.args) <= 3 and not node.keywords
+                and not any(isinstance(arg, ast.Starred) for arg in node.args))
+
+    def _is_boolean(self, node) -> bool:
+        """表达式的结果是否一定是布尔值"""
+        if isinstance(node, ast.Compare):
+            return True
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, bool)
+        if isinstance(node, ast.UnaryOp):
+            return isinstance(node.op, ast.Not) and self._is_boolean(node.operand)
+        if isinstance(node, ast.BoolOp):
+            return all(self._is_boolean(value) for value in node.values)
+        return False
+
+    @staticmethod
+    def _is_sequence(node) -> bool:
+        """表达式的结果是否一定是字符串或列表"""
+        return isinstance(node, ast.List) or (isinstance(node, ast.Constant) and isinstance(node.value, str))
+
+    @staticmethod
+    def _int_value(node) -> Optional[int]:
+        """整数常量（包括负数）的值，其他表达式返回None"""
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = _CodeGenerator._int_value(node.operand)
+            return None if value is None else -value
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return node.value
+        return None
+
+    @staticmethod
+    def _constant_int(node) -> int:
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -_CodeGenerator._constant_int(node.operand)
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return node.value
+        return 0
+
+
+class _RelativeLabel:
+    """相对跳转：回填的是目标与下一条指令的距离"""
+
+    def __init__(self, label: _Label, base: int):
+        self.label = label
+        self.base = base
+
+    @property
+    def offset(self) -> int:
+        return self.label.offset - self.base
+
+
+def compile_source(source: str, filename: str = "<string>") -> bytes:
+    """把源码编译为railgun格式的pyc内容，不支持的语法抛出UnsupportedCode"""
+    tree = ast.parse(source, filename)
+    rebound = {name for name in _assigned_names(tree.body)} | {
+        node.name for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)}
+    rebound |= {node.arg for node in ast.walk(tree) if isinstance(node, ast.arg)}
+    body = _CodeGenerator(filename, rebound).module(tree)
+    return MAGIC_NUMBER + b'\0' * (HEADER_SIZE - len(MAGIC_NUMBER)) + body
+
+
+def is_railgun_pyc(header: bytes) -> bool:
+    """根据文件头判断是否为railgun格式的pyc"""
+    return header[:len(MAGIC_NUMBER)] == MAGIC_NUMBER
+
+
+def empty_module() -> bytes:
+    """空模块的pyc，用作虚拟机启动时加载的lib/builtin.pyc"""
+    return compile_source('', 'builtin.py')
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pyvm.core.cache import default_cache_dir
+from pyvm.core.security import CodeSecurityChecker
+from pyvm.core.tree import iter_source_files
+
+SCAN_CACHE_VERSION = 1
+
+
+class ScanResult:
+    """单个文件的扫描结果"""
+
+    def __init__(self, path: str, digest: Optional[str], issues: List[str],
+                 error: Optional[str] = None, cached: bool = False):
+        self.path = path
+        self.digest = digest
+        self.issues = issues
+        self.error = error
+        self.cached = cached
+
+    @property
+    def safe(self) -> bool:
+        return self.error is None and not self.issues
+
+    def to_dict(self) -> dict:
+        return {
+            'path': self.path,
+            'sha256': self.digest,
+            'safe': self.safe,
+            'issues': self.issues,
+            'error': self.error,
+            'cached': self.cached,
+        }
+
+
+class ScanReport:
+    """批量扫描的汇总结果"""
+
+    def __init__(self):
+        self.results: List[ScanResult] = []
+        self.elapsed = 0.0
+
+    @property
+    def unsafe(self) -> List[ScanResult]:
+        return [result for result in self.results if not result.safe]
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(1 for result in self.results if result.cached)
+
+    def summary_dict(self) -> dict:
+        return {
+            'files': len(self.results),
+            'unsafe': len(self.unsafe),
+            'cached': self.cache_hits,
+            'elapsed': round(self.elapsed, 4),
+        }
+
+    def summary(self) -> str:
+        return (f"扫描文件: {len(self.results)}，发现问题: {len(self.unsafe)}，"
+                f"缓存命中: {self.cache_hits}，耗时: {self.elapsed:.2f}s")
+
+
+class ScanCache:
+    """按源码内容哈希缓存扫描结果
+
+    缓存文件按规则配置指纹区分，另外记录每个路径的(mtime, size, 哈希)，
+    未修改的文件无需重新读取和计算哈希；状态变化（如touch或复制到新路径）
+    但内容相同的文件在计算哈希后同样命中，不再重新检查。
+    """
+
+    def __init__(self, fingerprint: str, cache_dir: Optional[str] = None):
+        self.path = os.path.join(cache_dir or default_cache_dir(), 'scan', f"{fingerprint}.json")
+        self.entries: Dict[str, List[str]] = {}
+        self.stats: Dict[str, list] = {}
+        self._dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == SCAN_CACHE_VERSION:
+                self.entries = data.get('entries', {})
+                self.stats = data.get('stats', {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[Tuple[str, List[str]]]:
+        """根据文件状态查找缓存，返回(哈希, 问题列表)"""
+        known = self.stats.get(os.path.abspath(path))
+        if known is None or known[0] != st.st_mtime_ns or known[1] != st.st_size:
+            return None
+        issues = self.entries.get(known[2])
+        if issues is None:
+            return None
+        return known[2], issues
+
+    def store(self, path: str, st: Optional[os.stat_result], digest: str, issues: List[str]) -> None:
+        self.entries[digest] = issues
+        if st is not None:
+            self.stats[os.path.abspath(path)] = [st.st_mtime_ns, st.st_size, digest]
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': SCAN_CACHE_VERSION, 'entries': self.entries, 'stats': self.stats},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+# 工作进程内复用的检查器实例，以及已有缓存结果的内容哈希
+_worker_checker = None
+_worker_known = frozenset()
+
+
+def _init_worker(allow_list, deny_list, known_digests=frozenset()) -> None:
+    global _worker_checker, _worker_known
+    _worker_checker = CodeSecurityChecker(allow_list, deny_list)
+    _worker_known = known_digests
+
+
+def _scan_one(path: str) -> Tuple[str, Optional[str], Optional[List[str]], Optional[str]]:
+    """扫描单个文件，返回(路径, 内容哈希, 问题列表, 错误信息)
+
+    内容哈希已有缓存结果时不再检查，问题列表为None。
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in _worker_known:
+            return path, digest, None, None
+        if path.endswith('.pyc'):
+            # pyc文件直接检查字节码
+            _, issues = _worker_checker.check_pyc_bytes(data)
+            return path, digest, issues, None
+        code = data.decode('utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        return path, None, [], f"{type(e).__name__}: {e}"
+    _, issues = _worker_checker.check_code(code, path)
+    return path, digest, issues, None
+
+
+def iter_scan_targets(paths: Iterable[str], excludes: Optional[List[str]] = None):
+    """展开命令行给出的文件和目录"""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from iter_source_files(path, excludes)
+        else:
+            yield path
+
+
+def scan_paths(paths: Iterable[str], excludes: Optional[List[str]] = None, workers: Optional[int] = None,
+               allow_list=None, deny_list=None, use_cache: bool = True,
+               cache_dir: Optional[str] = None, on_result=None) -> ScanReport:
+    """并行扫描多个文件或目录
+
+    Args:
+        paths: 文件或目录
+        excludes: 遍历目录时排除的glob规则
+        workers: 工作进程数，默认等于CPU核数
+        allow_list/deny_list: 传给CodeSecurityChecker的黑白名单
+        use_cache: 是否使用按内容哈希的结果缓存
+        on_result: 每个文件完成时的回调，参数为ScanResult
+    """
+    report = ScanReport()
+    start = time.perf_counter()
+    checker = CodeSecurityChecker(allow_list, deny_list)
+    cache = ScanCache(checker.fingerprint(), cache_dir) if use_cache else None
+
+    def emit(result: ScanResult) -> None:
+        report.results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    pending = []
+    stats = {}
+    for path in iter_scan_targets(paths, excludes):
+        if cache is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            stats[path] = st
+            hit = cache.lookup(path, st) if st is not None else None
+            if hit is not None:
+                emit(ScanResult(path, hit[0], list(hit[1]), cached=True))
+                continue
+        pending.append(path)
+
+    def collect(results):
+        for path, digest, issues, error in results:
+            cached = issues is None
+            if cached:
+                issues = list(cache.entries[digest])
+            if cache is not None and digest is not None:
+                cache.store(path, stats.get(path), digest, issues)
+            emit(ScanResult(path, digest, issues, error, cached=cached))
+
+    known = frozenset(cache.entries) if cache is not None else frozenset()
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1 or len(pending) <= 1:
+        _init_worker(allow_list, deny_list, known)
+        collect(map(_scan_one, pending))
+    else:
+        chunksize = max(1, len(pending) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(allow_list, deny_list, known)) as executor:
+            collect(executor.map(_scan_one, pending, chunksize=chunksize))
+
+    if cache is not None:
+        cache.save()
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -1,11 +1,178 @@
 import ast
+import hashlib
 import inspect
 import os
-import re
-from typing import List, Dict, Any, Tuple
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
+from pyvm.core.analysis import SourceAnalysis, analyze_source
+from pyvm.core.bytecode import extract_facts
+from pyvm.core.pyc import load_code
+from pyvm.core.timing import Timings
+
+
+# pyc检查结果缓存的条目上限
+PYC_VERDICT_CACHE_SIZE = 4096
+
+
+class SecurityCheckError(PermissionError):
+    """代码未通过安全检查"""
+
+    def __init__(self, message: str, issues: List[str]):
+        super().__init__(message)
+        self.issues = issues
+
+
+def call_name_parts(node) -> Tuple[str, ...]:
+    """获取函数调用名称的各级组成部分，如os.path.join -> ('os', 'path', 'join')"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return ()
+    parts.append(node.id)
+    parts.reverse()
+    return tuple(parts)
+
+
+class RuleContext:
+    """单次检查的规则上下文，收集问题和操作类别"""
+
+    def __init__(self):
+        self.issues: List[str] = []
+        self.flags = set()
+
+    def report(self, message: str) -> None:
+        self.issues.append(message)
+
+    def flag(self, name: str) -> None:
+        self.flags.add(name)
+
+
+class SecurityRule:
+    """安全规则基类
+
+    子类通过node_types声明关注的AST节点类型，check在遍历到这些节点时调用。
+    """
+    node_types: Tuple[type, ...] = ()
+
+    def check(self, node, context: RuleContext) -> None:
+        raise NotImplementedError
+
+
+class DangerousImportRule(SecurityRule):
+    """危险模块导入"""
+    node_types = (ast.Import, ast.ImportFrom)
+
+    def __init__(self, modules: FrozenSet[str]):
+        self.modules = modules
+
+    def check(self, node, context: RuleContext) -> None:
+        modules = self.modules
+        if type(node) is ast.Import:
+            for name in node.names:
+                if name.name in modules:
+                    context.report(f"危险导入: import {name.name}")
+        elif node.module in modules:
+            context.report(f"危险导入: from {node.module} import ...")
+
+
+class DangerousCallRule(SecurityRule):
+    """危险函数调用及系统命令、写文件、网络连接等操作类别"""
+    node_types = (ast.Call,)
+
+    def __init__(self, functions: FrozenSet[Tuple[str, str]], allowed: FrozenSet[Tuple[str, ...]],
+                 flag_calls: Dict[Tuple[str, ...], str]):
+        self.functions = functions
+        self.allowed = allowed
+        self.flag_calls = flag_calls
+
+    def check(self, node, context: RuleContext) -> None:
+        parts = call_name_parts(node.func)
+        if not parts:
+            return
+
+        flag = self.flag_calls.get(parts)
+        if flag is not None:
+            if flag != 'write' or _is_write_mode(node):
+                context.flag(flag)
+
+        # 按(模块名, 函数基本名)检查危险函数
+        if len(parts) > 1 and (parts[0], parts[-1]) in self.functions and parts not in self.allowed:
+            context.report(f"危险函数调用: {'.'.join(parts)}")
+
+
+class DenyListRule(SecurityRule):
+    """黑名单中的模块导入和函数调用"""
+    node_types = (ast.Import, ast.ImportFrom, ast.Call)
+
+    def __init__(self, denied: FrozenSet[Tuple[str, ...]]):
+        self.denied = denied
+
+    def check(self, node, context: RuleContext) -> None:
+        node_type = type(node)
+        if node_type is ast.Call:
+            parts = call_name_parts(node.func)
+            if parts in self.denied:
+                context.report(f"禁止的调用: {'.'.join(parts)}")
+            return
+
+        modules = [name.name for name in node.names] if node_type is ast.Import else [node.module or '']
+        for module in modules:
+            parts = tuple(module.split('.'))
+            if any(parts[:i] in self.denied for i in range(1, len(parts) + 1)):
+                context.report(f"禁止的导入: {module}")
+
+
+def _is_write_mode(node: ast.Call) -> bool:
+    """判断open调用是否以写入或追加模式打开"""
+    mode = node.args[1] if len(node.args) > 1 else None
+    for keyword in node.keywords:
+        if keyword.arg == 'mode':
+            mode = keyword.value
+    if isinstance(mode, ast.Constant) and isinstance(mode.value, str):
+        return _is_write_mode_string(mode.value)
+    return False
+
+
+def _is_write_mode_string(mode: str) -> bool:
+    return 'w' in mode or 'a' in mode
+
+
+# 合法的open模式字符，用于在字节码中识别模式字符串
+_MODE_CHARS = frozenset('rwxabt+U')
+
+
+class CompiledRuleSet:
+    """按AST节点类型索引的规则集，同时保存供字节码检查使用的查找表"""
+
+    def __init__(self, rules: List[SecurityRule], modules: FrozenSet[str] = frozenset(),
+                 functions: FrozenSet[Tuple[str, str]] = frozenset(),
+                 allowed: FrozenSet[Tuple[str, ...]] = frozenset(),
+                 flag_calls: Optional[Dict[Tuple[str, ...], str]] = None,
+                 denied: FrozenSet[Tuple[str, ...]] = frozenset()):
+        self.rules = list(rules)
+        self.modules = modules
+        self.functions = functions
+        self.allowed = allowed
+        self.flag_calls = flag_calls or {}
+        self.denied = denied
+        # co_names中出现这些名称的代码对象才需要逐条遍历
+        interesting = set(modules) | {module for module, _ in functions}
+        interesting.update(parts[0] for parts in self.flag_calls)
+        interesting.update(parts[0] for parts in denied)
+        interesting.update(module.split('.')[0] for module in modules)
+        self.interesting = frozenset(interesting)
+        dispatch: Dict[type, list] = {}
+        for rule in self.rules:
+            for node_type in rule.node_types:
+                dispatch.setdefault(node_type, []).append(rule.check)
+        self.dispatch = {node_type: tuple(handlers) for node_type, handlers in dispatch.items()}
+
 
 class CodeSecurityChecker:
     """代码安全检查器，用于在执行前分析Python代码是否包含危险操作"""
@@ -22,17 +189,79 @@ class CodeSecurityChecker:
     
     # 危险模块列表
     DANGEROUS_MODULES = ['ctypes', 'imp', 'importlib', 'msvcrt', 'pdb', 'pty', 'readline', 'signal']
+
+    # 操作类别对应的调用
+    FLAG_CALLS = {
+        ('os', 'system'): 'system',
+        ('subprocess', 'run'): 'system',
+        ('open',): 'write',
+        ('socket', 'socket'): 'network',
+        ('urllib', 'request', 'urlopen'): 'network',
+    }
+
+    # 操作类别提示（按输出顺序）
+    FLAG_MESSAGES = [
+        ('system', "发现系统命令执行代码"),
+        ('write', "发现写文件操作"),
+        ('network', "发现网络连接操作"),
+    ]
     
-    def __init__(self, allow_list=None, deny_list=None):
+    def __init__(self, allow_list=None, deny_list=None, rules=None):
         """
         初始化安全检查器
         
         Args:
             allow_list: 允许的操作白名单
             deny_list: 禁止的操作黑名单
+            rules: 额外的自定义规则（SecurityRule实例）
         """
         self.allow_list = allow_list or []
         self.deny_list = deny_list or []
+        self.extra_rules = list(rules or [])
+        self._rule_set = None
+        self._pyc_verdicts = OrderedDict()
+        self._pyc_lock = threading.Lock()
+        # 最近一次源码检查的各阶段耗时
+        self.last_timings: Optional[Timings] = None
+
+    @property
+    def rule_set(self) -> CompiledRuleSet:
+        """编译后的规则集，首次使用时构建"""
+        if self._rule_set is None:
+            self._rule_set = self.compile_rules()
+        return self._rule_set
+
+    def compile_rules(self) -> CompiledRuleSet:
+        """根据危险列表和黑白名单预先构建查找表"""
+        allowed = frozenset(tuple(name.split('.')) for name in self.allow_list)
+        modules = frozenset(self.DANGEROUS_MODULES) - frozenset(self.allow_list)
+        functions = frozenset((module, func) for module, funcs in self.DANGEROUS_FUNCTIONS.items()
+                              for func in funcs)
+        denied = frozenset(tuple(name.split('.')) for name in self.deny_list)
+        flag_calls = dict(self.FLAG_CALLS)
+        rules = [
+            DangerousImportRule(modules),
+            DangerousCallRule(functions, allowed, flag_calls),
+        ]
+        if denied:
+            rules.append(DenyListRule(denied))
+        rules.extend(self.extra_rules)
+        return CompiledRuleSet(rules, modules, functions, allowed, flag_calls, denied)
+
+    def add_rule(self, rule: SecurityRule) -> None:
+        """注册自定义规则"""
+        self.extra_rules.append(rule)
+        self._rule_set = None
+        self._pyc_verdicts.clear()
+
+    def fingerprint(self) -> str:
+        """规则配置指纹，用于区分不同配置下的缓存结果"""
+        h = hashlib.sha256()
+        h.update(repr((sorted(self.DANGEROUS_MODULES),
+                       sorted((k, sorted(v)) for k, v in self.DANGEROUS_FUNCTIONS.items()),
+                       sorted(self.FLAG_CALLS.items()), sorted(self.allow_list), sorted(self.deny_list),
+                       [type(rule).__qualname__ for rule in self.extra_rules])).encode('utf-8'))
+        return h.hexdigest()[:16]
         
     def check_code(self, code: str, filename: str = "<string>") -> Tuple[bool, List[str]]:
         """
@@ -46,72 +275,118 @@ class CodeSecurityChecker:
             (安全状态, 危险信息列表)
         """
         try:
-            # 解析代码为AST
-            tree = ast.parse(code, filename=filename)
-            
-            # 初始化危险信息列表
-            issues = []
-            
-            # 检查导入的模块
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        if name.name in self.DANGEROUS_MODULES and name.name not in self.allow_list:
-                            issues.append(f"危险导入: import {name.name}")
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module in self.DANGEROUS_MODULES and node.module not in self.allow_list:
-                        issues.append(f"危险导入: from {node.module} import ...")
-            
-            # 检查危险函数调用
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Call):
-                    # 处理函数调用
-                    func_name = self._get_function_name(node.func)
-                    if func_name:
-                        module_name, func_base_name = self._split_function_name(func_name)
-                        
-                        # 检查是否在危险函数列表中
-                        if module_name in self.DANGEROUS_FUNCTIONS:
-                            if func_base_name in self.DANGEROUS_FUNCTIONS[module_name] and \
-                               func_name not in self.allow_list:
-                                issues.append(f"危险函数调用: {func_name}")
-            
-            # 检查系统命令执行模式
-            if re.search(r'os\.system\(|subprocess\.run\(', code):
-                issues.append("发现系统命令执行代码")
-            
-            # 检查文件操作权限
-            if re.search(r'open\([^)]*, *[\'"]w[\'"]', code) or re.search(r'open\([^)]*, *[\'"]a[\'"]', code):
-                issues.append("发现写文件操作")
-            
-            # 检查网络连接
-            if re.search(r'socket\.socket\(', code) or re.search(r'urllib\.request\.urlopen\(', code):
-                issues.append("发现网络连接操作")
-            
-            return (len(issues) == 0, issues)
-            
+            analysis = self.analyze(code, filename)
         except SyntaxError as e:
             return (False, [f"语法错误: {str(e)}"])
-    
-    def _get_function_name(self, node) -> str:
-        """获取函数调用的完整名称"""
-        if isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.Attribute):
-            return self._get_attribute_name(node)
-        return ""
-    
-    def _get_attribute_name(self, node) -> str:
-        """获取属性访问的完整名称"""
-        if isinstance(node.value, ast.Name):
-            return f"{node.value.id}.{node.attr}"
-        elif isinstance(node.value, ast.Attribute):
-            return f"{self._get_attribute_name(node.value)}.{node.attr}"
-        return ""
-    
-    def _split_function_name(self, func_name: str) -> Tuple[str, str]:
-        """分割函数名称为模块名和函数基本名"""
-        parts = func_name.split('.')
-        if len(parts) > 1:
-            return (parts[0], parts[-1])
-        return (None, func_name)    
\ No newline at end of file
+        return (analysis.is_safe, analysis.issues)
+
+    def analyze(self, code: str, filename: str = "<string>", timings: Optional[Timings] = None) -> SourceAnalysis:
+        """
+        解析并检查代码，返回可供编译器复用的分析结果
+
+        各阶段耗时记录在timings（未传入时新建）中，并保存到last_timings。
+        语法错误时抛出SyntaxError
+        """
+        timings = Timings() if timings is None else timings
+        self.last_timings = timings
+        return analyze_source(code, filename, self, timings)
+
+    def new_context(self) -> RuleContext:
+        return RuleContext()
+
+    def finish(self, context: RuleContext) -> List[str]:
+        """汇总检查结果，操作类别提示按固定顺序追加在末尾"""
+        return context.issues + [message for flag, message in self.FLAG_MESSAGES if flag in context.flags]
+
+    def check_code_object(self, code_object) -> Tuple[bool, List[str]]:
+        """
+        检查代码对象（无需源码）
+
+        对代码对象及co_consts中嵌套的代码对象做一次操作码遍历，检查导入指令
+        和名称引用链，不做反编译。自定义的AST规则不参与字节码检查。
+
+        Returns:
+            (安全状态, 危险信息列表)
+        """
+        rule_set = self.rule_set
+        facts = extract_facts(code_object, rule_set.interesting)
+        issues = []
+        flags = set()
+
+        for module, fromlist in facts.imports:
+            if module.startswith('.'):
+                continue
+            parts = tuple(module.split('.'))
+            if module in rule_set.modules:
+                if fromlist is None:
+                    issues.append(f"危险导入: import {module}")
+                else:
+                    issues.append(f"危险导入: from {module} import ...")
+            if rule_set.denied and any(parts[:i] in rule_set.denied for i in range(1, len(parts) + 1)):
+                issues.append(f"禁止的导入: {module}")
+
+        for parts in facts.references:
+            flag = rule_set.flag_calls.get(parts)
+            if flag is not None and flag != 'write':
+                flags.add(flag)
+            if len(parts) > 1 and (parts[0], parts[-1]) in rule_set.functions and parts not in rule_set.allowed:
+                issues.append(f"危险函数调用: {'.'.join(parts)}")
+            if parts in rule_set.denied:
+                issues.append(f"禁止的调用: {'.'.join(parts)}")
+
+        for _, strings in facts.call_strings:
+            if any(_MODE_CHARS.issuperset(value) and value and _is_write_mode_string(value)
+                   for value in strings):
+                flags.add('write')
+
+        context = RuleContext()
+        context.issues = issues
+        context.flags = flags
+        issues = self.finish(context)
+        return (len(issues) == 0, issues)
+
+    def check_pyc_bytes(self, data, code_object=None) -> Tuple[bool, List[str]]:
+        """
+        检查pyc文件内容，结果按文件内容的sha256缓存
+
+        Args:
+            data: 完整的pyc文件内容
+            code_object: 调用方已反序列化的代码对象，避免重复解析
+        """
+        digest = hashlib.sha256(data).digest()
+        if code_object is None:
+            verdict = self._cached_verdict(digest)
+            if verdict is not None:
+                return verdict
+            try:
+                _, code_object = load_code(data)
+            except ValueError as e:
+                return (False, [str(e)])
+        return self.check_pyc_digest(digest, code_object)
+
+    def check_pyc_digest(self, digest: bytes, code_object) -> Tuple[bool, List[str]]:
+        """按已计算好的pyc文件哈希检查代码对象，命中缓存时不再遍历字节码"""
+        verdict = self._cached_verdict(digest)
+        if verdict is not None:
+            return verdict
+        verdict = self.check_code_object(code_object)
+
+        with self._pyc_lock:
+            self._pyc_verdicts[digest] = (verdict[0], tuple(verdict[1]))
+            if len(self._pyc_verdicts) > PYC_VERDICT_CACHE_SIZE:
+                self._pyc_verdicts.popitem(last=False)
+        return verdict
+
+    def _cached_verdict(self, digest: bytes) -> Optional[Tuple[bool, List[str]]]:
+        with self._pyc_lock:
+            verdict = self._pyc_verdicts.get(digest)
+            if verdict is None:
+                return None
+            self._pyc_verdicts.move_to_end(digest)
+            return verdict[0], list(verdict[1])
+
+    def check_pyc(self, pyc_path: str) -> Tuple[bool, List[str]]:
+        """检查pyc文件"""
+        with open(pyc_path, 'rb') as f:
+            data = f.read()
+        return self.check_pyc_bytes(data)
@@ -0,0 +1,266 @@
+import os
+import json
+import socket
+import struct
+import asyncio
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from pyvm.core.cache import CompileCache
+
+# 协议：4字节大端长度 + UTF-8编码的JSON
+_FRAME_HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+def default_socket_path() -> str:
+    """默认的Unix套接字路径，可通过环境变量PYVM_SOCKET覆盖"""
+    path = os.environ.get('PYVM_SOCKET')
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"pyvm-{os.getuid()}.sock")
+
+
+def encode_frame(obj) -> bytes:
+    data = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+    return _FRAME_HEADER.pack(len(data)) + data
+
+
+# 工作进程内复用的编译器，以及按(白名单, 黑名单)复用的检查器
+_worker_compiler = None
+_worker_checkers = {}
+
+
+def _init_worker(cache_dir: Optional[str], use_cache: bool) -> None:
+    global _worker_compiler
+    from pyvm.core.compiler import PyCompiler
+    _worker_compiler = PyCompiler(cache=CompileCache(cache_dir) if use_cache else None)
+
+
+def _get_checker(allow_list, deny_list):
+    key = (tuple(allow_list or ()), tuple(deny_list or ()))
+    checker = _worker_checkers.get(key)
+    if checker is None:
+        from pyvm.core.security import CodeSecurityChecker
+        checker = _worker_checkers[key] = CodeSecurityChecker(allow_list, deny_list)
+    return checker
+
+
+def _compile_job(source: str, output: Optional[str]) -> dict:
+    output_path = _worker_compiler.compile_file(source, output)
+    return {'output': output_path, 'imports': _worker_compiler.file_imports.pop(source, [])}
+
+
+def _check_job(paths: List[str], allow_list=None, deny_list=None) -> dict:
+    checker = _get_checker(allow_list, deny_list)
+    results = []
+    for path in paths:
+        try:
+            if path.endswith('.pyc'):
+                is_safe, issues = checker.check_pyc(path)
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    is_safe, issues = checker.check_code(f.read(), path)
+            results.append({'path': path, 'safe': is_safe, 'issues': issues, 'error': None})
+        except (OSError, UnicodeDecodeError) as e:
+            results.append({'path': path, 'safe': False, 'issues': [], 'error': f"{type(e).__name__}: {e}"})
+    return {'results': results}
+
+
+class PyVMServer:
+    """常驻后台的编译/检查/执行服务
+
+    通过Unix套接字接收带长度前缀的JSON请求，编译和检查在进程池中执行，
+    执行请求交给ForkServer在隔离子进程中完成。同时处理的请求数受jobs
+    限制：达到上限后不再从连接中读取新请求，客户端写入随之阻塞（背压）。
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, preload=(), module_paths=None,
+                 check_security: bool = True, cache_dir: Optional[str] = None, use_cache: bool = True):
+        self.socket_path = socket_path or default_socket_path()
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_pending = max_pending or self.workers * 4
+        self.preload = list(preload)
+        self.module_paths = module_paths or []
+        self.check_security = check_security
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._slots = None
+        self._server = None
+        self._stopped = None
+
+    async def serve_forever(self) -> None:
+        from pyvm.core.forkserver import ForkServer
+
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._stopped = asyncio.Event()
+        if os.path.exists(self.socket_path):
+            # 清理上次异常退出遗留的套接字文件
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"服务已在运行: {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+
+        # zygote需要在创建线程和进程池之前fork
+        self.fork_server = ForkServer(self.preload, self.module_paths, self.check_security)
+        self.fork_server.start()
+        self.process_pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                initargs=(self.cache_dir, self.use_cache))
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.max_pending)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+            async with self._server:
+                await self._stopped.wait()
+        finally:
+            self.process_pool.shutdown(cancel_futures=True)
+            self.thread_pool.shutdown(wait=False)
+            self.fork_server.stop()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def stop(self) -> None:
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                # 先占用处理名额再读取请求，名额用尽时形成背压
+                await self._slots.acquire()
+                try:
+                    header = await reader.readexactly(_FRAME_HEADER.size)
+                    size = _FRAME_HEADER.unpack(header)[0]
+                    if size > MAX_FRAME_SIZE:
+                        raise ValueError("请求过大")
+                    request = json.loads(await reader.readexactly(size))
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    self._slots.release()
+                    break
+                task = asyncio.ensure_future(self._process(request, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def _process(self, request: dict, writer: asyncio.StreamWriter, write_lock: asyncio.Lock) -> None:
+        response = {'id': request.get('id')}
+        self.in_flight += 1
+        try:
+            response['result'] = await self._dispatch(request)
+            response['ok'] = True
+            self.completed += 1
+        except Exception as e:
+            response['ok'] = False
+            response['error'] = f"{type(e).__name__}: {e}"
+            self.failed += 1
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+        async with write_lock:
+            try:
+                writer.write(encode_frame(response))
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, request: dict):
+        loop = asyncio.get_running_loop()
+        op = request.get('op')
+        if op == 'compile':
+            return await loop.run_in_executor(self.process_pool, _compile_job,
+                                              request['source'], request.get('output'))
+        if op == 'check':
+            return await loop.run_in_executor(self.process_pool, _check_job, list(request['paths']),
+                                              request.get('allow'), request.get('deny'))
+        if op == 'execute':
+            result = await loop.run_in_executor(self.thread_pool, self.fork_server.execute_pyc,
+                                                request['path'], request.get('timeout'))
+            return result.to_dict()
+        if op == 'ping':
+            return {'pid': os.getpid()}
+        if op == 'stats':
+            return {
+                'completed': self.completed,
+                'failed': self.failed,
+                'in_flight': self.in_flight,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+            }
+        if op == 'shutdown':
+            loop.call_soon(self.stop)
+            return {}
+        raise ValueError(f"未知的请求类型: {op}")
+
+
+class PyVMClient:
+    """PyVMServer的同步客户端"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        self.socket_path = socket_path or default_socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(self.socket_path)
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def request(self, op: str, **params):
+        """发送请求并等待响应，服务端出错时抛出RuntimeError"""
+        self._next_id += 1
+        request_id = self._next_id
+        self._sock.sendall(encode_frame(dict(params, op=op, id=request_id)))
+        while True:
+            response = self._recv()
+            if response.get('id') == request_id:
+                break
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', "未知错误"))
+        return response.get('result')
+
+    def _recv(self) -> dict:
+        header = self._recv_exact(_FRAME_HEADER.size)
+        return json.loads(self._recv_exact(_FRAME_HEADER.unpack(header)[0]))
+
+    def _recv_exact(self, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = self._sock.recv(size)
+            if not chunk:
+                raise ConnectionError("与pyvm服务的连接已断开")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def compile(self, source: str, output: Optional[str] = None) -> dict:
+        return self.request('compile', source=os.path.abspath(source),
+                            output=os.path.abspath(output) if output else None)
+
+    def check(self, paths: List[str], allow_list=None, deny_list=None) -> dict:
+        return self.request('check', paths=[os.path.abspath(path) for path in paths],
+                            allow=allow_list, deny=deny_list)
+
+    def execute(self, path: str, timeout: Optional[float] = None) -> dict:
+        return self.request('execute', path=os.path.abspath(path), timeout=timeout)
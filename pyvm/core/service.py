@@ -0,0 +1,189 @@
+import os
+import marshal
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import List, Optional, Union
+
+from pyvm.core.analysis import analyze_source
+from pyvm.core.cache import CompileCache
+from pyvm.core.compiler import PyCompiler
+from pyvm.core.timing import Timings
+
+
+class CompileResult:
+    """单次编译任务的结果，各任务之间互不共享状态"""
+
+    def __init__(self, filename: str, output_path: Optional[str] = None, code_object=None,
+                 imports: Optional[List[str]] = None, diagnostics: Optional[List[str]] = None,
+                 timings: Optional[Timings] = None, error: Optional[str] = None, cached: bool = False,
+                 optimization=None):
+        self.filename = filename
+        # 写入的pyc路径，内存编译时为None
+        self.output_path = output_path
+        self.code_object = code_object
+        self.imports = imports or []
+        # 安全检查发现的问题和语法错误
+        self.diagnostics = diagnostics or []
+        self.timings = timings or Timings()
+        self.error = error
+        # 是否命中编译缓存（未重新编译）
+        self.cached = cached
+        self.optimization = optimization
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def is_safe(self) -> bool:
+        return not self.diagnostics
+
+    def __getstate__(self):
+        # 代码对象不支持pickle，跨进程传递时以marshal序列化
+        state = dict(self.__dict__)
+        if state['code_object'] is not None:
+            state['code_object'] = marshal.dumps(state['code_object'])
+        return state
+
+    def __setstate__(self, state):
+        if state['code_object'] is not None:
+            state['code_object'] = marshal.loads(state['code_object'])
+        self.__dict__.update(state)
+
+    def to_dict(self) -> dict:
+        return {
+            'filename': self.filename,
+            'output': self.output_path,
+            'ok': self.ok,
+            'error': self.error,
+            'imports': self.imports,
+            'diagnostics': self.diagnostics,
+            'cached': self.cached,
+            'timings': self.timings.to_dict(),
+        }
+
+
+# 按配置复用的编译缓存和安全检查器（两者均可在线程间共享）
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _get_shared(cache_dir: Optional[str], use_cache: bool, check_security: bool, allow_list, deny_list):
+    key = (cache_dir, use_cache, check_security, tuple(allow_list or ()), tuple(deny_list or ()))
+    with _shared_lock:
+        shared = _shared.get(key)
+        if shared is None:
+            checker = None
+            if check_security:
+                from pyvm.core.security import CodeSecurityChecker
+                checker = CodeSecurityChecker(allow_list, deny_list)
+            shared = _shared[key] = (CompileCache(cache_dir) if use_cache else None, checker)
+    return shared
+
+
+def _compile_job(options: dict, filename: str, source: Optional[Union[str, bytes]] = None,
+                 output_path: Optional[str] = None) -> CompileResult:
+    """编译任务，source为None时从filename读取并写入output_path
+
+    每个任务使用独立的PyCompiler，导入记录、分析结果和耗时都不会被其他任务覆盖。
+    任务参数和返回值都可以pickle，因此同样适用于进程池。
+    """
+    cache, checker = _get_shared(options['cache_dir'], options['use_cache'], options['check_security'],
+                                 options['allow_list'], options['deny_list'])
+    compiler = PyCompiler(cache=cache, opt_level=options['opt_level'],
+                          optimization_stats=options['optimization_stats'])
+    timings = Timings()
+
+    # 先做安全检查，缓存命中时同样能得到诊断信息；解析结果直接用于编译
+    diagnostics = []
+    analysis = None
+    try:
+        if source is None:
+            with timings.span('read'), open(filename, 'rb') as f:
+                source = f.read()
+        source_bytes = source.encode('utf-8') if isinstance(source, str) else source
+        if checker is not None:
+            analysis = analyze_source(source_bytes.decode('utf-8'), filename, checker, timings)
+            diagnostics.extend(analysis.issues)
+        code_object = compiler.compile_source(source_bytes, filename, analysis, timings)
+        if output_path is not None:
+            with timings.span('write'):
+                compiler.write_pyc_file(output_path, code_object, filename, source_bytes)
+    except SyntaxError as e:
+        message = f"语法错误: {e}"
+        return CompileResult(filename, diagnostics=[message], timings=timings, error=message)
+    except (OSError, UnicodeDecodeError) as e:
+        message = f"{type(e).__name__}: {e}"
+        return CompileResult(filename, diagnostics=diagnostics + [message], timings=timings, error=message)
+    return CompileResult(filename, output_path, code_object, compiler.get_file_imports(filename), diagnostics,
+                         timings, cached='compile' not in timings.stages, optimization=compiler.last_optimization)
+
+
+class CompilerService:
+    """可重入的编译服务，供多个线程或协程同时提交编译任务
+
+    每个任务返回独立的CompileResult，不存在共享的可变状态，无需全局锁。
+    默认使用线程池执行；也可以传入任意concurrent.futures执行器（包括进程池），
+    传入的执行器由调用方负责关闭。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, use_cache: bool = True, opt_level: int = 0,
+                 check_security: bool = True, allow_list=None, deny_list=None,
+                 optimization_stats: bool = False, executor: Optional[Executor] = None,
+                 max_workers: Optional[int] = None):
+        self.options = {
+            'cache_dir': cache_dir,
+            'use_cache': use_cache,
+            'opt_level': opt_level,
+            'check_security': check_security,
+            'allow_list': list(allow_list or []),
+            'deny_list': list(deny_list or []),
+            'optimization_stats': optimization_stats,
+        }
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers, thread_name_prefix='pyvm-compile')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self, wait: bool = True) -> None:
+        if self._own_executor:
+            self.executor.shutdown(wait=wait)
+
+    def submit_source(self, source: Union[str, bytes], filename: str = "<string>",
+                      output_path: Optional[str] = None) -> Future:
+        """提交源码编译任务，返回结果为CompileResult的Future
+
+        output_path不为None时同时写入pyc文件。
+        """
+        return self.executor.submit(_compile_job, self.options, filename, source, output_path)
+
+    def submit_file(self, source_path: str, output_path: Optional[str] = None) -> Future:
+        """提交源文件编译任务，output_path默认为源文件同目录下的同名pyc"""
+        if output_path is None:
+            output_path = os.path.splitext(source_path)[0] + '.pyc'
+        return self.executor.submit(_compile_job, self.options, source_path, None, output_path)
+
+    def compile_source(self, source: Union[str, bytes], filename: str = "<string>",
+                       output_path: Optional[str] = None) -> CompileResult:
+        """在调用线程中直接编译源码"""
+        return _compile_job(self.options, filename, source, output_path)
+
+    def compile_file(self, source_path: str, output_path: Optional[str] = None) -> CompileResult:
+        """在调用线程中直接编译源文件"""
+        if output_path is None:
+            output_path = os.path.splitext(source_path)[0] + '.pyc'
+        return _compile_job(self.options, source_path, None, output_path)
+
+    async def compile_source_async(self, source: Union[str, bytes], filename: str = "<string>",
+                                   output_path: Optional[str] = None) -> CompileResult:
+        """在执行器中编译源码，不阻塞事件循环"""
+        return await asyncio.wrap_future(self.submit_source(source, filename, output_path))
+
+    async def compile_file_async(self, source_path: str, output_path: Optional[str] = None) -> CompileResult:
+        """在执行器中编译源文件，不阻塞事件循环"""
+        return await asyncio.wrap_future(self.submit_file(source_path, output_path))
@@ -0,0 +1,169 @@
+import time
+import ctypes
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# 各阶段的显示名称
+STAGE_LABELS = {
+    'read': '读取',
+    'cache': '缓存',
+    'parse': '解析',
+    'analyze': '导入分析/安全检查',
+    'security': '安全检查',
+    'compile': '编译',
+    'marshal': '序列化',
+    'write': '写入',
+    'load': '加载',
+    'exec': '执行',
+}
+
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """解析"512M"、"2G"、"65536"这样的字节数"""
+    value = text.strip().upper().rstrip('B')
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ''
+    number = value[:-1] if unit else value
+    try:
+        return int(float(number) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"无效的大小: {text}")
+
+
+def format_size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+class Timings:
+    """一次编译或执行中各阶段的耗时记录"""
+
+    def __init__(self):
+        self.spans: List[Tuple[str, float]] = []
+        # 执行期间的内存峰值（字节），未统计时为None
+        self.peak_memory: Optional[int] = None
+
+    @contextmanager
+    def span(self, name: str):
+        """记录代码块的耗时，同名阶段多次出现时累加"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, time.perf_counter() - start))
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans.append((name, seconds))
+
+    @property
+    def stages(self) -> Dict[str, float]:
+        """按阶段汇总的耗时（保持首次出现的顺序）"""
+        result: Dict[str, float] = {}
+        for name, seconds in self.spans:
+            result[name] = result.get(name, 0.0) + seconds
+        return result
+
+    @property
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.spans)
+
+    def to_dict(self) -> dict:
+        return {
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'total': round(self.total, 6),
+            'peak_memory': self.peak_memory,
+        }
+
+    def format(self) -> str:
+        """单行摘要，用于命令行和状态栏"""
+        parts = [f"{STAGE_LABELS.get(name, name)} {seconds * 1000:.2f}ms"
+                 for name, seconds in self.stages.items()]
+        text = '，'.join(parts) + f"（合计 {self.total * 1000:.2f}ms）"
+        if self.peak_memory is not None:
+            text += f"，内存峰值 {format_size(self.peak_memory)}"
+        return text
+
+
+# 同时使用tracemalloc的MemoryMonitor数，以及tracing是否由它们开启（最后一个退出时才停止）
+_tracing_users = 0
+_tracing_started = False
+_tracing_lock = threading.Lock()
+
+
+def _set_async_exc(thread_id: int, exc_type) -> int:
+    return ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id), ctypes.py_object(exc_type) if exc_type is not None else None)
+
+
+class MemoryMonitor:
+    """统计代码块执行期间的内存峰值，并可强制内存上限
+
+    使用tracemalloc统计Python分配的内存。设置limit后由看门狗线程定期检查，
+    超过上限时向执行线程注入MemoryError，在下一条字节码处中断执行。
+    单次超大分配（如一次申请数GB）无法在分配前拦截。
+    tracemalloc是进程全局的：多个监视器同时使用时按引用计数开启和停止，
+    峰值只在没有其他监视器时重置，因此并发执行时得到的峰值包含其他执行的分配，是上界。
+    """
+
+    def __init__(self, limit: Optional[int] = None, interval: float = 0.01):
+        self.limit = limit
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self.exceeded = False
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._watchdog = None
+        self._thread_id = None
+
+    def __enter__(self):
+        global _tracing_users, _tracing_started
+        with _tracing_lock:
+            if _tracing_users == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing_started = True
+                tracemalloc.reset_peak()
+            _tracing_users += 1
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._thread_id = threading.get_ident()
+        if self.limit is not None:
+            self._watchdog = threading.Thread(target=self._watch, name='pyvm-memory-watchdog', daemon=True)
+            self._watchdog.start()
+        return self
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            if tracemalloc.get_traced_memory()[0] - self._base > self.limit:
+                with self._lock:
+                    if not self._stop.is_set():
+                        self.exceeded = True
+                        _set_async_exc(self._thread_id, MemoryError)
+                return
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            if self.exceeded:
+                # 清除可能尚未触发的异步异常
+                _set_async_exc(self._thread_id, None)
+        self._release_tracing()
+        if self.exceeded and exc_type is not None and issubclass(exc_type, MemoryError):
+            raise MemoryError(f"内存使用超过上限 {format_size(self.limit)}") from exc
+        return False
+
+    def _release_tracing(self) -> None:
+        global _tracing_users, _tracing_started
+        with _tracing_lock:
+            self.peak = max(0, tracemalloc.get_traced_memory()[1] - self._base)
+            _tracing_users -= 1
+            if _tracing_users == 0 and _tracing_started:
+                tracemalloc.stop()
+                _tracing_started = False
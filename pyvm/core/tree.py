@@ -0,0 +1,234 @@
+import os
+import time
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pyvm.core.cache import CompileCache
+from pyvm.core.compiler import PyCompiler
+from pyvm.core.depgraph import GRAPH_FILENAME, DependencyGraph, file_hash
+from pyvm.core.optimizer import OptimizationReport
+
+# 默认排除的目录和文件
+DEFAULT_EXCLUDES = ['__pycache__', '.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv', '*.egg-info']
+
+
+def _is_excluded(name: str, rel_path: str, excludes: List[str]) -> bool:
+    """判断文件名或相对路径是否匹配排除规则"""
+    for pattern in excludes:
+        if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+            return True
+    return False
+
+
+def iter_source_files(root: str, excludes: Optional[List[str]] = None, suffix: str = '.py') -> Iterator[str]:
+    """遍历目录下的源文件，跳过匹配排除规则的目录和文件"""
+    excludes = DEFAULT_EXCLUDES if excludes is None else excludes
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = sorted(os.scandir(current), key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel_path = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            if _is_excluded(entry.name, rel_path, excludes):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.endswith(suffix) and entry.is_file():
+                yield entry.path
+        # 逆序入栈，保证按名称顺序遍历
+        stack.extend(reversed(subdirs))
+
+
+def output_path_for(source_path: str, root: str, output_dir: Optional[str]) -> Optional[str]:
+    """计算源文件对应的pyc输出路径，未指定输出目录时返回None（与源文件同目录）"""
+    if output_dir is None:
+        return None
+    rel_path = os.path.relpath(source_path, root)
+    return os.path.join(output_dir, os.path.splitext(rel_path)[0] + '.pyc')
+
+
+class TreeCompileReport:
+    """目录编译的汇总结果"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.errors: List[Tuple[str, str]] = []
+        # 每个成功编译文件的导入记录
+        self.imports: Dict[str, List[str]] = {}
+        # 增量编译时被重建的文件及原因
+        self.rebuild_reasons: Dict[str, str] = {}
+        self.skipped = 0
+        # 开启优化时每个成功编译文件的优化统计
+        self.optimizations: Dict[str, OptimizationReport] = {}
+
+    @property
+    def compiled(self) -> int:
+        return self.files - len(self.errors)
+
+    @property
+    def files_per_sec(self) -> float:
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        skipped = f"，跳过 {self.skipped}" if self.skipped else ""
+        return (f"文件: {self.files}（成功 {self.compiled}，失败 {len(self.errors)}{skipped}），"
+                f"字节: {self.bytes}，耗时: {self.elapsed:.2f}s，速度: {self.files_per_sec:.1f} 文件/秒")
+
+    def optimization_summary(self) -> Optional[str]:
+        """所有文件优化前后的大小和指令数合计，没有统计数据时返回None"""
+        measured = [report for report in self.optimizations.values() if report.size_before is not None]
+        if not measured:
+            return None
+        size_before = sum(report.size_before for report in measured)
+        size_after = sum(report.size_after for report in measured)
+        instructions_before = sum(report.instructions_before for report in measured)
+        instructions_after = sum(report.instructions_after for report in measured)
+        return (f"优化合计（{len(measured)}个文件）: 大小 {size_before} -> {size_after} 字节"
+                f"（{size_after - size_before:+d}），指令数 {instructions_before} -> {instructions_after}"
+                f"（{instructions_after - instructions_before:+d}）")
+
+
+# 工作进程内复用的编译器实例
+_worker_compiler = None
+
+
+def _init_worker(cache_dir: Optional[str], use_cache: bool, opt_level: int = 0,
+                 optimization_stats: bool = False) -> None:
+    global _worker_compiler
+    cache = CompileCache(cache_dir) if use_cache else None
+    _worker_compiler = PyCompiler(cache=cache, opt_level=opt_level, optimization_stats=optimization_stats)
+
+
+def _compile_one(job: Tuple[str, Optional[str]]):
+    """编译单个文件，返回(源文件路径, 源文件大小, 错误信息, 导入记录, 优化统计)"""
+    source_path, output_path = job
+    size = 0
+    try:
+        size = os.path.getsize(source_path)
+        if output_path is not None:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        _worker_compiler.compile_file(source_path, output_path)
+        return (source_path, size, None, _worker_compiler.file_imports.pop(source_path, []),
+                _worker_compiler.last_optimization)
+    except Exception as e:
+        return source_path, size, f"{type(e).__name__}: {e}", [], None
+
+
+def compile_tree(root: str, output_dir: Optional[str] = None, excludes: Optional[List[str]] = None,
+                 workers: Optional[int] = None, cache_dir: Optional[str] = None,
+                 use_cache: bool = True, sources: Optional[List[str]] = None,
+                 on_result=None, opt_level: int = 0, optimization_stats: bool = False) -> TreeCompileReport:
+    """并行编译整个目录
+
+    Args:
+        root: 源码根目录
+        output_dir: pyc输出目录（保持目录结构），默认与源文件同目录
+        excludes: 排除的glob规则
+        workers: 工作进程数，默认等于CPU核数
+        cache_dir: 编译缓存目录
+        use_cache: 是否使用编译缓存
+        sources: 指定要编译的源文件（默认遍历root）
+        on_result: 每个文件完成时的回调 (源文件路径, 错误信息, 优化统计)，未开启优化或失败时优化统计为None
+        opt_level: 优化级别（0-2）
+        optimization_stats: 是否统计每个文件优化前后的大小和指令数
+
+    Returns:
+        汇总结果，单个文件失败不会中断整个批次
+    """
+    report = TreeCompileReport()
+    start = time.perf_counter()
+
+    if sources is None:
+        sources = list(iter_source_files(root, excludes))
+    jobs = [(path, output_path_for(path, root, output_dir)) for path in sources]
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    def collect(results):
+        for source_path, size, error, imports, optimization in results:
+            report.files += 1
+            report.bytes += size
+            if error is not None:
+                report.errors.append((source_path, error))
+            else:
+                report.imports[source_path] = imports
+                if optimization is not None:
+                    report.optimizations[source_path] = optimization
+            if on_result is not None:
+                on_result(source_path, error, optimization)
+
+    if workers == 1 or len(jobs) <= 1:
+        # 单进程时直接编译，省去进程池开销
+        _init_worker(cache_dir, use_cache, opt_level, optimization_stats)
+        collect(map(_compile_one, jobs))
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(cache_dir, use_cache, opt_level, optimization_stats)) as executor:
+            collect(executor.map(_compile_one, jobs, chunksize=chunksize))
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def incremental_compile_tree(root: str, output_dir: Optional[str] = None, excludes: Optional[List[str]] = None,
+                             workers: Optional[int] = None, cache_dir: Optional[str] = None,
+                             use_cache: bool = True, graph_path: Optional[str] = None,
+                             on_result=None, opt_level: int = 0,
+                             optimization_stats: bool = False) -> TreeCompileReport:
+    """基于导入依赖图的增量编译
+
+    只重建源码已修改的文件以及（直接或间接）依赖它们的文件，
+    重建原因记录在report.rebuild_reasons中。依赖图默认保存在输出目录
+    （未指定时为源码根目录）下的.pyvm_deps.json。
+    """
+    if graph_path is None:
+        graph_path = os.path.join(output_dir or root, GRAPH_FILENAME)
+    graph = DependencyGraph.load(root, graph_path)
+
+    sources = {graph.rel_path(path): path for path in iter_source_files(root, excludes)}
+    current = {}
+    for rel, path in sources.items():
+        try:
+            current[rel] = file_hash(path)
+        except OSError:
+            continue
+
+    missing_outputs = []
+    for rel, path in sources.items():
+        output_path = output_path_for(path, root, output_dir) or os.path.splitext(path)[0] + '.pyc'
+        if not os.path.exists(output_path):
+            missing_outputs.append(rel)
+
+    reasons = graph.plan_rebuild(current, missing_outputs)
+    if graph.options.get('opt_level', 0) != opt_level:
+        for rel in current:
+            reasons.setdefault(rel, "优化级别已改变")
+    report = compile_tree(root, output_dir, excludes, workers, cache_dir, use_cache,
+                          sources=[sources[rel] for rel in sorted(reasons) if rel in current],
+                          on_result=on_result, opt_level=opt_level, optimization_stats=optimization_stats)
+    report.rebuild_reasons = reasons
+    report.skipped = len(current) - len(reasons)
+
+    # 更新依赖图
+    for rel in list(graph.files):
+        if rel not in current:
+            graph.remove(rel)
+    failed = {path for path, _ in report.errors}
+    for rel in reasons:
+        path = sources[rel]
+        if path in failed:
+            previous = graph.files.get(rel, {})
+            graph.update(rel, None, previous.get('imports', []))
+        else:
+            graph.update(rel, current[rel], report.imports.get(path, []))
+    graph.options['opt_level'] = opt_level
+    graph.resolve_all()
+    graph.save(graph_path)
+    return report
@@ -0,0 +1,164 @@
+import math
+from array import array
+from itertools import repeat
+from operator import add as _add, mul as _mul, sub as _sub
+
+# 客户代码通过import vecmath使用的批量数学运算模块。
+# 对array('d')、array('f')或memoryview等连续的浮点缓冲区逐元素计算，未指定out时结果原地写回
+# 输入缓冲区；逐元素的循环在C中进行（map配合math中的函数），按块写回，不生成与输入等长的列表。
+# 本模块由natives在以安全内置模块为__builtins__的命名空间中执行，只导入C实现的对象，
+# 客户代码经由函数的__globals__不会接触到宿主的模块。
+
+__all__ = [
+    'sqrt', 'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'exp', 'log', 'log10', 'fabs',
+    'add', 'subtract', 'multiply', 'scale', 'total', 'dot',
+]
+
+# 每次写回的元素数，限制临时数组的大小
+BLOCK_SIZE = 65536
+
+_FORMATS = ('d', 'f')
+
+
+def _view(buffer, writable: bool = False) -> memoryview:
+    """把缓冲区转换为一维的浮点memoryview（不复制数据）"""
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    if view.format not in _FORMATS:
+        raise TypeError(f"需要元素类型为double或float的缓冲区，实际为'{view.format}'")
+    if not view.c_contiguous:
+        raise ValueError("需要连续的缓冲区")
+    if writable and view.readonly:
+        raise ValueError("输出缓冲区是只读的")
+    if view.ndim != 1:
+        view = view.cast('B').cast(view.format)
+    return view
+
+
+def _output(source: memoryview, out) -> memoryview:
+    if out is None:
+        return _view(source, writable=True)
+    target = _view(out, writable=True)
+    if len(target) != len(source):
+        raise ValueError(f"输出缓冲区长度{len(target)}与输入长度{len(source)}不一致")
+    return target
+
+
+def _unary(func, buffer, out):
+    source = _view(buffer)
+    target = _output(source, out)
+    fmt = target.format
+    for start in range(0, len(source), BLOCK_SIZE):
+        end = start + BLOCK_SIZE
+        target[start:end] = array(fmt, list(map(func, source[start:end].tolist())))
+    return out if out is not None else buffer
+
+
+def _binary(func, left, right, out):
+    a = _view(left)
+    if isinstance(right, (int, float)):
+        b = None
+    else:
+        b = _view(right)
+        if len(b) != len(a):
+            raise ValueError(f"两个缓冲区的长度不一致: {len(a)}, {len(b)}")
+    target = _output(a, out)
+    fmt = target.format
+    for start in range(0, len(a), BLOCK_SIZE):
+        end = start + BLOCK_SIZE
+        chunk = a[start:end].tolist()
+        if b is None:
+            values = map(func, chunk, repeat(right))
+        else:
+            values = map(func, chunk, b[start:end].tolist())
+        target[start:end] = array(fmt, list(values))
+    return out if out is not None else left
+
+
+def sqrt(buffer, out=None):
+    """逐元素求平方根"""
+    return _unary(math.sqrt, buffer, out)
+
+
+def sin(buffer, out=None):
+    """逐元素求正弦"""
+    return _unary(math.sin, buffer, out)
+
+
+def cos(buffer, out=None):
+    """逐元素求余弦"""
+    return _unary(math.cos, buffer, out)
+
+
+def tan(buffer, out=None):
+    """逐元素求正切"""
+    return _unary(math.tan, buffer, out)
+
+
+def asin(buffer, out=None):
+    """逐元素求反正弦"""
+    return _unary(math.asin, buffer, out)
+
+
+def acos(buffer, out=None):
+    """逐元素求反余弦"""
+    return _unary(math.acos, buffer, out)
+
+
+def atan(buffer, out=None):
+    """逐元素求反正切"""
+    return _unary(math.atan, buffer, out)
+
+
+def exp(buffer, out=None):
+    """逐元素求e的幂"""
+    return _unary(math.exp, buffer, out)
+
+
+def log(buffer, out=None):
+    """逐元素求自然对数"""
+    return _unary(math.log, buffer, out)
+
+
+def log10(buffer, out=None):
+    """逐元素求常用对数"""
+    return _unary(math.log10, buffer, out)
+
+
+def fabs(buffer, out=None):
+    """逐元素求绝对值"""
+    return _unary(math.fabs, buffer, out)
+
+
+def add(left, right, out=None):
+    """逐元素相加，right可以是等长的缓冲区或数值"""
+    return _binary(_add, left, right, out)
+
+
+def subtract(left, right, out=None):
+    """逐元素相减，right可以是等长的缓冲区或数值"""
+    return _binary(_sub, left, right, out)
+
+
+def multiply(left, right, out=None):
+    """逐元素相乘，right可以是等长的缓冲区或数值"""
+    return _binary(_mul, left, right, out)
+
+
+def scale(buffer, factor, out=None):
+    """每个元素乘以factor"""
+    return _binary(_mul, buffer, factor, out)
+
+
+def total(buffer) -> float:
+    """所有元素的精确和"""
+    return math.fsum(_view(buffer))
+
+
+def dot(left, right) -> float:
+    """两个等长缓冲区的内积"""
+    a, b = _view(left), _view(right)
+    if len(a) != len(b):
+        raise ValueError(f"两个缓冲区的长度不一致: {len(a)}, {len(b)}")
+    if hasattr(math, 'sumprod'):
+        return math.sumprod(a, b)
+    return math.fsum(map(_mul, a, b))
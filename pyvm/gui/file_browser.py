@@ -0,0 +1,218 @@
+import os
+import time
+import queue
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# 每个目录一次最多显示的条目数，其余通过“加载更多”分页显示
+PAGE_SIZE = 500
+
+# 监视已展开目录变化的轮询间隔（毫秒）
+WATCH_INTERVAL_MS = 2000
+
+# 等待后台扫描结果的轮询间隔（毫秒）和每次处理的目录数，避免一次性插入过多条目
+RESULT_POLL_MS = 30
+RESULTS_PER_TICK = 4
+
+# 占位项的iid前缀（真实条目的iid是绝对路径，不会以?开头）
+_LOADING = '?loading:'
+_MORE = '?more:'
+
+
+class DirEntry(NamedTuple):
+    """目录中的一个条目，目录的size和mtime为None"""
+    name: str
+    is_dir: bool
+    size: Optional[int]
+    mtime: Optional[float]
+
+
+def scan_directory(path: str, limit: int) -> Tuple[List[DirEntry], int]:
+    """列出目录内容，目录在前、按名称排序
+
+    只对排序后的前limit项调用stat，返回(条目列表, 条目总数)。
+    """
+    items = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            items.append((not is_dir, entry.name.lower(), entry.name, is_dir))
+    items.sort()
+
+    entries = []
+    for _, _, name, is_dir in items[:limit]:
+        size = mtime = None
+        if not is_dir:
+            try:
+                stat = os.stat(os.path.join(path, name))
+                size, mtime = stat.st_size, stat.st_mtime
+            except OSError:
+                pass
+        entries.append(DirEntry(name, is_dir, size, mtime))
+    return entries, len(items)
+
+
+class FileBrowser:
+    """按需展开的文件树
+
+    目录在后台线程中用os.scandir扫描，结果通过队列交回主线程，按目录分批应用到
+    Treeview。目录首次展开时才扫描；已展开的目录定期重新扫描，只对新增、删除和
+    修改的条目做增量更新。条目很多的目录只显示前PAGE_SIZE项，其余分页加载。
+    """
+
+    def __init__(self, widget, tree, on_open: Callable[[str], None]):
+        # widget用于after定时器，tree为带size和modified两列的ttk.Treeview
+        self.widget = widget
+        self.tree = tree
+        self.on_open = on_open
+        self.root_path: Optional[str] = None
+        # 已扫描目录当前显示的条目，以及每个目录显示的条目数上限
+        self._listings: Dict[str, List[DirEntry]] = {}
+        self._limits: Dict[str, int] = {}
+        self._pending = set()
+        # 切换根目录后递增，丢弃旧根目录的扫描结果
+        self._generation = 0
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._worker = None
+        self._result_job = None
+        self._watch_job = None
+
+        tree.bind('<<TreeviewOpen>>', self._on_expand)
+        tree.bind('<Double-1>', self._on_double_click)
+
+    def set_root(self, path: str) -> None:
+        """显示指定目录；与当前根目录相同时只做增量刷新"""
+        path = os.path.abspath(path)
+        if path == self.root_path:
+            self.refresh()
+            return
+        self._generation += 1
+        self.root_path = path
+        self._listings.clear()
+        self._limits.clear()
+        self._pending.clear()
+        self.tree.delete(*self.tree.get_children())
+        self._request(path)
+        if self._watch_job is None:
+            self._watch_job = self.widget.after(WATCH_INTERVAL_MS, self._watch)
+
+    def refresh(self) -> None:
+        """重新扫描根目录和所有展开的目录"""
+        for path in list(self._listings):
+            if self._is_visible(path):
+                self._request(path)
+
+    def _iid(self, path: str) -> str:
+        return '' if path == self.root_path else path
+
+    def _is_visible(self, path: str) -> bool:
+        if path == self.root_path:
+            return True
+        return self.tree.exists(path) and bool(self.tree.item(path, 'open'))
+
+    def _request(self, path: str) -> None:
+        """提交后台扫描，同一目录已在扫描时不重复提交"""
+        if path in self._pending:
+            return
+        self._pending.add(path)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._scan_worker, name='pyvm-file-browser', daemon=True)
+            self._worker.start()
+        self._requests.put((self._generation, path, self._limits.get(path, PAGE_SIZE)))
+        if self._result_job is None:
+            self._result_job = self.widget.after(RESULT_POLL_MS, self._drain_results)
+
+    def _scan_worker(self) -> None:
+        while True:
+            generation, path, limit = self._requests.get()
+            try:
+                entries, total = scan_directory(path, limit)
+            except OSError:
+                entries, total = None, 0
+            self._results.put((generation, path, entries, total))
+
+    def _drain_results(self) -> None:
+        self._result_job = None
+        for _ in range(RESULTS_PER_TICK):
+            try:
+                generation, path, entries, total = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            self._pending.discard(path)
+            if entries is None:
+                # 目录已不存在或无法读取
+                self._forget(path)
+                continue
+            self._apply(path, entries, total)
+        if self._pending or not self._results.empty():
+            self._result_job = self.widget.after(RESULT_POLL_MS, self._drain_results)
+
+    def _apply(self, path: str, entries: List[DirEntry], total: int) -> None:
+        """把一次扫描结果与当前显示的条目比较，只更新有变化的部分"""
+        parent = self._iid(path)
+        if parent and not self.tree.exists(parent):
+            return
+        old = {entry.name: entry for entry in self._listings.get(path, [])}
+        new = {entry.name: entry for entry in entries}
+
+        for iid in self.tree.get_children(parent):
+            name = os.path.basename(iid)
+            if iid.startswith('?') or name not in new or (name in old and new[name].is_dir != old[name].is_dir):
+                self.tree.delete(iid)
+                if not iid.startswith('?'):
+                    self._forget(iid)
+
+        # 先删除后插入，插入位置即条目在排序结果中的位置
+        for index, entry in enumerate(entries):
+            iid = os.path.join(path, entry.name)
+            if not self.tree.exists(iid):
+                self.tree.insert(parent, index, iid=iid, text=entry.name, values=self._values(entry))
+                if entry.is_dir:
+                    self.tree.insert(iid, 'end', iid=_LOADING + iid, text="加载中...")
+            elif old.get(entry.name) != entry:
+                self.tree.item(iid, values=self._values(entry))
+
+        if total > len(entries):
+            self.tree.insert(parent, 'end', iid=_MORE + path,
+                             text=f"...还有{total - len(entries)}项（双击加载更多）")
+        self._listings[path] = entries
+
+    def _forget(self, path: str) -> None:
+        """清除已删除目录及其子目录的扫描记录"""
+        prefix = path + os.sep
+        for key in [key for key in self._listings if key == path or key.startswith(prefix)]:
+            del self._listings[key]
+            self._limits.pop(key, None)
+
+    @staticmethod
+    def _values(entry: DirEntry) -> tuple:
+        if entry.is_dir:
+            return ('', '')
+        size = entry.size if entry.size is not None else ''
+        modified = time.ctime(entry.mtime) if entry.mtime is not None else ''
+        return (size, modified)
+
+    def _watch(self) -> None:
+        """定期重新扫描可见的目录"""
+        self.refresh()
+        self._watch_job = self.widget.after(WATCH_INTERVAL_MS, self._watch)
+
+    def _on_expand(self, event) -> None:
+        iid = self.tree.focus()
+        if iid and not iid.startswith('?'):
+            self._request(iid)
+
+    def _on_double_click(self, event) -> None:
+        iid = self.tree.identify_row(event.y)
+        if iid.startswith(_MORE):
+            path = iid[len(_MORE):]
+            self._limits[path] = self._limits.get(path, PAGE_SIZE) + PAGE_SIZE
+            self._request(path)
+        elif iid and not iid.startswith('?') and iid.endswith('.py') and os.path.isfile(iid):
+            self.on_open(iid)
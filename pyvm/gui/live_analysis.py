@@ -0,0 +1,166 @@
+import re
+import ast
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from pyvm.core.security import CodeSecurityChecker
+
+# 缓存的语句块数上限
+MAX_CACHED_BLOCKS = 8192
+
+# 位于行首但不开始新语句的关键字
+_CONTINUATION = re.compile(r'(else|elif|except|finally)\b')
+
+# 不会开始新语句的行首字符
+_NOT_STATEMENT_START = frozenset(' \t\r\n#)]}')
+
+# 行内影响括号计数的记号：三引号、单行字符串、注释和括号
+_OPEN = frozenset('([{')
+_CLOSE = frozenset(')]}')
+_TOKEN = re.compile(r"'''" r'|"""' r"|'(?:[^'\\\n]|\\.)*'" r'|"(?:[^"\\\n]|\\.)*"' r"|#|[()\[\]{}]")
+
+
+class LiveAnalysisResult:
+    """一次实时分析的结果"""
+
+    def __init__(self, issues: List[str], syntax_error: Optional[SyntaxError] = None,
+                 blocks: int = 0, reused: int = 0):
+        self.issues = issues
+        self.syntax_error = syntax_error
+        # 语句块数及其中直接复用缓存的数量
+        self.blocks = blocks
+        self.reused = reused
+
+    @property
+    def is_safe(self) -> bool:
+        return not self.issues
+
+
+def _scan_line(line: str, quote: Optional[str], depth: int) -> Tuple[Optional[str], int]:
+    """粗略跟踪三引号字符串和括号嵌套，返回行尾的(所在三引号字符串的引号, 括号深度)"""
+    pos = 0
+    while True:
+        if quote is not None:
+            end = line.find(quote, pos)
+            if end < 0:
+                return quote, depth
+            pos, quote = end + 3, None
+        match = _TOKEN.search(line, pos)
+        if match is None:
+            return None, depth
+        token = match.group()
+        pos = match.end()
+        if token in _OPEN:
+            depth += 1
+        elif token in _CLOSE:
+            depth = max(depth - 1, 0)
+        elif token == '#':
+            return None, depth
+        elif token in ('"""', "'''"):
+            quote = token
+
+
+def split_blocks(lines: List[str]) -> List[Tuple[int, str]]:
+    """按顶层语句的起始行切分源码，返回[(起始行号, 源码)]
+
+    只做行级的粗略判断（行首不是缩进、注释、右括号、else等续行关键字，也不在
+    三引号字符串、括号或装饰器之后）。切错时某个块必然无法单独解析，调用方据此
+    回退到整体解析，因此不会得到错误的结果。
+    """
+    blocks = []
+    start = 0
+    quote = None
+    depth = 0
+    after_decorator = False
+    for index, line in enumerate(lines):
+        if (index and quote is None and not depth and not after_decorator
+                and line[:1] not in _NOT_STATEMENT_START and not _CONTINUATION.match(line)):
+            blocks.append((start + 1, ''.join(lines[start:index])))
+            start = index
+        if line.strip() and quote is None and not depth:
+            after_decorator = line.startswith('@')
+        quote, depth = _scan_line(line, quote, depth)
+    if lines:
+        blocks.append((start + 1, ''.join(lines[start:])))
+    return blocks
+
+
+class LiveAnalyzer:
+    """编辑器的增量安全分析
+
+    源码按顶层语句切分成块，每块的解析和规则检查结果以块的源码为键缓存，
+    编辑后只有改动过的块需要重新解析和检查。问题按语句所在行给出位置，语句
+    移动后行号随之更新。可在多个线程中调用。
+    """
+
+    def __init__(self, checker: Optional[CodeSecurityChecker] = None, max_blocks: int = MAX_CACHED_BLOCKS):
+        self.checker = checker or CodeSecurityChecker()
+        self.max_blocks = max_blocks
+        # 块源码 -> [(语句在块内的起始行, 问题元组, 操作类别)]
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self._last = None
+
+    def analyze(self, source: str, filename: str = "<string>") -> LiveAnalysisResult:
+        with self._lock:
+            if self._last is not None and self._last[0] == (source, filename):
+                return self._last[1]
+        lines = source.splitlines(keepends=True)
+        try:
+            result = self._analyze_blocks(split_blocks(lines), filename)
+        except SyntaxError:
+            # 切分不准确或源码本身有语法错误时整体解析（不缓存）
+            try:
+                result = self._analyze_blocks([(1, source)], filename, cache=False)
+            except SyntaxError as e:
+                result = LiveAnalysisResult([f"语法错误: {str(e)}"], syntax_error=e)
+        with self._lock:
+            self._last = ((source, filename), result)
+        return result
+
+    def _analyze_blocks(self, blocks: List[Tuple[int, str]], filename: str,
+                        cache: bool = True) -> LiveAnalysisResult:
+        issues = []
+        flags = set()
+        reused = 0
+        for start, text in blocks:
+            with self._lock:
+                statements = self._blocks.get(text) if cache else None
+                if statements is not None:
+                    self._blocks.move_to_end(text)
+            if statements is None:
+                statements = self._check_block(text, filename)
+                if cache:
+                    with self._lock:
+                        self._blocks[text] = statements
+                        if len(self._blocks) > self.max_blocks:
+                            self._blocks.popitem(last=False)
+            else:
+                reused += 1
+            for line, statement_issues, statement_flags in statements:
+                issues.extend(f"第{start + line - 1}行: {issue}" for issue in statement_issues)
+                flags.update(statement_flags)
+
+        # 操作类别提示由检查器统一追加在末尾
+        context = self.checker.new_context()
+        context.issues = issues
+        context.flags = flags
+        return LiveAnalysisResult(self.checker.finish(context), blocks=len(blocks), reused=reused)
+
+    def _check_block(self, text: str, filename: str) -> list:
+        """解析一个块并逐条语句检查，语法错误时抛出SyntaxError"""
+        tree = ast.parse(text, filename=filename)
+        dispatch = self.checker.rule_set.dispatch
+        statements = []
+        for stmt in tree.body:
+            context = self.checker.new_context()
+            for node in ast.walk(stmt):
+                handlers = dispatch.get(type(node))
+                if handlers:
+                    for handler in handlers:
+                        handler(node, context)
+            if context.issues or context.flags:
+                line = min([stmt.lineno] + [decorator.lineno for decorator in getattr(stmt, 'decorator_list', ())])
+                statements.append((line, tuple(context.issues), frozenset(context.flags)))
+        return statements
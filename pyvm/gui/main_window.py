@@ -1,16 +1,30 @@
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, messagebox, ttk
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import os
 import sys
 from pathlib import Path
 from pyvm.core.compiler import PyCompiler
 from pyvm.core.interpreter import PyInterpreter
-from pyvm.core.security import CodeSecurityChecker
-import time
+from pyvm.core.security import CodeSecurityChecker, SecurityCheckError
+from pyvm.core.service import CompilerService
+from pyvm.core.capture import NOTICE, OutputCapture
+from pyvm.gui.file_browser import FileBrowser
+from pyvm.gui.live_analysis import LiveAnalyzer
+from pyvm.core.timing import Timings
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+# 执行输出每批最多插入的字符数、刷新间隔（毫秒）、捕获缓冲上限（字符）和输出区保留的最大行数
+OUTPUT_BATCH_CHARS = 64 * 1024
+OUTPUT_POLL_MS = 50
+OUTPUT_BUFFER_CHARS = 1024 * 1024
+MAX_OUTPUT_LINES = 5000
+
+# 停止输入多久（毫秒）后开始实时分析
+LIVE_ANALYSIS_DELAY_MS = 400
+
 
 class PyVMGUI:
     def __init__(self, root):
@@ -23,14 +37,25 @@ class PyVMGUI:
         self.font = ('SimHei', 10)
 
         # 创建核心组件
-        self.compiler = PyCompiler()
-        self.interpreter = PyInterpreter()
+        # 编译任务在服务的线程池中执行，每个任务的结果相互独立（安全检查由界面在编译前完成）
+        self.compile_service = CompilerService(use_cache=False, check_security=False)
+        # 统计内存峰值需要开启tracemalloc，会拖慢执行，默认关闭
+        self.trace_memory_var = tk.BooleanVar(value=False)
+        self.interpreter = PyInterpreter(trace_memory=self.trace_memory_var.get())
         self.security_checker = CodeSecurityChecker()
+        # 实时分析在单独的工作线程中进行，按顶层语句缓存结果
+        self.live_analyzer = LiveAnalyzer(self.security_checker)
+        self._analysis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pyvm-live-analysis')
+        self._analysis_job = None
+        self._analysis_generation = 0
 
         # 当前文件路径
         self.current_file = None
         self.current_pyc = None
         self.custom_module_paths = []
+        self.last_profile = None
+        # 执行引擎（auto/cpython/railgun）
+        self.engine_var = tk.StringVar(value=self.interpreter.engine)
 
         # 创建UI
         self._create_menu()
@@ -54,17 +79,28 @@ class PyVMGUI:
         compile_menu = tk.Menu(menubar, tearoff=0)
         compile_menu.add_command(label="编译当前文件", command=self._compile_current_file, accelerator="F5")
         compile_menu.add_command(label="编译并执行", command=self._compile_and_execute, accelerator="F6")
+        compile_menu.add_command(label="对比执行引擎", command=self._compare_engines)
         menubar.add_cascade(label="编译", menu=compile_menu)
 
         # 执行菜单
         execute_menu = tk.Menu(menubar, tearoff=0)
         execute_menu.add_command(label="执行当前pyc", command=self._execute_current_pyc, accelerator="F9")
         execute_menu.add_command(label="打开并执行pyc", command=self._open_and_execute_pyc)
+        execute_menu.add_separator()
+        execute_menu.add_command(label="性能分析当前pyc", command=self._profile_current_pyc, accelerator="F10")
+        execute_menu.add_command(label="导出性能分析数据", command=self._export_profile)
         menubar.add_cascade(label="执行", menu=execute_menu)
 
         # 设置菜单
         settings_menu = tk.Menu(menubar, tearoff=0)
         settings_menu.add_command(label="设置自定义库路径", command=self._set_custom_module_paths)
+        engine_menu = tk.Menu(settings_menu, tearoff=0)
+        for engine, label in (('auto', "自动"), ('cpython', "CPython"), ('railgun', "railgun原生虚拟机")):
+            engine_menu.add_radiobutton(label=label, value=engine, variable=self.engine_var,
+                                        command=self._set_engine)
+        settings_menu.add_cascade(label="执行引擎", menu=engine_menu)
+        settings_menu.add_checkbutton(label="统计内存峰值", variable=self.trace_memory_var,
+                                      command=self._set_trace_memory)
         menubar.add_cascade(label="设置", menu=settings_menu)
 
         # 帮助菜单
@@ -84,15 +120,26 @@ class PyVMGUI:
         self.root.bind("<F5>", lambda event: self._compile_current_file())
         self.root.bind("<F6>", lambda event: self._compile_and_execute())
         self.root.bind("<F9>", lambda event: self._execute_current_pyc())
+        self.root.bind("<F10>", lambda event: self._profile_current_pyc())
 
     def _set_custom_module_paths(self):
         path = filedialog.askdirectory()
         if path:
             if path not in self.custom_module_paths:
                 self.custom_module_paths.append(path)
-                self.interpreter = PyInterpreter(module_paths=self.custom_module_paths)
+                self.interpreter = PyInterpreter(module_paths=self.custom_module_paths,
+                                                 trace_memory=self.trace_memory_var.get(),
+                                                 engine=self.engine_var.get())
                 messagebox.showinfo("提示", f"已添加自定义库路径: {path}")
 
+    def _set_engine(self):
+        self.interpreter.engine = self.engine_var.get()
+        self._update_status(f"执行引擎: {self.interpreter.engine}")
+
+    def _set_trace_memory(self):
+        self.interpreter.trace_memory = self.trace_memory_var.get()
+        self._update_status("已开启内存峰值统计" if self.interpreter.trace_memory else "已关闭内存峰值统计")
+
     def _create_main_frame(self):
         """创建主框架（修改后）"""
         main_frame = ttk.Frame(self.root, padding="10")
@@ -120,6 +167,7 @@ class PyVMGUI:
         # 创建滚动文本框用于编辑Python代码
         self.code_editor = scrolledtext.ScrolledText(source_frame, wrap=tk.WORD, font=self.font)
         self.code_editor.pack(fill=tk.BOTH, expand=True)
+        self.code_editor.bind("<<Modified>>", self._on_editor_modified)
 
         # 输出标签页
         output_frame = ttk.Frame(notebook)
@@ -128,6 +176,8 @@ class PyVMGUI:
         # 创建滚动文本框用于显示程序输出
         self.output_display = scrolledtext.ScrolledText(output_frame, wrap=tk.WORD, font=self.font)
         self.output_display.pack(fill=tk.BOTH, expand=True)
+        self.output_display.tag_config('stderr', foreground='red')
+        self.output_display.tag_config(NOTICE, foreground='gray')
         self.output_display.config(state=tk.DISABLED)
 
         # 安全检查标签页
@@ -139,6 +189,16 @@ class PyVMGUI:
         self.security_results.pack(fill=tk.BOTH, expand=True)
         self.security_results.config(state=tk.DISABLED)
 
+        # 性能分析标签页
+        profile_frame = ttk.Frame(notebook)
+        notebook.add(profile_frame, text="性能分析")
+
+        # 等宽字体显示函数耗时表格
+        self.profile_display = scrolledtext.ScrolledText(profile_frame, wrap=tk.NONE, font=('Courier', 10))
+        self.profile_display.pack(fill=tk.BOTH, expand=True)
+        self.profile_display.insert(tk.END, "通过“执行 → 性能分析当前pyc”（F10）执行并收集函数耗时统计")
+        self.profile_display.config(state=tk.DISABLED)
+
         # 文件列表标签页
         file_frame = ttk.Frame(notebook)
         notebook.add(file_frame, text="文件列表")
@@ -162,8 +222,8 @@ class PyVMGUI:
         self.file_list.heading("size", text="大小")
         self.file_list.heading("modified", text="修改时间")
 
-        # 绑定双击事件
-        self.file_list.bind("<Double-1>", self._on_file_double_click)
+        # 按需展开的文件树，目录在后台扫描；双击.py文件打开
+        self.file_browser = FileBrowser(self.root, self.file_list, self._load_file)
 
         # 刷新文件列表
         self._refresh_file_list()
@@ -186,27 +246,56 @@ class PyVMGUI:
                 return
 
         self._update_status("正在编译...")
-
-        def compile_task():
-            try:
-                pyc_path = self.compiler.compile_file(self.current_file)
-                self.current_pyc = pyc_path
-
-                # 使用root.after确保在主线程更新UI
-                self.root.after(0, lambda: self._update_output(f"编译成功!\n生成的pyc文件: {pyc_path}"))
-                self.root.after(0, lambda: self._update_status(f"编译完成: {os.path.basename(pyc_path)}"))
-                self.root.after(0, self._refresh_file_list)
-            except Exception as e:
-                self.root.after(0, lambda: self._update_output(f"编译错误: {str(e)}"))
-                self.root.after(0, lambda: self._update_status("编译失败"))
-
-        # 在后台线程执行编译，避免UI冻结
-        threading.Thread(target=compile_task, daemon=True).start()
+        future = self.compile_service.submit_file(self.current_file)
+        # 回调在工作线程中调用，通过root.after回到主线程更新界面
+        future.add_done_callback(lambda done: self.root.after(0, self._on_compiled, done))
+
+    def _on_compiled(self, future):
+        """编译任务完成后更新界面"""
+        try:
+            result = future.result()
+        except Exception as e:
+            self._update_output(f"编译错误: {str(e)}")
+            self._update_status("编译失败")
+            return
+        if not result.ok:
+            self._update_output(f"编译错误: {result.error}")
+            self._update_status("编译失败")
+            return
+        self.current_pyc = result.output_path
+        self._update_output(f"编译成功!\n生成的pyc文件: {result.output_path}")
+        self._update_status(f"编译完成: {os.path.basename(result.output_path)} | {result.timings.format()}")
+        self._refresh_file_list()
 
     def _check_code_security(self):
-        """检查代码安全性"""
-        code = self.code_editor.get(1.0, tk.END)
-        return self.security_checker.check_code(code)
+        """检查代码安全性，未改动的顶层语句直接使用实时分析的缓存结果"""
+        result = self.live_analyzer.analyze(self.code_editor.get(1.0, tk.END), self.current_file or "<编辑器>")
+        return result.is_safe, result.issues
+
+    def _on_editor_modified(self, event=None):
+        """编辑器内容变化后延迟一段时间再分析，连续输入时只分析最后一次"""
+        if not self.code_editor.edit_modified():
+            return
+        self.code_editor.edit_modified(False)
+        if self._analysis_job is not None:
+            self.root.after_cancel(self._analysis_job)
+        self._analysis_job = self.root.after(LIVE_ANALYSIS_DELAY_MS, self._start_live_analysis)
+
+    def _start_live_analysis(self):
+        """在后台线程中分析当前缓冲区"""
+        self._analysis_job = None
+        self._analysis_generation += 1
+        generation = self._analysis_generation
+        future = self._analysis_executor.submit(self.live_analyzer.analyze, self.code_editor.get(1.0, tk.END),
+                                                self.current_file or "<编辑器>")
+        future.add_done_callback(lambda done: self.root.after(0, self._show_live_analysis, generation, done))
+
+    def _show_live_analysis(self, generation, future):
+        """更新安全检查标签页和状态指示器，已过期的结果直接丢弃"""
+        if generation != self._analysis_generation or future.exception() is not None:
+            return
+        result = future.result()
+        self._update_security_status(result.is_safe, result.issues)
 
     def _update_security_status(self, is_safe, issues=None):
         """更新安全状态显示"""
@@ -223,25 +312,107 @@ class PyVMGUI:
 
         self.security_results.config(state=tk.DISABLED)
 
-    def _execute_current_pyc(self):
+    def _execute_current_pyc(self, check_security=None, profile=False):
         """执行当前pyc文件（修改后）"""
         if not self.current_pyc:
             self._update_output("没有当前pyc文件，请先编译或打开一个pyc文件")
             return
 
         self._update_status("正在执行...")
+        capture = self._start_capture()
 
         def execute_task():
             try:
-                result = self.interpreter.execute_pyc(self.current_pyc)
-                self.root.after(0, lambda: self._update_output(f"执行完成\n输出结果:\n{result}"))
-                self.root.after(0, lambda: self._update_status(f"执行完成: {os.path.basename(self.current_pyc)}"))
+                self.interpreter.last_profile = None
+                result = self.interpreter.execute_pyc(self.current_pyc, check_security=check_security,
+                                                      profile=profile)
+                timings = self.interpreter.last_timings
+                # 结果信息同样经过捕获缓冲区，保证显示在客户代码的输出之后
+                if self.interpreter.last_fallback is not None:
+                    capture.append('message', f"railgun无法执行，已改用cpython: {self.interpreter.last_fallback}\n")
+                capture.append('message', f"执行完成\n输出结果:\n{result}\n")
+                self.root.after(0, lambda: self._update_status(
+                    f"执行完成: {os.path.basename(self.current_pyc)} | {timings.format()}"))
+            except SecurityCheckError as e:
+                self.root.after(0, lambda issues=e.issues: self._confirm_unsafe_execution(issues, profile))
             except Exception as e:
-                self.root.after(0, lambda: self._update_output(f"执行错误: {str(e)}"))
+                capture.append('message', f"执行错误: {str(e)}\n")
                 self.root.after(0, lambda: self._update_status("执行失败"))
+            finally:
+                capture.close()
+                report = self.interpreter.last_profile
+                if profile and report is not None:
+                    self.root.after(0, lambda: self._show_profile(report))
 
         threading.Thread(target=execute_task, daemon=True).start()
 
+    def _start_capture(self):
+        """为一次执行创建输出捕获，并开始定时把输出批量写入输出区"""
+        capture = OutputCapture(OUTPUT_BUFFER_CHARS)
+        self.interpreter.capture = capture
+        self.root.after(OUTPUT_POLL_MS, self._drain_output, capture)
+        return capture
+
+    def _drain_output(self, capture):
+        """每次取出一批输出一次性插入，而不是每行调度一次界面更新"""
+        closed = capture.closed
+        chunks = capture.drain(OUTPUT_BATCH_CHARS)
+        if chunks:
+            self.output_display.config(state=tk.NORMAL)
+            for stream, text in chunks:
+                self.output_display.insert(tk.END, text, stream)
+            # 只保留最后MAX_OUTPUT_LINES行，避免文本控件越来越慢
+            line_count = int(self.output_display.index('end-1c').split('.')[0])
+            if line_count > MAX_OUTPUT_LINES:
+                self.output_display.delete('1.0', f"{line_count - MAX_OUTPUT_LINES}.0")
+            self.output_display.see(tk.END)
+            self.output_display.config(state=tk.DISABLED)
+        if chunks or not closed:
+            self.root.after(OUTPUT_POLL_MS, self._drain_output, capture)
+
+    def _confirm_unsafe_execution(self, issues, profile=False):
+        """pyc未通过字节码安全检查时询问是否继续执行"""
+        self._update_security_status(False, issues)
+        response = messagebox.askyesno("安全警告",
+                                       f"pyc文件中检测到{len(issues)}个潜在安全问题:\n\n" +
+                                       "\n".join([f"- {issue}" for issue in issues]) +
+                                       "\n\n是否继续执行？")
+        if response:
+            self._execute_current_pyc(check_security=False, profile=profile)
+        else:
+            self._update_status("已取消执行")
+
+    def _profile_current_pyc(self):
+        """执行当前pyc文件并收集性能分析数据"""
+        self._execute_current_pyc(profile=True)
+
+    def _show_profile(self, report):
+        """在性能分析标签页中显示结果"""
+        self.last_profile = report
+        self.profile_display.config(state=tk.NORMAL)
+        self.profile_display.delete(1.0, tk.END)
+        self.profile_display.insert(tk.END, report.format_table(limit=200))
+        self.profile_display.config(state=tk.DISABLED)
+
+    def _export_profile(self):
+        """导出最近一次性能分析数据，按扩展名选择pstats或折叠栈格式"""
+        if self.last_profile is None:
+            messagebox.showinfo("提示", "还没有性能分析数据，请先执行“性能分析当前pyc”")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".pstats",
+            filetypes=[("pstats文件", "*.pstats"), ("折叠栈（火焰图）", "*.folded"), ("所有文件", "*.*")])
+        if not path:
+            return
+        try:
+            if path.endswith('.folded'):
+                self.last_profile.dump_collapsed(path)
+            else:
+                self.last_profile.dump_pstats(path)
+            self._update_status(f"性能分析数据已导出: {os.path.basename(path)}")
+        except OSError as e:
+            messagebox.showerror("错误", f"导出失败: {str(e)}")
+
     def _update_output(self, text):
         """更新输出显示"""
         self.output_display.config(state=tk.NORMAL)
@@ -261,19 +432,23 @@ class PyVMGUI:
         """打开文件"""
         file_path = filedialog.askopenfilename(filetypes=[("Python Files", "*.py")])
         if file_path:
-            self.current_file = file_path
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                self.code_editor.delete(1.0, tk.END)
-                self.code_editor.insert(tk.END, code)
-                self._update_status(f"打开文件: {os.path.basename(file_path)}")
-                self.security_status.config(text="安全检查: 未检查", foreground="orange")
-                self._update_security_status(True)
-                self._refresh_file_list()
-            except Exception as e:
-                self._update_output(f"打开文件出错: {str(e)}")
-                self._update_status("打开文件失败")
+            self._load_file(file_path)
+
+    def _load_file(self, file_path):
+        """把文件内容载入编辑器"""
+        self.current_file = file_path
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                code = f.read()
+            self.code_editor.delete(1.0, tk.END)
+            self.code_editor.insert(tk.END, code)
+            self._update_status(f"打开文件: {os.path.basename(file_path)}")
+            self.security_status.config(text="安全检查: 未检查", foreground="orange")
+            self._update_security_status(True)
+            self._refresh_file_list()
+        except Exception as e:
+            self._update_output(f"打开文件出错: {str(e)}")
+            self._update_status("打开文件失败")
 
     def _save_file(self):
         """保存文件"""
@@ -311,9 +486,94 @@ class PyVMGUI:
         return False
 
     def _compile_and_execute(self):
-        """编译并执行"""
-        if self._compile_current_file():
-            self._execute_current_pyc()
+        """在内存中编译并执行编辑器中的代码，pyc文件在后台保存"""
+        code = self.code_editor.get(1.0, tk.END)
+        filename = self.current_file or "<编辑器>"
+
+        persist_to = None
+        if self.current_file:
+            persist_to = os.path.splitext(self.current_file)[0] + '.pyc'
+
+        # 安全检查在分析线程中进行，不阻塞界面；解析结果直接用于编译
+        timings = Timings()
+        self._update_status("正在检查...")
+        future = self._analysis_executor.submit(self.security_checker.analyze, code, filename, timings=timings)
+        future.add_done_callback(
+            lambda done: self.root.after(0, self._on_execute_analyzed, code, filename, persist_to, timings, done))
+
+    def _on_execute_analyzed(self, code, filename, persist_to, timings, future):
+        """安全检查完成后回到主线程，确认后开始执行"""
+        try:
+            analysis = future.result()
+        except (SyntaxError, ValueError) as e:
+            self._update_security_status(False, [f"语法错误: {str(e)}"])
+            self._update_output(f"编译错误: {str(e)}")
+            self._update_status("编译失败")
+            return
+        self._update_security_status(analysis.is_safe, analysis.issues)
+        if not analysis.is_safe:
+            response = messagebox.askyesno("安全警告",
+                                           f"检测到{len(analysis.issues)}个潜在安全问题:\n\n" +
+                                           "\n".join([f"- {issue}" for issue in analysis.issues]) +
+                                           "\n\n是否继续执行？")
+            if not response:
+                self._update_status("已取消执行")
+                return
+
+        self._update_status("正在执行...")
+
+        # 每次运行使用独立的编译器，后台写入只需等待本次提交的任务
+        compiler = PyCompiler()
+        capture = self._start_capture()
+
+        def execute_task():
+            try:
+                result = self.interpreter.execute_source(code, filename, compiler, check_security=False,
+                                                         persist_to=persist_to, analysis=analysis,
+                                                         timings=timings)
+                if self.interpreter.last_fallback is not None:
+                    capture.append('message', f"railgun无法执行，已改用cpython: {self.interpreter.last_fallback}\n")
+                capture.append('message', f"执行完成\n输出结果:\n{result}\n")
+                engine = self.interpreter.last_engine
+                self.root.after(0, lambda: self._update_status(f"执行完成（{engine}） | {timings.format()}"))
+            except Exception as e:
+                capture.append('message', f"执行错误: {str(e)}\n")
+                self.root.after(0, lambda: self._update_status("执行失败"))
+            finally:
+                capture.close()
+            if persist_to is not None:
+                # 执行结束后再等待后台写入，保存失败不影响执行结果
+                try:
+                    compiler.flush()
+                    self.current_pyc = persist_to
+                    self.root.after(0, self._refresh_file_list)
+                except OSError as e:
+                    self.root.after(0, lambda error=str(e): self._update_output(f"保存pyc文件失败: {error}"))
+
+        threading.Thread(target=execute_task, daemon=True).start()
+
+    def _compare_engines(self):
+        """分别用各执行引擎运行编辑器中的代码，在输出区显示耗时对比"""
+        code = self.code_editor.get(1.0, tk.END)
+        filename = self.current_file or "<编辑器>"
+        result = self.live_analyzer.analyze(code, filename)
+        if result.syntax_error is not None:
+            self._update_output(f"编译错误: {result.syntax_error}")
+            return
+        if not result.is_safe and not messagebox.askyesno(
+                "安全警告", f"检测到{len(result.issues)}个潜在安全问题，是否继续执行？"):
+            self._update_status("已取消执行")
+            return
+
+        self._update_status("正在对比执行引擎...")
+
+        def compare_task():
+            from pyvm.core.engines import compare_engines
+            report = compare_engines(code, filename).format()
+            self.root.after(0, lambda: self._update_output(report))
+            self.root.after(0, lambda: self._update_status("引擎对比完成"))
+
+        threading.Thread(target=compare_task, daemon=True).start()
 
     def _open_and_execute_pyc(self):
         """打开并执行pyc文件"""
@@ -339,11 +599,15 @@ class PyVMGUI:
 
 2. 编译操作：
    - 编译当前文件：将当前编辑的Python文件编译为pyc文件。
-   - 编译并执行：编译当前文件并执行生成的pyc文件。
+   - 编译并执行：在内存中编译并直接执行编辑器中的代码，pyc文件在后台保存。
+   - 对比执行引擎：分别用CPython和railgun原生虚拟机执行编辑器中的代码并对比耗时。
 
 3. 执行操作：
    - 执行当前pyc：执行当前已编译的pyc文件。
    - 打开并执行pyc：打开一个pyc文件并执行。
+   - 性能分析当前pyc：执行并在“性能分析”标签页中显示各函数的调用次数和耗时，
+     可导出为pstats或折叠栈（火焰图）格式。
+   - 在“设置 → 统计内存峰值”中开启后，状态栏的耗时信息中会包含执行期间的内存峰值。
 
 4. 安全检查：
    在编译前会进行代码安全检查，若发现潜在危险会提示。
@@ -351,27 +615,9 @@ class PyVMGUI:
         messagebox.showinfo("使用说明", help_text)
 
     def _refresh_file_list(self):
-        """刷新文件列表"""
-        for i in self.file_list.get_children():
-            self.file_list.delete(i)
-        if self.current_file:
-            file_dir = os.path.dirname(self.current_file)
-            for root, dirs, files in os.walk(file_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    file_size = os.path.getsize(file_path)
-                    modified_time = time.ctime(os.path.getmtime(file_path))
-                    self.file_list.insert("", "end", text=file, values=(file_size, modified_time))
-
-    def _on_file_double_click(self, event):
-        """文件双击事件"""
-        item = self.file_list.selection()[0]
-        file_name = self.file_list.item(item, "text")
+        """显示当前文件所在目录，目录不变时只增量刷新（扫描在后台进行）"""
         if self.current_file:
-            file_dir = os.path.dirname(self.current_file)
-            file_path = os.path.join(file_dir, file_name)
-            if file_path.endswith('.py'):
-                self._open_file()
+            self.file_browser.set_root(os.path.dirname(os.path.abspath(self.current_file)))
 
     def _update_status(self, text):
         """更新状态栏逻辑"""
@@ -0,0 +1,20 @@
+import pytest
+
+from pyvm.core.interpreter import PyInterpreter
+
+
+def test_edited_module_is_reimported_on_next_run(tmp_path):
+    module = tmp_path / 'libmod.py'
+    module.write_text("VALUE = 1\n")
+    interpreter = PyInterpreter(module_paths=[str(tmp_path)])
+    assert interpreter.execute_source("import libmod\n__result__ = libmod.VALUE\n") == 1
+
+    module.write_text("VALUE = 2\n")
+    assert interpreter.execute_source("import libmod\n__result__ = libmod.VALUE\n") == 2
+
+
+def test_module_not_visible_without_its_path(tmp_path):
+    (tmp_path / 'libmod2.py').write_text("VALUE = 1\n")
+    PyInterpreter(module_paths=[str(tmp_path)]).execute_source("import libmod2\n")
+    with pytest.raises(RuntimeError, match="libmod2"):
+        PyInterpreter().execute_source("import libmod2\n")
@@ -0,0 +1,50 @@
+import types
+
+from pyvm.core.capture import OutputCapture
+from pyvm.core.interpreter import PyInterpreter, get_safe_builtins
+
+
+def run_guest(source):
+    capture = OutputCapture()
+    interpreter = PyInterpreter(capture=capture)
+    try:
+        interpreter.execute_source(source, 'guest.py')
+    finally:
+        capture.close()
+    return interpreter, ''.join(text for stream, text in capture.drain() if stream == 'stdout')
+
+
+def test_exported_function_globals_do_not_expose_host_import():
+    source = ("import vecmath\n"
+              "reached = None\n"
+              "try:\n"
+              "    namespace = getattr(vecmath.sqrt, '__glo' + 'bals__')\n"
+              "    reached = namespace['__builtins__']['__import__']('os')\n"
+              "except Exception:\n"
+              "    pass\n")
+    interpreter, _ = run_guest(source)
+    assert not isinstance(interpreter.globals['reached'], types.ModuleType)
+
+
+def test_exported_functions_only_see_safe_builtins():
+    interpreter, _ = run_guest("import vecmath\nexported = [getattr(vecmath, name) for name in vecmath.__all__]\n")
+    exported = interpreter.globals['exported']
+    assert exported
+    for function in exported:
+        namespace = getattr(function, '__globals__', None)
+        if namespace is None:
+            continue
+        assert namespace['__builtins__'] is get_safe_builtins()
+        for value in namespace.values():
+            # 命名空间中的模块都是C实现的，没有带宿主内置函数的__builtins__
+            if isinstance(value, types.ModuleType) and value is not get_safe_builtins():
+                assert '__builtins__' not in vars(value)
+
+
+def test_vecmath_still_computes():
+    _, stdout = run_guest("import vecmath\n"
+                          "from array import array\n"
+                          "a = array('d', [1.0, 4.0, 9.0])\n"
+                          "vecmath.sqrt(a)\n"
+                          "print(a.tolist(), vecmath.dot(a, a))\n")
+    assert stdout == "[1.0, 2.0, 3.0] 14.0\n"
@@ -0,0 +1,109 @@
+import ast
+
+import pytest
+
+from pyvm.core.optimizer import compile_optimized
+
+
+def optimize(source, level=1):
+    return compile_optimized(ast.parse(source), '<test>', level)
+
+
+def run(code_object):
+    namespace = {}
+    exec(code_object, namespace)
+    return namespace
+
+
+@pytest.mark.parametrize('source', [
+    "try:\n    pass\nfinally:\n    if 0:\n        f()\n",
+    "try:\n    x = 1\nexcept ValueError:\n    if 0:\n        f()\n",
+    "try:\n    x = 1\nexcept ValueError:\n    pass\nfinally:\n    while 0:\n        f()\n",
+    "def g():\n    try:\n        return 1\n    finally:\n        if False:\n            f()\n",
+])
+def test_dead_branch_removal_keeps_try_blocks_valid(source):
+    code_object, report = optimize(source)
+    assert report.branches_removed == 1
+    run(code_object)
+
+
+@pytest.mark.parametrize('source', [
+    "x = 10 ** 8 * 'ab'\n",
+    "x = 'ab' * 10 ** 8\n",
+    "x = b'ab' * 10 ** 8\n",
+    "x = '%0100000000d' % 1\n",
+])
+def test_large_sequence_results_are_not_folded(source):
+    tree = ast.parse(source)
+    code_object, report = compile_optimized(tree, '<test>', 1)
+    # 10 ** 8会被折叠，但序列运算保留到运行时
+    assert report.expressions_folded <= 1
+    assert isinstance(tree.body[0].value, ast.BinOp)
+
+
+def test_constant_expressions_are_folded():
+    tree = ast.parse("SIZE = 4\nx = SIZE * 2 + 1\ny = 'ab' * 3\nz = -SIZE\n")
+    code_object, report = compile_optimized(tree, '<test>', 1)
+    assert report.names_folded == 2
+    assert [stmt.value.value for stmt in tree.body[1:]] == [9, 'ababab', -4]
+    assert run(code_object)['x'] == 9
+
+
+def test_imports_kept_without_all():
+    tree = ast.parse("from .core import Thing\nimport readline\n")
+    _, report = compile_optimized(tree, '<test>', 2)
+    assert report.imports_removed == []
+    assert len(tree.body) == 2
+
+
+def test_unused_from_imports_removed_when_all_declared():
+    source = ("import readline\n"
+              "from os.path import join, split, sep\n"
+              "from .core import Thing\n"
+              "__all__ = ['Thing', 'tail']\n"
+              "def tail(path):\n"
+              "    return split(path)[1]\n")
+    tree = ast.parse(source)
+    _, report = compile_optimized(tree, '<test>', 2)
+    assert report.imports_removed == ['os.path.join', 'os.path.sep']
+    assert isinstance(tree.body[0], ast.Import)
+    assert [alias.name for alias in tree.body[1].names] == ['split']
+
+
+def test_imports_kept_when_all_is_modified():
+    tree = ast.parse("from os.path import join\n__all__ = []\n__all__.append('join')\n")
+    _, report = compile_optimized(tree, '<test>', 2)
+    assert report.imports_removed == []
+
+
+SOURCE = '"""doc"""\nDEBUG = 0\nif DEBUG:\n    print(1)\nx = 2 * 3\n'
+
+
+def test_cache_hit_restores_optimization_report(tmp_path):
+    from pyvm.core.cache import CompileCache
+    from pyvm.core.compiler import PyCompiler
+
+    source_path = tmp_path / 'm.py'
+    source_path.write_text(SOURCE)
+    reports = []
+    for _ in range(2):
+        compiler = PyCompiler(cache=CompileCache(str(tmp_path / 'cache')), opt_level=2, optimization_stats=True)
+        compiler.compile_file(str(source_path))
+        reports.append(compiler.last_optimization)
+    assert compiler.cache.hits == 1
+    assert reports[1] is not None
+    assert reports[1].to_dict() == reports[0].to_dict()
+    assert reports[1].size_after < reports[1].size_before
+
+
+def test_compile_tree_reports_each_file(tmp_path):
+    from pyvm.core.tree import compile_tree
+
+    (tmp_path / 'a.py').write_text(SOURCE)
+    (tmp_path / 'b.py').write_text(SOURCE)
+    seen = []
+    report = compile_tree(str(tmp_path), workers=1, use_cache=False, opt_level=1, optimization_stats=True,
+                          on_result=lambda path, error, optimization: seen.append(optimization))
+    assert len(report.optimizations) == 2
+    assert all(optimization.branches_removed == 1 for optimization in seen)
+    assert report.optimization_summary() is not None
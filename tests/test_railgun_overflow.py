@@ -0,0 +1,38 @@
+import pytest
+
+from pyvm.core.capture import OutputCapture
+from pyvm.core.engines import get_railgun_engine
+from pyvm.core.interpreter import PyInterpreter
+
+pytestmark = pytest.mark.skipif(get_railgun_engine().unavailable_reason() is not None,
+                                reason="railgun引擎不可用")
+
+
+def run_railgun(source):
+    capture = OutputCapture()
+    interpreter = PyInterpreter(check_security=False, capture=capture, engine='railgun')
+    try:
+        interpreter.execute_source(source, 'overflow.py')
+    finally:
+        capture.close()
+    stdout = ''.join(text for stream, text in capture.drain() if stream == 'stdout')
+    return interpreter, stdout
+
+
+@pytest.mark.parametrize('source, expected', [
+    ("x = 100000\nprint(x * x)\n", "10000000000\n"),
+    ("y = 2147483647\nprint(y + 1)\n", "2147483648\n"),
+    ("y = 2147483647\ny += 1\nprint(y)\n", "2147483648\n"),
+    ("x = -2147483647 - 1\nprint(-x)\n", "2147483648\n"),
+])
+def test_overflow_falls_back_to_cpython(source, expected):
+    interpreter, stdout = run_railgun(source)
+    assert stdout == expected
+    assert interpreter.last_engine == 'cpython'
+    assert "32位" in interpreter.last_fallback
+
+
+def test_arithmetic_within_range_stays_on_railgun():
+    interpreter, stdout = run_railgun("x = 46340\nprint(x * x, x - 50000, -x, 'a' + 'b')\n")
+    assert stdout == "2147395600 -3660 -46340 ab\n"
+    assert interpreter.last_engine == 'railgun'
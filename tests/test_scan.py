@@ -0,0 +1,44 @@
+import os
+import shutil
+
+import pytest
+
+from pyvm.core.scan import scan_paths
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'src'
+    root.mkdir()
+    for index in range(5):
+        (root / f"m{index}.py").write_text(f"x = {index}\n")
+    (root / 'bad.py').write_text("import os\nos.system('ls')\n")
+    return root
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_unchanged_content_hits_cache_after_touch_and_copy(tmp_path, tree, workers):
+    cache_dir = str(tmp_path / 'cache')
+    first = scan_paths([str(tree)], workers=workers, cache_dir=cache_dir)
+    assert first.cache_hits == 0
+
+    for path in tree.iterdir():
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    copy = tmp_path / 'copy'
+    shutil.copytree(tree, copy)
+
+    second = scan_paths([str(tree), str(copy)], workers=workers, cache_dir=cache_dir)
+    assert second.cache_hits == len(second.results) == 12
+    issues = {os.path.basename(result.path): result.issues for result in first.results}
+    for result in second.results:
+        assert result.issues == issues[os.path.basename(result.path)]
+
+
+def test_changed_content_is_rechecked(tmp_path, tree):
+    cache_dir = str(tmp_path / 'cache')
+    scan_paths([str(tree)], workers=1, cache_dir=cache_dir)
+    (tree / 'm0.py').write_text("import os\nos.system('ls')\nx = 0\n")
+    report = scan_paths([str(tree)], workers=1, cache_dir=cache_dir)
+    assert report.cache_hits == 5
+    assert not next(result for result in report.results if result.path.endswith('m0.py')).safe
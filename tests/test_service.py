@@ -0,0 +1,18 @@
+from pyvm.core.service import CompilerService
+
+
+def test_unreadable_file_is_reported_in_result(tmp_path):
+    with CompilerService(use_cache=False) as service:
+        result = service.submit_file(str(tmp_path / 'missing.py')).result()
+    assert not result.ok
+    assert result.error.startswith('FileNotFoundError')
+
+
+def test_undecodable_source_is_reported_in_result(tmp_path):
+    path = tmp_path / 'latin1.py'
+    path.write_bytes(b"s = '\xe9'\n")
+    with CompilerService(use_cache=False) as service:
+        result = service.compile_file(str(path))
+    assert not result.ok
+    assert result.error.startswith('UnicodeDecodeError')
+    assert not (tmp_path / 'latin1.pyc').exists()
@@ -0,0 +1,40 @@
+import tracemalloc
+
+from pyvm.core.timing import MemoryMonitor
+
+
+def test_nested_monitors_keep_tracing_until_last_exit():
+    assert not tracemalloc.is_tracing()
+    outer = MemoryMonitor()
+    inner = MemoryMonitor()
+    with outer:
+        with inner:
+            pass
+        # 内层先退出时不能停止外层仍在使用的tracemalloc
+        assert tracemalloc.is_tracing()
+        data = bytearray(1024 * 1024)
+        del data
+    assert not tracemalloc.is_tracing()
+    assert inner.peak is not None
+    assert outer.peak >= 1024 * 1024
+
+
+def test_overlapping_monitors_release_in_any_order():
+    first = MemoryMonitor()
+    second = MemoryMonitor()
+    first.__enter__()
+    second.__enter__()
+    first.__exit__(None, None, None)
+    assert tracemalloc.is_tracing()
+    second.__exit__(None, None, None)
+    assert not tracemalloc.is_tracing()
+
+
+def test_external_tracing_is_left_running():
+    tracemalloc.start()
+    try:
+        with MemoryMonitor():
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()